@@ -1,178 +1,227 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-import PyPDF2
 import io
-from PIL import Image
-import pytesseract
-import re
-import json
-from datetime import datetime
+import time
+from contextlib import closing
+from functools import partial
+from datetime import datetime, timezone
+from config import Config, get_config_class
+from models.extractor import LabValueExtractor, order_values
+from models.model_extractor import default_model_extractor
+from models.recommendations import default_rule_sets
+from models.reference_ranges import default_store, normalize_sex
+from models.results import AnalysisEntry, AnalysisReport, Alert, LabValue, Summary, as_response, lab_values_of
+from utils.batch import check_zip, iter_zip, run_batch
+from utils.cache import ResultCache, hash_upload
+from utils.jobs import QueueFullError, create_job_queue
+from utils.image_ocr import iter_image_text, join_tiles, ocr_image
+from utils.lazy import import_report, start_warmup
+from utils.limits import Budget, ResourceLimitExceeded, start_budget
+from utils.metrics import (
+    CACHE_LOOKUPS, ERRORS, LIMIT_REJECTIONS, PAGES, REQUEST_SECONDS, REQUESTS, RESOURCE_LIMITS, TimedIterator,
+    format_timings, record_stage, registry, size_bucket, span, start_timings, stop_timings
+)
+from utils.ingest import make_spooled_request_class, read_text
+from utils.pdf_stream import record_pages, stream_pdf_pages
+from utils.profiler import SlowRequestProfiler
+from utils.serialization import FastJSONProvider, dumps_str
+from utils.trends import TrendStore
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+STREAM_MIMETYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+# Bump when extraction or analysis output changes so cached results are not reused
+ANALYZER_VERSION = '1.3'
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def parse_report_date(value):
+    """Epoch seconds for an ISO date/datetime form field (naive values are UTC); None if absent"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
 class HealthReportAnalyzer:
-    def __init__(self):
-        self.normal_ranges = {
-            'cholesterol': {'min': 125, 'max': 200, 'unit': 'mg/dL'},
-            'blood_pressure_systolic': {'min': 90, 'max': 120, 'unit': 'mmHg'},
-            'blood_pressure_diastolic': {'min': 60, 'max': 80, 'unit': 'mmHg'},
-            'glucose': {'min': 70, 'max': 100, 'unit': 'mg/dL'},
-            'hemoglobin': {'min': 12.0, 'max': 17.5, 'unit': 'g/dL'},
-            'white_blood_cells': {'min': 4000, 'max': 11000, 'unit': '/μL'},
-            'bmi': {'min': 18.5, 'max': 24.9, 'unit': 'kg/m²'}
-        }
-    
-    def extract_text_from_pdf(self, file_path):
-        """Extract text from PDF file"""
+    def __init__(self, reference_store=None):
+        self.reference_ranges = reference_store or default_store(Config.REFERENCE_RANGES_PATH)
+        self.lab_extractor = LabValueExtractor()
+        self.recommendation_rules = default_rule_sets()['basic']
+        self.pdf_parallel_threshold = Config.PDF_PARALLEL_PAGE_THRESHOLD
+        self.ocr_workers = Config.OCR_WORKERS
+        self.ocr_scanned_pdf_pages = Config.PDF_OCR_SCANNED_PAGES
+        self.max_pdf_pages = Config.MAX_PDF_PAGES
+        self.max_image_pixels = Config.MAX_IMAGE_PIXELS
+        # Built once and shared by every analyzer in the process; None keeps extraction regex-only
+        self.model_extractor = default_model_extractor(
+            threshold=Config.MODEL_EXTRACTOR_THRESHOLD,
+            batch_size=Config.MODEL_BATCH_SIZE,
+            batch_wait=Config.MODEL_BATCH_WAIT_MS / 1000,
+            cache_size=Config.MODEL_CACHE_SIZE
+        ) if Config.MODEL_EXTRACTOR else None
+        self._page_cache = None
+        self._page_cache_pid = None
+    
+    @property
+    def normal_ranges(self):
+        """Standard reference ranges, read from the hot-reloaded store"""
+        return self.reference_ranges.current().panel('standard')
+    
+    @property
+    def version(self):
+        """Analyzer version plus the loaded ranges and model digests; changes invalidate cached results"""
+        version = f"{ANALYZER_VERSION}:{self.reference_ranges.current().digest[:12]}"
+        if self.model_extractor is not None:
+            version += f":model-{self.model_extractor.version}"
+        return version
+    
+    @property
+    def page_cache(self):
+        """OCR text of scanned PDF pages by image hash; one per process since sqlite handles do not survive fork"""
+        if self._page_cache is None or self._page_cache_pid != os.getpid():
+            self._page_cache = ResultCache(
+                max_entries=Config.PAGE_CACHE_SIZE,
+                ttl=Config.PAGE_CACHE_TTL,
+                db_path=Config.PAGE_CACHE_PATH
+            )
+            self._page_cache_pid = os.getpid()
+        return self._page_cache
+    
+    def iter_pdf_pages(self, source):
+        """Yield text from PDF pages as they are extracted, OCR'ing scanned pages that have no text layer"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
+            if self.ocr_scanned_pdf_pages:
+                pages = stream_pdf_pages(
+                    source,
+                    parallel_threshold=self.pdf_parallel_threshold,
+                    workers=Config.PDF_WORKERS,
+                    ocr=self.ocr_pdf_page,
+                    ocr_workers=self.ocr_workers,
+                    ocr_cache=self.page_cache,
+                    ocr_namespace=f"ocr:{Config.OCR_TARGET_DPI}:{Config.OCR_MAX_SIDE}",
+                    max_pages=self.max_pdf_pages,
+                    max_pixels=self.max_image_pixels
+                )
+            else:
+                pages = stream_pdf_pages(
+                    source,
+                    parallel_threshold=self.pdf_parallel_threshold,
+                    workers=Config.PDF_WORKERS,
+                    max_pages=self.max_pdf_pages
+                )
+            yield from pages
+        except ResourceLimitExceeded:
+            raise
         except Exception as e:
-            return f"Error reading PDF: {str(e)}"
+            yield f"Error reading PDF: {str(e)}"
+    
+    def ocr_pdf_page(self, image):
+        """OCR one scanned PDF page; pages already run concurrently, so its strips are read serially"""
+        PAGES.inc(method='pdf_ocr')
+        return ocr_image(
+            image,
+            workers=1,
+            target_dpi=Config.OCR_TARGET_DPI,
+            max_side=Config.OCR_MAX_SIDE,
+            max_pixels=self.max_image_pixels
+        )
+    
+    def extract_text_from_pdf(self, source):
+        """Extract text from PDF file"""
+        return ''.join(self.iter_pdf_pages(source))
     
-    def extract_text_from_image(self, file_path):
+    def extract_text_from_image(self, source):
         """Extract text from image using OCR"""
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text
+            return ocr_image(
+                source,
+                workers=self.ocr_workers,
+                target_dpi=Config.OCR_TARGET_DPI,
+                max_side=Config.OCR_MAX_SIDE,
+                max_pixels=self.max_image_pixels
+            )
+        except ResourceLimitExceeded:
+            raise
         except Exception as e:
             return f"Error reading image: {str(e)}"
     
     def parse_lab_values(self, text):
-        """Extract lab values from text using regex patterns"""
-        lab_values = {}
-        
-        # Common patterns for lab values
-        patterns = {
-            'cholesterol': r'cholesterol[:\s]*(\d+\.?\d*)',
-            'glucose': r'glucose[:\s]*(\d+\.?\d*)',
-            'hemoglobin': r'hemoglobin[:\s]*(\d+\.?\d*)',
-            'blood_pressure': r'blood pressure[:\s]*(\d+)/(\d+)',
-            'bmi': r'bmi[:\s]*(\d+\.?\d*)',
-            'weight': r'weight[:\s]*(\d+\.?\d*)',
-            'height': r'height[:\s]*(\d+\.?\d*)'
-        }
-        
-        text_lower = text.lower()
-        
-        for test, pattern in patterns.items():
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                if test == 'blood_pressure':
-                    lab_values['blood_pressure_systolic'] = float(matches[0][0])
-                    lab_values['blood_pressure_diastolic'] = float(matches[0][1])
-                else:
-                    lab_values[test] = float(matches[0])
+        """Extract lab values from text using precompiled analyte patterns, in canonical units"""
+        return self.normalize_measurements(self.lab_extractor.extract_measurements(text))[0]
+    
+    def parse_lab_values_stream(self, pages):
+        """Extract lab values from a page stream, reading no further than needed, in canonical units"""
+        return self.normalize_measurements(self.lab_extractor.extract_page_measurements(pages))[0]
+    
+    def normalize_measurements(self, measurements):
+        """Values in canonical units, and the lab's printed ranges (converted alike) by test
         
-        return lab_values
+        One table lookup per value: conversion factors are precomputed with the
+        loaded reference ranges. A value left in an unknown unit without a
+        printed range has None as its range: nothing can judge it.
+        """
+        normalize = self.reference_ranges.current().normalize
+        lab_values, lab_ranges = {}, {}
+        for test, measurement in measurements.items():
+            lab_values[test], lab_range, unit_known = normalize(test, measurement)
+            if lab_range is not None or not unit_known:
+                lab_ranges[test] = lab_range
+        return lab_values, lab_ranges
+    
+    def fill_model_values(self, text, measurements):
+        """Add the measurements the model finds for analytes the patterns missed"""
+        if self.model_extractor is None:
+            return measurements
+        with span('model'):
+            found = self.model_extractor.fill_missing(text, measurements)
+        return order_values({**measurements, **found}) if found else measurements
     
-    def analyze_values(self, lab_values):
-        """Analyze lab values against normal ranges"""
+    def analyze_values(self, lab_values, sex=None, age=None, lab_ranges=None):
+        """Analyze lab values against normal ranges, using sex/age specific ranges when known
+        
+        A range the lab printed next to the value (lab_ranges, from
+        normalize_measurements) takes precedence over the reference data; a
+        value in an unknown unit is judged by its printed range alone.
+        """
         analysis = {}
         alerts = []
         
+        index = self.reference_ranges.current()
+        standard_tests = index.panel('standard')
+        sex = normalize_sex(sex)
+        
         for test, value in lab_values.items():
-            if test in self.normal_ranges:
-                normal_range = self.normal_ranges[test]
-                status = "normal"
+            if test in standard_tests:
+                if lab_ranges and test in lab_ranges:
+                    normal_range = lab_ranges[test]
+                    if normal_range is None:
+                        continue
+                else:
+                    normal_range = index.lookup(test, sex, age)
+                status = normal_range.status(value)
                 
-                if value < normal_range['min']:
-                    status = "low"
-                    alerts.append({
-                        'test': test,
-                        'value': value,
-                        'status': 'low',
-                        'message': f"{test.replace('_', ' ').title()} is below normal range"
-                    })
-                elif value > normal_range['max']:
-                    status = "high"
-                    alerts.append({
-                        'test': test,
-                        'value': value,
-                        'status': 'high',
-                        'message': f"{test.replace('_', ' ').title()} is above normal range"
-                    })
+                if status == "low" or status == "high":
+                    alerts.append(Alert(test, value, status))
                 
-                analysis[test] = {
-                    'value': value,
-                    'status': status,
-                    'normal_range': f"{normal_range['min']}-{normal_range['max']} {normal_range['unit']}"
-                }
+                # Reference range labels are built once per loaded index and shared by every report
+                analysis[test] = AnalysisEntry(value, status, normal_range.display, not normal_range.unit_known)
         
         return analysis, alerts
     
     def generate_recommendations(self, analysis, alerts):
-        """Generate health recommendations based on analysis"""
-        recommendations = []
-        
-        for alert in alerts:
-            test = alert['test']
-            status = alert['status']
-            
-            if test == 'cholesterol':
-                if status == 'high':
-                    recommendations.extend([
-                        "Reduce intake of saturated fats and trans fats",
-                        "Increase fiber-rich foods like oats and beans",
-                        "Exercise regularly (30 minutes, 5 days a week)",
-                        "Consider consulting a cardiologist"
-                    ])
-            elif test in ['blood_pressure_systolic', 'blood_pressure_diastolic']:
-                if status == 'high':
-                    recommendations.extend([
-                        "Reduce sodium intake (less than 2300mg daily)",
-                        "Maintain healthy weight",
-                        "Limit alcohol consumption",
-                        "Practice stress management techniques",
-                        "Consult with your doctor about blood pressure medication"
-                    ])
-            elif test == 'glucose':
-                if status == 'high':
-                    recommendations.extend([
-                        "Monitor carbohydrate intake",
-                        "Choose whole grains over refined carbs",
-                        "Maintain regular meal times",
-                        "Increase physical activity",
-                        "Consider diabetes screening with your doctor"
-                    ])
-            elif test == 'bmi':
-                if status == 'high':
-                    recommendations.extend([
-                        "Create a calorie deficit through diet and exercise",
-                        "Focus on whole foods and portion control",
-                        "Aim for 150 minutes of moderate exercise weekly",
-                        "Consider consulting a nutritionist"
-                    ])
-        
-        # General recommendations
-        if not recommendations:
-            recommendations = [
-                "Maintain current healthy lifestyle",
-                "Continue regular check-ups",
-                "Stay hydrated and eat balanced meals",
-                "Keep up with regular physical activity"
-            ]
-        
-        return list(set(recommendations))  # Remove duplicates
+        """Generate health recommendations for the alerted tests from the compiled rule table"""
+        states = [(alert.test, alert.status) for alert in alerts]
+        return self.recommendation_rules.recommend_flat(states)
     
     def create_summary(self, analysis, alerts):
         """Create a simple summary of the report"""
@@ -190,79 +239,592 @@ class HealthReportAnalyzer:
             overall_status = "Medical Consultation Recommended"
             summary_text = f"Your report shows {abnormal_tests} parameters outside normal range. Please consult with your healthcare provider."
         
-        return {
-            'overall_status': overall_status,
-            'summary_text': summary_text,
-            'total_tests': total_tests,
-            'normal_tests': normal_tests,
-            'abnormal_tests': abnormal_tests
-        }
-
-# Initialize analyzer
+        return Summary(overall_status, summary_text, total_tests, normal_tests, abnormal_tests)
+    
+    def analyze_document(self, filename, source, sex=None, age=None, budget=None):
+        """Run extraction, parsing and analysis for one uploaded document
+        
+        With a Budget, extraction stops at the first page or OCR strip past its
+        time or memory limit and the limit is raised with the report of what
+        was read so far as its partial result. budget may also be a factory,
+        called when extraction starts, for work that waits in a queue or runs
+        in another process.
+        """
+        budget = start_budget(budget)
+        # Extract text based on file type
+        if filename.lower().endswith('.pdf'):
+            # Stream pages into the parser; pages after the last needed value are never read.
+            # Extraction and parsing interleave, so page production is timed separately.
+            pages = self.iter_pdf_pages(source)
+            timed_pages = TimedIterator(budget.guard(pages), 'extract')
+            pages_read = []
+            started = time.perf_counter()
+            measurements = self.lab_extractor.extract_page_measurements(record_pages(timed_pages, pages_read))
+            record_stage('parse', time.perf_counter() - started - timed_pages.elapsed)
+            timed_pages.close()
+            pages.close()
+            PAGES.inc(len(pages_read), method='pdf')
+            extracted_text = ''.join(pages_read)
+        else:
+            with span('extract'):
+                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+                    # Strips recognized before a limit stops OCR are kept
+                    with closing(self.iter_image_text(source)) as strips:
+                        extracted_text = join_tiles(budget.guard(strips))
+                    PAGES.inc(method='ocr')
+                else:
+                    extracted_text = ''.join(budget.guard([read_text(source)]))
+            
+            # Parse lab values
+            with span('parse'):
+                measurements = self.lab_extractor.extract_measurements(extracted_text)
+        
+        measurements = self.fill_model_values(extracted_text, measurements)
+        with span('normalize'):
+            lab_values, lab_ranges = self.normalize_measurements(measurements)
+        report = self.build_report(extracted_text, lab_values, sex, age, lab_ranges)
+        if budget.exceeded is not None:
+            budget.exceeded.partial = report
+            raise budget.exceeded
+        return report
+    
+    def build_report(self, extracted_text, lab_values, sex=None, age=None, lab_ranges=None):
+        """Analysis, recommendations and summary for already extracted values"""
+        # Analyze values
+        with span('analyze'):
+            analysis, alerts = self.analyze_values(lab_values, sex, age, lab_ranges)
+        
+        # Generate recommendations
+        with span('recommend'):
+            recommendations = self.generate_recommendations(analysis, alerts)
+        
+        # Create summary
+        with span('summary'):
+            summary = self.create_summary(analysis, alerts)
+        
+        # Values left as printed, in a unit the reference data is not in; kept out of trends
+        unit_unknown = [test for test, lab_range in (lab_ranges or {}).items()
+                        if lab_range is None or not lab_range.unit_known]
+        
+        return AnalysisReport(
+            extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text,
+            [LabValue(test, value) for test, value in lab_values.items()],
+            analysis,
+            alerts,
+            recommendations,
+            summary,
+            unit_unknown
+        )
+    
+    def iter_image_text(self, source):
+        """Yield OCR text strip by strip, top to bottom"""
+        try:
+            yield from iter_image_text(
+                source,
+                workers=self.ocr_workers,
+                target_dpi=Config.OCR_TARGET_DPI,
+                max_side=Config.OCR_MAX_SIDE,
+                max_pixels=self.max_image_pixels
+            )
+        except ResourceLimitExceeded:
+            raise
+        except Exception as e:
+            yield f"Error reading image: {str(e)}"
+    
+    def iter_document_events(self, filename, source, sex=None, age=None, budget=None):
+        """Analyze one document as a stream of progress events, ending with the full report
+        
+        Yields ('page', ...) for each PDF page or OCR strip read, ('lab_value', ...) for
+        each value as soon as it is found, ('analysis', ...) with its status and alert,
+        and finally ('result', AnalysisReport). Values the model extractor adds are only
+        known once everything is read, so their events come last, with no page.
+        Closing the generator stops extraction: pending PDF chunks and OCR tiles are
+        cancelled. A budget limit is raised after the events already produced, as in
+        analyze_document.
+        """
+        budget = start_budget(budget)
+        lower = filename.lower()
+        if lower.endswith('.pdf'):
+            chunks, method = self.iter_pdf_pages(source), 'pdf'
+        elif lower.endswith(('.png', '.jpg', '.jpeg')):
+            chunks, method = self.iter_image_text(source), 'ocr'
+        else:
+            chunks, method = [read_text(source)], None
+        
+        timed_chunks = TimedIterator(budget.guard(chunks), 'extract')
+        chunks_read = []
+        measurements = {}
+        lab_values, lab_ranges = {}, {}
+        try:
+            pages = self.lab_extractor.iter_page_measurements(record_pages(timed_chunks, chunks_read))
+            for number, found in pages:
+                yield 'page', {'page': number + 1, 'found': len(found)}
+                measurements.update(found)
+                values, ranges = self.normalize_measurements(found)
+                lab_values.update(values)
+                lab_ranges.update(ranges)
+                for test, value in values.items():
+                    yield from self._value_events(test, value, number + 1, sex, age, ranges)
+        finally:
+            timed_chunks.close()
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        
+        if method == 'pdf':
+            PAGES.inc(len(chunks_read), method='pdf')
+        elif method == 'ocr':
+            PAGES.inc(method='ocr')
+        extracted_text = join_tiles(chunks_read) if method == 'ocr' else ''.join(chunks_read)
+        if self.model_extractor is not None:
+            # Model values are only known once every chunk has been read; they carry no page
+            with span('model'):
+                found = self.model_extractor.fill_missing(extracted_text, measurements)
+            values, ranges = self.normalize_measurements(found)
+            lab_values.update(values)
+            lab_ranges.update(ranges)
+            for test, value in values.items():
+                yield from self._value_events(test, value, None, sex, age, ranges)
+        report = self.build_report(extracted_text, order_values(lab_values), sex, age, lab_ranges)
+        if budget.exceeded is not None:
+            budget.exceeded.partial = report
+            raise budget.exceeded
+        yield 'result', report
+    
+    def _value_events(self, test, value, page, sex=None, age=None, lab_ranges=None):
+        """('lab_value', ...) for a found value, then its ('analysis', ...) when the test has a range"""
+        yield 'lab_value', {'test': test, 'value': value, 'page': page}
+        analysis, alerts = self.analyze_values({test: value}, sex, age, lab_ranges)
+        if test in analysis:
+            yield 'analysis', {
+                'test': test,
+                'analysis': analysis[test],
+                'alert': alerts[0] if alerts else None
+            }
+
+def create_batch_analyzer():
+    """Analyzer for batch worker processes; files already run in parallel, so PDFs and images are read serially"""
+    batch_analyzer = HealthReportAnalyzer()
+    batch_analyzer.pdf_parallel_threshold = 0
+    batch_analyzer.ocr_workers = 1
+    return batch_analyzer
+
+# Initialize analyzer at import time: under a preloading server it is built once
+# in the master and shared copy-on-write by every worker
 analyzer = HealthReportAnalyzer()
 
-@app.route('/')
+def analyze_upload(filename, data, sex=None, age=None, budget=None):
+    """Background job body; module-level so job processes can import it by name"""
+    return analyzer.analyze_document(filename, data, sex, age, budget)
+
+class WorkerState:
+    """Per-process services; worker threads and sqlite handles do not survive fork"""
+    
+    def __init__(self, config):
+        self.pid = os.getpid()
+        self.result_cache = ResultCache(
+            max_entries=config['RESULT_CACHE_SIZE'],
+            ttl=config['RESULT_CACHE_TTL'],
+            db_path=config['RESULT_CACHE_PATH']
+        )
+        self.job_queue = create_job_queue(
+            config['JOB_BACKEND'],
+            workers=config['JOB_WORKERS'],
+            max_queued=config['JOB_QUEUE_SIZE'],
+            timeout=config['MAX_PROCESSING_TIME'],
+            db_path=config['JOB_STORE_PATH'],
+            # The job forkserver imports this module once, analyzer included
+            preload=[__name__]
+        )
+        self.trend_store = None
+        if config['TREND_STORE_PATH']:
+            self.trend_store = TrendStore(config['TREND_STORE_PATH'], half_life_days=config['TREND_HALF_LIFE_DAYS'])
+        self.profiler = None
+        if config['PROFILE_SLOWEST'] > 0:
+            self.profiler = SlowRequestProfiler(
+                config['PROFILE_DIR'],
+                keep=config['PROFILE_SLOWEST'],
+                sample_rate=config['PROFILE_SAMPLE_RATE']
+            )
+
+_worker_state = None
+
+def worker_state():
+    """Services for the current process, created on first use after a fork"""
+    global _worker_state
+    if _worker_state is None or _worker_state.pid != os.getpid():
+        _worker_state = WorkerState(current_app.config)
+    return _worker_state
+
+def abandon_jobs(reason):
+    """Fail this process's unfinished jobs, e.g. from gunicorn's worker_exit hook"""
+    if _worker_state is not None and _worker_state.pid == os.getpid():
+        _worker_state.job_queue.abandon(reason)
+
+def upload_type():
+    """Extension of the first uploaded file, for metric labels"""
+    if request.mimetype != 'multipart/form-data':
+        return 'none'
+    try:
+        files = request.files
+    except RequestEntityTooLarge:
+        return 'none'
+    for file in files.values():
+        if '.' in (file.filename or ''):
+            return file.filename.rsplit('.', 1)[1].lower()
+    return 'none'
+
+def budget_factory():
+    """Picklable Budget constructor with this app's limits, for jobs and batch workers to start their own"""
+    return partial(Budget, current_app.config['MAX_PROCESSING_TIME'], current_app.config['MAX_REQUEST_MEMORY_MB'] << 20)
+
+def request_budget():
+    """Time and memory allowance for extracting this request's document"""
+    return budget_factory()()
+
+def limit_payload(error):
+    """Error body for a resource limit, with the partial report when extraction got that far"""
+    LIMIT_REJECTIONS.inc(endpoint=request.url_rule.rule, limit=error.limit)
+    payload = {'success': False, 'error': str(error), 'limit': error.limit}
+    if error.partial is not None:
+        payload['partial_result'] = as_response(error.partial, request.args.get('compact') == '1')
+    return payload
+
+def requested_stream_format():
+    """'ndjson' for ?stream=1 or ?stream=ndjson, 'sse' for ?stream=sse or an event-stream Accept header"""
+    stream = request.args.get('stream')
+    if stream in ('1', 'ndjson'):
+        return 'ndjson'
+    if stream == 'sse' or request.accept_mimetypes.best == 'text/event-stream':
+        return 'sse'
+    return None
+
+def format_event(event, payload, stream_format):
+    """One NDJSON line (the event name under "event") or one Server-Sent Event"""
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {dumps_str(payload)}\n\n"
+    return dumps_str(dict(payload, event=event)) + '\n'
+
+@api.before_app_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.timings_token = start_timings()
+    profiler = worker_state().profiler
+    g.profile = profiler.start() if profiler else None
+
+@api.after_app_request
+def record_request_timing(response):
+    started, token, profile = g.request_started, g.timings_token, g.profile
+    profiler = worker_state().profiler
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    label = request.endpoint or 'unmatched'
+    labels = {'file_type': upload_type(), 'size_bucket': size_bucket(request.content_length)}
+    
+    def finish():
+        elapsed = time.perf_counter() - started
+        timings = stop_timings(token)
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, **labels)
+        if profile is not None:
+            profiler.finish(profile, elapsed, label)
+        return elapsed, timings
+    
+    # A streamed body is produced after this hook returns, so it is timed and
+    # profiled once the server closes the response (no timing header then)
+    if response.is_streamed:
+        response.call_on_close(finish)
+        return response
+    
+    elapsed, timings = finish()
+    if current_app.config['DEBUG_TIMING_HEADER'] and request.headers.get('X-Debug-Timing'):
+        response.headers['X-Debug-Timing'] = format_timings(dict(timings, total=elapsed))
+    return response
+
+@api.route('/')
 def home():
     return jsonify({"message": "Health Report Analyzer API is running!"})
 
-@app.route('/analyze', methods=['POST'])
+@api.route('/analyze', methods=['POST'])
 def analyze_report():
     try:
-        if 'file' not in request.files:
+        # Reading the multipart body is the upload stage
+        with span('upload'):
+            files = request.files
+        if 'file' not in files:
             return jsonify({'error': 'No file uploaded'}), 400
         
-        file = request.files['file']
+        file = files['file']
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
             
-            # Extract text based on file type
-            if filename.lower().endswith('.pdf'):
-                extracted_text = analyzer.extract_text_from_pdf(file_path)
-            elif filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                extracted_text = analyzer.extract_text_from_image(file_path)
-            else:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    extracted_text = f.read()
+            # Optional patient context selects sex/age specific reference ranges
+            sex = normalize_sex(request.form.get('sex'))
+            age = request.form.get('age', type=float)
             
-            # Parse lab values
-            lab_values = analyzer.parse_lab_values(extracted_text)
+            # With a patient id the values are added to that patient's trends, when they are kept
+            state = worker_state()
+            patient_id = (request.form.get('patient_id', '').strip() or None) if state.trend_store else None
+            try:
+                observed_at = parse_report_date(request.form.get('report_date'))
+            except ValueError:
+                return jsonify({'error': 'report_date must be an ISO date, e.g. 2024-03-01'}), 400
+            
+            # ?compact=1 leaves out extracted_text
+            compact = request.args.get('compact') == '1'
             
-            # Analyze values
-            analysis, alerts = analyzer.analyze_values(lab_values)
+            def record_trends(result):
+                if patient_id:
+                    state.trend_store.record(patient_id, lab_values_of(result), observed_at, report_id=report_id)
             
-            # Generate recommendations
-            recommendations = analyzer.generate_recommendations(analysis, alerts)
+            def build_response(result):
+                response = as_response(result, compact)
+                response['timestamp'] = datetime.now().isoformat()
+                if patient_id:
+                    with span('trends'):
+                        record_trends(response)
+                        response['trends'] = state.trend_store.trends(patient_id, list(response['lab_values']))
+                return response
             
-            # Create summary
-            summary = analyzer.create_summary(analysis, alerts)
+            def respond(result):
+                response = build_response(result)
+                with span('serialize'):
+                    return jsonify(response)
+            
+            # Identical uploads (retries, re-shares) reuse the earlier result
+            extension = filename.rsplit('.', 1)[1].lower()
+            with span('hash'):
+                # The content alone identifies the report in trends; the cache key adds what the result depends on
+                report_id = hash_upload(file.stream)
+            cache_key = f"{analyzer.version}:{extension}:{sex}:{age}:{report_id}"
+            cached = state.result_cache.get(cache_key)
+            CACHE_LOOKUPS.inc(result='miss' if cached is None else 'hit')
+            run_async = request.args.get('async') == '1'
+            stream_format = requested_stream_format()
+            if cached is not None and not run_async and not stream_format:
+                return respond(cached)
+            
+            # Progress events while the document is read; closing the connection stops the work
+            if stream_format:
+                # The upload stream is closed once the view returns, so read it first
+                data = file.read()
+                endpoint = request.url_rule.rule
+                budget = request_budget()
+                
+                def events():
+                    try:
+                        if cached is not None:
+                            yield 'result', build_response(cached)
+                            return
+                        for event, payload in analyzer.iter_document_events(filename, data, sex, age, budget):
+                            if event == 'result':
+                                state.result_cache.set(cache_key, payload)
+                                payload = build_response(payload)
+                            yield event, payload
+                    except ResourceLimitExceeded as e:
+                        # Headers are already sent, so the limit's status travels in the event
+                        yield 'error', dict(limit_payload(e), status=e.status)
+                    except Exception as e:
+                        ERRORS.inc(endpoint=endpoint, error=type(e).__name__)
+                        current_app.logger.exception('Unhandled error while streaming %s', filename)
+                        yield 'error', {'error': str(e)}
+                
+                return Response(
+                    stream_with_context(format_event(event, payload, stream_format) for event, payload in events()),
+                    mimetype=STREAM_MIMETYPES[stream_format],
+                    # Proxies must pass events through as they are written
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+                )
             
-            # Clean up uploaded file
-            os.remove(file_path)
+            # OCR-heavy work can run in the background and be polled via /jobs/<id>
+            if run_async:
+                def on_complete(result):
+                    state.result_cache.set(cache_key, result)
+                    record_trends(result)
+                
+                if cached is not None:
+                    record_trends(cached)
+                    job_id = state.job_queue.add_completed(cached)
+                else:
+                    job_id = state.job_queue.submit(
+                        analyze_upload, filename, file.read(), sex, age, budget_factory(),
+                        on_complete=on_complete
+                    )
+                return jsonify({
+                    'success': True,
+                    'job_id': job_id,
+                    'status': 'queued',
+                    'status_url': f'/jobs/{job_id}'
+                }), 202
             
-            return jsonify({
-                'success': True,
-                'extracted_text': extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text,
-                'lab_values': lab_values,
-                'analysis': analysis,
-                'alerts': alerts,
-                'recommendations': recommendations,
-                'summary': summary,
-                'timestamp': datetime.now().isoformat()
-            })
+            result = analyzer.analyze_document(filename, file.stream, sex, age, request_budget())
+            state.result_cache.set(cache_key, result)
+            return respond(result)
         
         return jsonify({'error': 'Invalid file type'}), 400
     
+    except ResourceLimitExceeded as e:
+        return jsonify(limit_payload(e)), e.status
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+    except HTTPException:
+        # Oversized uploads (413) are answered by upload_too_large
+        raise
     except Exception as e:
+        ERRORS.inc(endpoint=request.url_rule.rule, error=type(e).__name__)
+        current_app.logger.exception('Unhandled error in %s', request.path)
         return jsonify({'error': str(e)}), 500
 
-@app.route('/health', methods=['GET'])
+@api.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    # Upload streams are closed once the view returns, so read them before streaming
+    uploads = [
+        (file.filename, file.read()) for file in files
+        if file.filename.lower().endswith('.zip') or allowed_file(file.filename)
+    ]
+    
+    # Archive members are checked against the upload and archive limits before anything is decompressed
+    try:
+        for filename, data in uploads:
+            if filename.lower().endswith('.zip'):
+                check_zip(io.BytesIO(data), ALLOWED_EXTENSIONS, current_app.config['MAX_CONTENT_LENGTH'],
+                          current_app.config['MAX_ARCHIVE_MEMBERS'], current_app.config['MAX_ARCHIVE_SIZE'])
+    except ResourceLimitExceeded as e:
+        return jsonify(limit_payload(e)), e.status
+    
+    def items():
+        for filename, data in uploads:
+            if filename.lower().endswith('.zip'):
+                yield from iter_zip(io.BytesIO(data), ALLOWED_EXTENSIONS)
+            else:
+                yield secure_filename(filename), data
+    
+    compact = request.args.get('compact') == '1'
+    
+    def lines(records):
+        for record in records:
+            if 'result' in record:
+                record['result'] = as_response(record['result'], compact)
+            yield dumps_str(record) + '\n'
+    
+    # One JSON object per line as each report finishes, then a throughput summary
+    records = run_batch(items(), create_batch_analyzer, workers=current_app.config['BATCH_WORKERS'],
+                        budget=budget_factory())
+    return Response(
+        stream_with_context(lines(records)),
+        mimetype='application/x-ndjson'
+    )
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = worker_state().job_queue.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    
+    response = {'job_id': job_id, 'status': job['status']}
+    if job['status'] == 'done':
+        response['result'] = job['result']
+    elif job['error']:
+        response['error'] = job['error']
+    # A resource limit ends the job with what was read before it, as on the synchronous path
+    if job['status'] == 'limit':
+        response['limit'] = job['limit']
+        if job['result'] is not None:
+            response['partial_result'] = job['result']
+    return jsonify(response)
+
+def trends_disabled():
+    return jsonify({'error': 'Patient trends are not kept on this server; set TREND_STORE_PATH to enable them'}), 404
+
+@api.route('/patients/<patient_id>/trends', methods=['GET'])
+def patient_trends(patient_id):
+    """Aggregates per analyte, e.g. ?analyte=glucose&analyte=cholesterol; no history is scanned"""
+    trend_store = worker_state().trend_store
+    if trend_store is None:
+        return trends_disabled()
+    trends = trend_store.trends(patient_id, request.args.getlist('analyte'))
+    if not trends:
+        return jsonify({'error': 'No results recorded for this patient'}), 404
+    return jsonify({'patient_id': patient_id, 'trends': trends})
+
+@api.route('/patients/<patient_id>/history/<analyte>', methods=['GET'])
+def patient_history(patient_id, analyte):
+    """Raw observations of one analyte, for charting"""
+    trend_store = worker_state().trend_store
+    if trend_store is None:
+        return trends_disabled()
+    limit = min(request.args.get('limit', 500, type=int), 5000)
+    return jsonify({
+        'patient_id': patient_id,
+        'analyte': analyte,
+        'observations': trend_store.history(patient_id, analyte, limit)
+    })
+
+@api.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    state = worker_state()
+    return jsonify({
+        'status': 'healthy',
+        'pid': state.pid,
+        'cache': state.result_cache.info(),
+        'page_cache': analyzer.page_cache.info(),
+        'model_extractor': analyzer.model_extractor.stats() if analyzer.model_extractor else None,
+        'jobs': state.job_queue.info(),
+        'imports_ms': import_report(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@api.app_errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    """Uploads are cut off while streaming in, as soon as they pass MAX_CONTENT_LENGTH"""
+    LIMIT_REJECTIONS.inc(endpoint=request.url_rule.rule if request.url_rule else 'unmatched', limit='upload')
+    return jsonify({
+        'success': False,
+        'error': f"Upload exceeds the {current_app.config['MAX_CONTENT_LENGTH']} byte limit",
+        'limit': 'upload'
+    }), 413
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition; under gunicorn each worker reports its own counts"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+def create_app(config_class=None):
+    """Application factory; the config class comes from APP_CONFIG/FLASK_ENV unless given"""
+    config_class = config_class or get_config_class()
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    # orjson-backed when installed; also serializes the models.results classes
+    app.json = FastJSONProvider(app)
+    # Let the browser frontend read the opt-in timing header
+    CORS(app, expose_headers=['X-Debug-Timing'])
+    
+    # Uploads are processed from memory; only files above the threshold spool to a temp file
+    app.request_class = make_spooled_request_class(config_class.UPLOAD_SPOOL_THRESHOLD)
+    
+    app.register_blueprint(api)
+    
+    for limit, value in (
+        ('upload_bytes', app.config['MAX_CONTENT_LENGTH'] or 0),
+        ('processing_seconds', app.config['MAX_PROCESSING_TIME']),
+        ('request_memory_bytes', app.config['MAX_REQUEST_MEMORY_MB'] << 20),
+        ('pdf_pages', analyzer.max_pdf_pages),
+        ('image_pixels', analyzer.max_image_pixels)
+    ):
+        RESOURCE_LIMITS.set(value, limit=limit)
+    return app
+
+# Module-level app for `python app.py` and `gunicorn app:app` (see gunicorn.conf.py);
+# ProductionConfig unless APP_CONFIG says otherwise
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server only (APP_CONFIG=development for the debugger); production runs under gunicorn
+    app.logger.info('Lazy import costs (ms, None = not loaded yet): %s', import_report())
+    start_warmup(app.config['WARMUP_MODULES'], delay=app.config['WARMUP_DELAY'])
+    app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""Bulk report ingestion: analyze every report under a directory tree
+
+Writes one NDJSON record per report as it finishes, then a throughput summary:
+    python batch.py ../data/sample_reports --workers 4 > results.ndjson
+"""
+import argparse
+import sys
+from functools import partial
+
+from app import ALLOWED_EXTENSIONS, create_batch_analyzer
+from config import Config
+from models.results import as_response
+from utils.batch import iter_directory, run_batch
+from utils.limits import Budget
+from utils.serialization import dumps_str
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze every report under a directory tree')
+    parser.add_argument('directory', help='Root directory to walk for .txt/.pdf/image reports')
+    parser.add_argument('--workers', type=int, default=Config.BATCH_WORKERS,
+                        help='Worker processes (default: BATCH_WORKERS)')
+    parser.add_argument('--output', '-o', help='NDJSON output file (default: stdout)')
+    parser.add_argument('--compact', action='store_true', help='Leave extracted_text out of each result')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        items = iter_directory(args.directory, ALLOWED_EXTENSIONS)
+        # Each report gets the same time and memory allowance as an upload
+        budget = partial(Budget, Config.MAX_PROCESSING_TIME, Config.MAX_REQUEST_MEMORY_MB << 20)
+        for record in run_batch(items, create_batch_analyzer, workers=args.workers, budget=budget):
+            if 'result' in record:
+                record['result'] = as_response(record['result'], args.compact)
+            output.write(dumps_str(record) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,11 +8,75 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-health-analyzer'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_FILE_SIZE', 10485760))  # 10MB
+    # Uploads up to this size are processed in memory; larger ones spool to a temp file
+    UPLOAD_SPOOL_THRESHOLD = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD', MAX_CONTENT_LENGTH // 2))
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'txt'}
     
     # Medical Analysis Settings
     CONFIDENCE_THRESHOLD = float(os.environ.get('CONFIDENCE_THRESHOLD', 0.8))
-    MAX_PROCESSING_TIME = int(os.environ.get('MAX_PROCESSING_TIME', 30))  # seconds
+    MAX_PROCESSING_TIME = int(os.environ.get('MAX_PROCESSING_TIME', 30))  # seconds, per request and per job
+    # Resource limits, each answered with 413 (or 408 for time) and partial results when possible; 0 disables
+    MAX_PDF_PAGES = int(os.environ.get('MAX_PDF_PAGES', 500))
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50_000_000))  # checked before decoding
+    MAX_REQUEST_MEMORY_MB = int(os.environ.get('MAX_REQUEST_MEMORY_MB', 1024))  # worker RSS growth
+    REFERENCE_RANGES_PATH = os.environ.get('REFERENCE_RANGES_PATH')  # unset uses models/reference_ranges.json
+    
+    # PDF Extraction Settings
+    PDF_PARALLEL_PAGE_THRESHOLD = int(os.environ.get('PDF_PARALLEL_PAGE_THRESHOLD', 40))  # 0 disables
+    PDF_WORKERS = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1))
+    # Pages without a text layer are OCR'd from their scan image, OCR_WORKERS pages at a time
+    PDF_OCR_SCANNED_PAGES = os.environ.get('PDF_OCR_SCANNED_PAGES', 'true').lower() == 'true'
+    # OCR text of scanned pages by image hash, so shared letterhead/cover pages are OCR'd once
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 512))  # entries
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 7 * 24 * 3600))  # seconds
+    PAGE_CACHE_PATH = os.environ.get('PAGE_CACHE_PATH')  # sqlite file, unset keeps memory only
+    # Model-backed extraction for result lines the regex patterns miss ('Haemoglobin 11.2', 'FBS 110');
+    # lines from concurrent requests are classified together, up to MODEL_BATCH_SIZE per call
+    MODEL_EXTRACTOR = os.environ.get('MODEL_EXTRACTOR', 'false').lower() == 'true'
+    MODEL_EXTRACTOR_THRESHOLD = float(os.environ.get('MODEL_EXTRACTOR_THRESHOLD', 0.5))  # min similarity
+    MODEL_BATCH_SIZE = int(os.environ.get('MODEL_BATCH_SIZE', 64))  # lines
+    MODEL_BATCH_WAIT_MS = float(os.environ.get('MODEL_BATCH_WAIT_MS', 1.0))  # max wait for a batch to fill
+    MODEL_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', 65536))  # predictions by normalized label
+
+    # Result Cache Settings
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))  # entries
+    RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 3600))  # seconds
+    RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH')  # sqlite file, unset keeps memory only
+    
+    # Background Job Settings
+    JOB_BACKEND = os.environ.get('JOB_BACKEND', 'process')  # 'process' or 'inprocess'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1))
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 32))
+    # sqlite file shared by all server processes so any worker can answer /jobs/<id>;
+    # unset keeps jobs in the process that took them (ProductionConfig always shares one)
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH')
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+    # Per uploaded zip: reports it may hold, and their total size once decompressed
+    MAX_ARCHIVE_MEMBERS = int(os.environ.get('MAX_ARCHIVE_MEMBERS', 1000))
+    MAX_ARCHIVE_SIZE = int(os.environ.get('MAX_ARCHIVE_SIZE', 200 << 20))  # 200MB
+    # Image OCR: resolution images are normalized to and concurrent tesseract processes per image
+    OCR_TARGET_DPI = int(os.environ.get('OCR_TARGET_DPI', 300))
+    OCR_MAX_SIDE = int(os.environ.get('OCR_MAX_SIDE', 3508))  # A4 at 300 DPI
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+    # Heavy modules to import in the background after startup, e.g. "pytesseract,PIL.Image,cv2"
+    WARMUP_MODULES = [name.strip() for name in os.environ.get('WARMUP_MODULES', '').split(',') if name.strip()]
+    WARMUP_DELAY = float(os.environ.get('WARMUP_DELAY', 1.0))  # seconds
+    # gunicorn: one process per core for CPU-bound parsing, threads for slow uploads and polling
+    WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+    # Patient trends are opt-in, as they keep health data: set TREND_STORE_PATH to a sqlite
+    # file shared by all server processes to record values of uploads with a patient_id.
+    # Unset, patient_id is ignored and the /patients endpoints answer 404. The half-life
+    # weights the rolling mean/slope (older reports count half as much every this many days)
+    TREND_STORE_PATH = os.environ.get('TREND_STORE_PATH') or None
+    TREND_HALF_LIFE_DAYS = float(os.environ.get('TREND_HALF_LIFE_DAYS', 180))
+    # Instrumentation: clients may ask for per-stage timings with an X-Debug-Timing request header
+    # (off in production unless DEBUG_TIMING_HEADER=true)
+    DEBUG_TIMING_HEADER = os.environ.get('DEBUG_TIMING_HEADER', 'true').lower() == 'true'
+    # cProfile dumps of the slowest requests per process; 0 disables profiling
+    PROFILE_SLOWEST = int(os.environ.get('PROFILE_SLOWEST', 0))
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.1))  # fraction of requests
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'health-analyzer-profiles'))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -20,14 +85,28 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
+    # Workers answer each other's job polls however the server is launched
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH') or os.path.join(
+        tempfile.gettempdir(), 'health-analyzer-jobs.sqlite'
+    )
+    # Stage timings tell clients how the server spends its time; opt in explicitly
+    DEBUG_TIMING_HEADER = os.environ.get('DEBUG_TIMING_HEADER', 'false').lower() == 'true'
 
 class TestingConfig(Config):
     TESTING = True
     DEBUG = True
+    JOB_BACKEND = 'inprocess'
+    TREND_STORE_PATH = ':memory:'
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
-    'default': DevelopmentConfig
-}
\ No newline at end of file
+    # Anything that imports app:app without choosing a config gets debugging off
+    'default': ProductionConfig
+}
+
+def get_config_class(name=None):
+    """Config class named by APP_CONFIG (or FLASK_ENV), falling back to the default"""
+    name = name or os.environ.get('APP_CONFIG') or os.environ.get('FLASK_ENV') or 'default'
+    return config.get(name, config['default'])
@@ -0,0 +1,56 @@
+"""gunicorn settings for production serving
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Workers and threads come from Config (WEB_CONCURRENCY / WEB_THREADS, defaulting
+to one worker per CPU). The app is preloaded in the master so the analyzer's
+compiled patterns, reference index and any WARMUP_MODULES are shared by all
+workers copy-on-write instead of being rebuilt per worker.
+
+Nothing here is needed for correctness: the app defaults to ProductionConfig,
+whose JOB_STORE_PATH lets any worker answer a /jobs poll under any launcher.
+"""
+import os
+
+from config import Config
+
+# OCR already runs one tesseract process per core; tesseract's own OpenMP threads would
+# oversubscribe them. Set before the app loads so every worker and job process inherits it
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+workers = Config.WEB_WORKERS
+# Threads keep a worker responsive to uploads and /jobs polling while a request parses
+worker_class = 'gthread'
+threads = Config.WEB_THREADS
+
+preload_app = True
+
+# Requests that run past MAX_PROCESSING_TIME are better served by ?async=1
+timeout = Config.MAX_PROCESSING_TIME + 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so fragmentation from large PDFs and images cannot build up
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    # Runs in the exiting worker (max_requests recycle, shutdown): its jobs die with it,
+    # so record them as failed rather than leave polls on "queued" or "running"
+    from app import abandon_jobs
+
+    abandon_jobs('The server worker restarted before the job finished; submit it again')
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers are forked
+    from utils.lazy import import_report, preload
+
+    preload(Config.WARMUP_MODULES)
+    server.log.info('Lazy import costs before fork (ms): %s', import_report())
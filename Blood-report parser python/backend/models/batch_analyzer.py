@@ -0,0 +1,205 @@
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .results import Alert, AnalysisEntry
+from .units import DECIMALS, Measurement, UnitTable, on_canonical_scale
+
+# Status codes stored in the int8 status matrix
+LOW, NORMAL, HIGH = -1, 0, 1
+STATUS_NAMES = {LOW: 'low', NORMAL: 'normal', HIGH: 'high'}
+
+
+class BatchRangeAnalyzer:
+    """Evaluate many reports against reference ranges with array operations
+
+    Reports are rows and analytes are columns in the order of ``ranges``;
+    missing values are NaN. Reports given as Measurement dicts are converted
+    to canonical units with ``units`` and judged against the lab's printed
+    ranges where there are some, with array operations as well.
+    """
+
+    def __init__(self, ranges: Dict[str, Dict], risk_factors: Optional[Dict[str, float]] = None,
+                 units: Optional[UnitTable] = None):
+        self.ranges = ranges
+        self.units = units
+        self.analytes = list(ranges)
+        self.columns = {name: i for i, name in enumerate(self.analytes)}
+        self.mins = np.array([ranges[name]['min'] for name in self.analytes], dtype=float)
+        self.maxs = np.array([ranges[name]['max'] for name in self.analytes], dtype=float)
+
+        # Strings shared by every per-report entry, formatted once
+        self.range_labels = [
+            f"{ranges[name]['min']}-{ranges[name]['max']} {ranges[name]['unit']}"
+            for name in self.analytes
+        ]
+
+        risk_factors = risk_factors or {}
+        self.risk_weights = np.array([risk_factors.get(name, 0.0) for name in self.analytes])
+        self.glucose_column = self.columns.get('glucose')
+
+    def to_matrix(self, reports) -> np.ndarray:
+        """Align reports (2-D array, DataFrame or iterable of lab_values dicts) to the analyte columns"""
+        return self.to_matrices(reports)[0]
+
+    def to_matrices(self, reports) -> Tuple[np.ndarray, Optional[np.ndarray],
+                                            Optional[np.ndarray], Optional[np.ndarray]]:
+        """(values, units, printed lows, printed highs) aligned to the analyte columns
+
+        The last three are None unless some report holds Measurement values;
+        absent units are '' and absent range ends NaN. Filling the matrices
+        from dicts takes one Python step per value, as for plain floats; the
+        unit conversion and range checks after it are whole-array.
+        """
+        if isinstance(reports, np.ndarray):
+            matrix = np.asarray(reports, dtype=float)
+            if matrix.ndim != 2 or matrix.shape[1] != len(self.analytes):
+                raise ValueError(f"Expected an (N, {len(self.analytes)}) array, got {matrix.shape}")
+            return matrix, None, None, None
+
+        if hasattr(reports, 'reindex'):
+            # pandas DataFrame: unknown columns dropped, missing ones filled with NaN
+            return reports.reindex(columns=self.analytes).to_numpy(dtype=float), None, None, None
+
+        reports = list(reports)
+        shape = (len(reports), len(self.analytes))
+        matrix = np.full(shape, np.nan)
+        units = lows = highs = None
+        columns = self.columns
+        for row, lab_values in enumerate(reports):
+            for test, value in lab_values.items():
+                column = columns.get(test)
+                if column is None:
+                    continue
+                if isinstance(value, Measurement):
+                    if units is None:
+                        units = np.full(shape, '', dtype=object)
+                        lows, highs = np.full(shape, np.nan), np.full(shape, np.nan)
+                    value, units[row, column], low, high = value
+                    if low is not None:
+                        lows[row, column] = low
+                    if high is not None:
+                        highs[row, column] = high
+                matrix[row, column] = value
+        return matrix, units, lows, highs
+
+    def evaluate(self, reports) -> 'BatchAnalysis':
+        """Compute status and alert masks for every report in one pass over the matrix"""
+        values, units, lows, highs = self.to_matrices(reports)
+        unit_unknown = None
+        if units is not None and self.units is not None:
+            # One factor lookup per distinct unit per column; the printed ranges scale alike
+            factors = self.units.factor_matrix(self.analytes, units)
+            # A unit the table does not know, or none next to a range off the canonical
+            # scale: value and range are kept as printed, judged only against each other
+            with np.errstate(invalid='ignore'):
+                off_scale = (units == '') & ~np.isnan(highs) & ~on_canonical_scale(highs, self.maxs)
+            unit_unknown = np.isnan(factors) | off_scale
+            factors = np.where(unit_unknown, 1.0, factors)
+            converted = factors != 1.0
+            values = np.where(converted, np.round(values * factors, DECIMALS), values)
+            lows = np.where(converted, np.round(lows * factors, DECIMALS), lows)
+            highs = np.where(converted, np.round(highs * factors, DECIMALS), highs)
+        return BatchAnalysis(self, values, lows, highs, units, unit_unknown)
+
+
+class BatchAnalysis:
+    """Vectorized results; per-report dicts are only built when asked for"""
+
+    def __init__(self, analyzer: BatchRangeAnalyzer, values: np.ndarray,
+                 lows: Optional[np.ndarray] = None, highs: Optional[np.ndarray] = None,
+                 units: Optional[np.ndarray] = None, unit_unknown: Optional[np.ndarray] = None):
+        self.analyzer = analyzer
+        self.values = values
+        self.present = ~np.isnan(values)
+        mins, maxs = analyzer.mins, analyzer.maxs
+        self.lows, self.highs, self.units = lows, highs, units
+        self.lab_range = None
+        self.unit_unknown = unit_unknown
+        if lows is not None:
+            # A printed range replaces the reference one; a missing end ('< 200') is open
+            self.lab_range = ~np.isnan(lows) | ~np.isnan(highs)
+            mins = np.where(self.lab_range, np.nan_to_num(lows, nan=-np.inf), mins)
+            maxs = np.where(self.lab_range, np.nan_to_num(highs, nan=np.inf), maxs)
+        if unit_unknown is not None:
+            # Without a printed range nothing can judge a value in an unknown unit
+            self.present &= ~unit_unknown | self.lab_range
+        self.status = np.where(
+            values < mins, LOW,
+            np.where(values > maxs, HIGH, NORMAL)
+        ).astype(np.int8)
+        self.alert_mask = self.present & (self.status != NORMAL)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __iter__(self) -> Iterator[Tuple[Dict, List[Dict]]]:
+        for row in range(len(self)):
+            yield self.report(row)
+
+    @property
+    def abnormal_counts(self) -> np.ndarray:
+        return self.alert_mask.sum(axis=1)
+
+    @property
+    def total_counts(self) -> np.ndarray:
+        return self.present.sum(axis=1)
+
+    def risk_scores(self) -> Dict[str, np.ndarray]:
+        """Vectorized AdvancedHealthAnalyzer.calculate_risk_score for every report
+
+        Range evaluation only yields low/normal/high, so the borderline
+        weights of the scalar version never apply here.
+        """
+        high = self.present & (self.status == HIGH)
+        if self.unit_unknown is not None:
+            high &= ~self.unit_unknown
+        cv_risk = high @ (self.analyzer.risk_weights * 3)
+
+        diabetes_risk = np.zeros(len(self))
+        if self.analyzer.glucose_column is not None:
+            diabetes_risk = high[:, self.analyzer.glucose_column] * 0.5
+
+        return {
+            'cardiovascular_risk': np.minimum(cv_risk * 100, 100),
+            'diabetes_risk': np.minimum(diabetes_risk * 100, 100),
+            'overall_risk': np.minimum((cv_risk + diabetes_risk) * 50, 100)
+        }
+
+    def report(self, row: int) -> Tuple[Dict, List[Dict]]:
+        """Build the (analysis, alerts) pair that analyze_values returns, for one report"""
+        analyzer = self.analyzer
+        analysis = {}
+        alerts = []
+
+        for column in np.flatnonzero(self.present[row]):
+            test = analyzer.analytes[column]
+            value = float(self.values[row, column])
+            status = STATUS_NAMES[int(self.status[row, column])]
+
+            if status != 'normal':
+                alerts.append(Alert(test, value, status))
+
+            unit_unknown = self.unit_unknown is not None and bool(self.unit_unknown[row, column])
+            analysis[test] = AnalysisEntry(value, status, self.range_label(row, column), unit_unknown)
+
+        return analysis, alerts
+
+    def range_label(self, row: int, column: int) -> str:
+        """The lab's printed range when the report had one, else the shared reference label"""
+        if self.lab_range is None or not self.lab_range[row, column]:
+            return self.analyzer.range_labels[column]
+        low, high = float(self.lows[row, column]), float(self.highs[row, column])
+        if self.unit_unknown is not None and self.unit_unknown[row, column]:
+            unit = self.units[row, column]
+        else:
+            unit = self.analyzer.ranges[self.analyzer.analytes[column]]['unit']
+        label = f"<{high:g} {unit}" if np.isnan(low) else f"{low:g}-{high:g} {unit}"
+        return label.rstrip()
+
+    def to_frame(self):
+        """Status names as a pandas DataFrame (NaN where the analyte was not reported)"""
+        import pandas as pd
+
+        names = np.array(['low', 'normal', 'high'], dtype=object)[self.status + 1]
+        names[~self.present] = None
+        return pd.DataFrame(names, columns=self.analyzer.analytes)
@@ -0,0 +1,167 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from .units import VALUE_TAIL, Measurement
+
+# Canonical analyte names mapped to the spellings seen in lab reports
+ANALYTE_ALIASES = {
+    'cholesterol': ['cholesterol', 'chol', 'total cholesterol'],
+    'glucose': ['glucose', 'sugar', 'blood sugar', 'fasting glucose'],
+    'hemoglobin': ['hemoglobin', 'hgb', 'hb'],
+    'blood_pressure_systolic': ['systolic', 'systolic bp', 'sys'],
+    'blood_pressure_diastolic': ['diastolic', 'diastolic bp', 'dia'],
+    'bmi': ['bmi', 'body mass index'],
+    'creatinine': ['creatinine', 'creat'],
+    'triglycerides': ['triglycerides', 'trig']
+}
+
+# Terms from the original per-test patterns, matched anywhere like before
+PRIMARY_TERMS = {
+    'cholesterol': 'cholesterol',
+    'glucose': 'glucose',
+    'hemoglobin': 'hemoglobin',
+    'bmi': 'bmi',
+    'weight': 'weight',
+    'height': 'height',
+    'white_blood_cells': 'white blood cells'
+}
+
+# Output order of lab_values, kept stable regardless of where values appear
+ANALYTE_ORDER = (
+    'cholesterol', 'glucose', 'hemoglobin',
+    'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'bmi', 'weight', 'height', 'white_blood_cells',
+    'creatinine', 'triglycerides'
+)
+
+BLOOD_PRESSURE_PATTERN = re.compile(r'blood pressure[:\s]*(\d+)/(\d+)')
+
+# Aliases must start a word so 'dia' does not match inside 'media'
+BOUNDED_TERMS = frozenset(
+    variation
+    for variations in ANALYTE_ALIASES.values()
+    for variation in variations
+) - frozenset(PRIMARY_TERMS.values())
+
+
+def _analyte_terms(analyte: str) -> List[str]:
+    """Collect the spellings for an analyte, dropping ones already covered by a suffix"""
+    terms = set(ANALYTE_ALIASES.get(analyte, []))
+    if analyte in PRIMARY_TERMS:
+        terms.add(PRIMARY_TERMS[analyte])
+
+    # 'total cholesterol: 220' is found through 'cholesterol: 220' with the same value,
+    # and keeping the alternation on one initial letter lets re use its prefix search
+    kept = [
+        term for term in terms
+        if not any(term != other and term.endswith(' ' + other) for other in terms)
+    ]
+    return sorted(kept, key=len, reverse=True)
+
+
+def _compile_analyte(terms: List[str]) -> Pattern:
+    alternation = '|'.join(re.escape(term) for term in terms)
+    # The unit and printed range after the value are bound in the same match
+    return re.compile(r'(?P<term>' + alternation + r')[:\s]*(?P<value>\d+\.?\d*)' + VALUE_TAIL)
+
+
+# Compiled once at import; blood pressure comes first so a paired reading
+# takes precedence over standalone systolic/diastolic lines on the same page
+ANALYTE_PATTERNS = {'blood_pressure': BLOOD_PRESSURE_PATTERN}
+ANALYTE_PATTERNS.update(
+    (analyte, _compile_analyte(_analyte_terms(analyte)))
+    for analyte in ANALYTE_ORDER
+)
+
+
+def _search_term(pattern: Pattern, text: str) -> Optional['re.Match']:
+    match = pattern.search(text)
+    while (match and match.start() and match.group('term') in BOUNDED_TERMS
+           and text[match.start() - 1].isalnum()):
+        match = pattern.search(text, match.start() + 1)
+    return match
+
+
+def order_values(lab_values: Dict) -> Dict:
+    """Lab values (or measurements) in the canonical analyte order used in responses"""
+    return {name: lab_values[name] for name in ANALYTE_ORDER if name in lab_values}
+
+
+class LabValueExtractor:
+    """Extract the first value of each tracked analyte with precompiled patterns
+
+    The *_measurements methods also return the unit and the lab's printed
+    range read from the value's row, as Measurement tuples.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, Pattern]] = None):
+        self.patterns = patterns or ANALYTE_PATTERNS
+
+    def extract(self, text: str) -> Dict[str, float]:
+        """Extract lab values from a complete document"""
+        return self.extract_pages((text,))
+
+    def extract_pages(self, pages: Iterable[str]) -> Dict[str, float]:
+        """Extract lab values from text chunks, stopping once every analyte is resolved"""
+        return {test: measurement.value for test, measurement in self.extract_page_measurements(pages).items()}
+
+    def iter_page_values(self, pages: Iterable[str]) -> Iterator[Tuple[int, Dict[str, float]]]:
+        """Yield (page index, values first found on that page) for every page read"""
+        for number, found in self.iter_page_measurements(pages):
+            yield number, {test: measurement.value for test, measurement in found.items()}
+
+    def extract_measurements(self, text: str) -> Dict[str, Measurement]:
+        """Measurements from a complete document"""
+        return self.extract_page_measurements((text,))
+
+    def extract_page_measurements(self, pages: Iterable[str]) -> Dict[str, Measurement]:
+        """Measurements from text chunks, stopping once every analyte is resolved"""
+        lab_values = {}
+        pending = list(self.patterns.items())
+        for page in pages:
+            pending = self._scan(page.lower(), pending, lab_values)
+            if not pending:
+                break
+        return order_values(lab_values)
+
+    def iter_page_measurements(self, pages: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Measurement]]]:
+        """Yield (page index, measurements first found on that page) for every page read
+
+        No further page is pulled once every analyte is resolved.
+        """
+        lab_values = {}
+        pending = list(self.patterns.items())
+
+        for number, page in enumerate(pages):
+            known = len(lab_values)
+            pending = self._scan(page.lower(), pending, lab_values)
+            # Values are only ever added, so the new ones are at the end
+            yield number, dict(list(lab_values.items())[known:])
+            if not pending:
+                return
+
+    def _scan(self, text: str, pending: List[Tuple[str, Pattern]],
+              lab_values: Dict[str, Measurement]) -> List[Tuple[str, Pattern]]:
+        """Search the pending analytes in one lowercased page; return those still pending"""
+        return [
+            (name, pattern) for name, pattern in pending
+            if not self._resolve(name, pattern, text, lab_values)
+        ]
+
+    def _resolve(self, name: str, pattern: Pattern, text: str,
+                 lab_values: Dict[str, Measurement]) -> bool:
+        """Search one analyte in text; return True once it needs no further scanning"""
+        if name == 'blood_pressure':
+            match = pattern.search(text)
+            if match:
+                lab_values.setdefault('blood_pressure_systolic', Measurement(float(match.group(1))))
+                lab_values.setdefault('blood_pressure_diastolic', Measurement(float(match.group(2))))
+            return match is not None
+
+        if name in lab_values:
+            return True
+
+        match = _search_term(pattern, text)
+        if match:
+            lab_values[name] = Measurement.from_match(match)
+        return match is not None
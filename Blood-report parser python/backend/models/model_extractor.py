@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.microbatch import MicroBatcher, run_batched
+from .extractor import ANALYTE_ORDER
+from .units import VALUE_TAIL, Measurement
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(__file__), 'analyte_vocabulary.json')
+
+# Exemplars that name something other than a tracked analyte (HbA1c, LDL, dates...)
+OTHER = 'other'
+
+# Hashed feature space: character 2-4 grams of the padded label plus whole words
+FEATURES = 1 << 12
+NGRAM_SIZES = (2, 3, 4)
+
+# A result line: a label, then the first number that neither continues a word ('T3',
+# 'HbA1c') nor starts a printed reference range ('12.0-15.5'), then its unit and
+# range as in the rule patterns; one pass over the lowercased text
+RESULT_LINE_PATTERN = re.compile(
+    r'^(?P<label>[^\d\n]*(?:(?<=[^\W\d_])\d+[^\d\n]*)*)(?<![\w.])(?P<value>\d+(?:\.\d+)?)(?!\.?\d)'
+    r'(?![ \t]*[-–][ \t]*\d)' + VALUE_TAIL,
+    re.MULTILINE
+)
+LABEL_CLEAN_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# Blood pressure is a paired reading only the rule engine resolves
+MODEL_ANALYTES = tuple(name for name in ANALYTE_ORDER if not name.startswith('blood_pressure'))
+
+
+def _features(label: str) -> Dict[int, float]:
+    padded = f' {label} '
+    counts = {}
+    grams = [padded[start:start + size] for size in NGRAM_SIZES for start in range(len(padded) - size + 1)]
+    grams.extend('w:' + word for word in label.split())
+    for gram in grams:
+        index = zlib.crc32(gram.encode('utf-8')) & (FEATURES - 1)
+        counts[index] = counts.get(index, 0.0) + 1.0
+    return counts
+
+
+def vectorize(labels: Sequence[str]) -> np.ndarray:
+    """L2-normalised hashed n-gram vectors, one row per label"""
+    matrix = np.zeros((len(labels), FEATURES), dtype=np.float32)
+    for row, label in enumerate(labels):
+        for index, count in _features(label).items():
+            matrix[row, index] = count
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-6)
+
+
+def iter_result_lines(text: str) -> Iterator[Tuple[str, Measurement]]:
+    """(normalised label, measurement) for each lowercased line like 'haemoglobin (hb) 11.2 g/dl 13.5-17.5'"""
+    for match in RESULT_LINE_PATTERN.finditer(text):
+        label = LABEL_CLEAN_PATTERN.sub(' ', match.group('label')).strip()
+        if label:
+            yield label, Measurement.from_match(match)
+
+
+class LineClassifier:
+    """Nearest-exemplar classifier over hashed character n-grams
+
+    Each label is compared by cosine similarity with every spelling in the
+    vocabulary in one matrix product. The closest spelling's analyte wins if
+    it is similar enough; spellings listed under 'other' (HbA1c, LDL
+    cholesterol, report IDs...) make near misses resolve to nothing.
+    """
+
+    def __init__(self, analytes: Dict[str, List[str]], other: Iterable[str] = (), threshold: float = 0.5):
+        exemplars = [(analyte, spelling) for analyte, spellings in analytes.items() for spelling in spellings]
+        exemplars.extend((OTHER, spelling) for spelling in other)
+        self.classes = [analyte for analyte, _ in exemplars]
+        self.threshold = threshold
+        self.exemplars = vectorize([LABEL_CLEAN_PATTERN.sub(' ', spelling.lower()).strip()
+                                    for _, spelling in exemplars])
+        digest = hashlib.sha1(json.dumps([exemplars, threshold, FEATURES]).encode('utf-8'))
+        self.version = digest.hexdigest()[:12]
+
+    @classmethod
+    def from_file(cls, path: str, threshold: float = 0.5) -> 'LineClassifier':
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        return cls(data['analytes'], data.get('other', ()), threshold)
+
+    def predict(self, labels: Sequence[str]) -> List[Optional[str]]:
+        """Analyte named by each label, or None
+
+        When the whole label matches nothing closely, its last one to three
+        words are tried, so a short name after running text ('measured tg')
+        is still found. A close whole-label match always wins, so 'mean
+        corpuscular hemoglobin' stays 'other' rather than 'hemoglobin'.
+        """
+        if not labels:
+            return []
+        windows, counts = [], []
+        for label in labels:
+            words = label.split()
+            candidates = list(dict.fromkeys([label] + [' '.join(words[-size:]) for size in (1, 2, 3)]))
+            windows.extend(candidates)
+            counts.append(len(candidates))
+        similarity = vectorize(windows) @ self.exemplars.T
+        best = similarity.argmax(axis=1)
+        scores = similarity[np.arange(len(windows)), best]
+
+        predictions, start = [], 0
+        for count in counts:
+            # The whole label comes first in its windows
+            if scores[start] >= self.threshold:
+                chosen = start
+            else:
+                chosen = start + 1 + int(scores[start + 1:start + count].argmax()) if count > 1 else start
+            analyte = self.classes[best[chosen]] if scores[chosen] >= self.threshold else None
+            predictions.append(None if analyte == OTHER else analyte)
+            start += count
+        return predictions
+
+
+class ModelExtractor:
+    """Fill analytes the rule patterns missed from lines the model recognises
+
+    Only lines that carry a value are classified, and only for analytes
+    still missing after the regex pass. Predictions are cached by the
+    normalised label, so the spellings a lab prints on every report are
+    classified once per worker. Cache misses go through the batcher, which
+    shares one model call between concurrent requests.
+    """
+
+    def __init__(self, classifier: LineClassifier, batcher: Optional[MicroBatcher] = None,
+                 cache_size: int = 65536):
+        self.classifier = classifier
+        self.batcher = batcher
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> str:
+        return self.classifier.version
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+    def classify(self, labels: Sequence[str]) -> List[Optional[str]]:
+        """Analyte for each label, from the cache or a (batched) model call"""
+        found, missing = {}, []
+        with self._lock:
+            for label in labels:
+                if label in found:
+                    continue
+                if label in self._cache:
+                    self._cache.move_to_end(label)
+                    found[label] = self._cache[label]
+                    self.hits += 1
+                else:
+                    found[label] = None
+                    missing.append(label)
+                    self.misses += 1
+
+        if missing:
+            predicted = run_batched(self.batcher, self.classifier.predict, missing)
+            with self._lock:
+                for label, analyte in zip(missing, predicted):
+                    found[label] = analyte
+                    self._cache[label] = analyte
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [found[label] for label in labels]
+
+    def fill_missing(self, text: str, lab_values: Dict) -> Dict[str, Measurement]:
+        """Measurements for analytes absent from lab_values, first occurrence in the text wins"""
+        if all(name in lab_values for name in MODEL_ANALYTES):
+            return {}
+        candidates = list(iter_result_lines(text.lower()))
+        if not candidates:
+            return {}
+
+        found = {}
+        for (_, measurement), analyte in zip(candidates, self.classify([label for label, _ in candidates])):
+            if analyte and analyte not in lab_values and analyte not in found:
+                found[analyte] = measurement
+        return found
+
+
+_default_extractor = None
+_default_lock = threading.Lock()
+
+
+def default_model_extractor(path: Optional[str] = None, threshold: float = 0.5, batch_size: int = 64,
+                            batch_wait: float = 0.001, cache_size: int = 65536) -> ModelExtractor:
+    """Process-wide extractor; the model is built on first use and shared by every request
+
+    Built before a fork it is inherited by the workers; the batcher starts
+    its thread in each process on first use.
+    """
+    global _default_extractor
+    with _default_lock:
+        if _default_extractor is None:
+            classifier = LineClassifier.from_file(path or DEFAULT_VOCABULARY_PATH, threshold)
+            batcher = MicroBatcher(classifier.predict, max_batch_size=batch_size, max_wait=batch_wait,
+                                   name='analyte_classifier')
+            _default_extractor = ModelExtractor(classifier, batcher, cache_size)
+    return _default_extractor
@@ -1,10 +1,12 @@
-import cv2     # pip install opencv-python
-import numpy as np
-from PIL import Image, ImageEnhance
-import pytesseract
-import pandas as pd
 import re
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.image_ocr import preprocess_image
+from utils.lazy import lazy_import
+from .tables import ROW_PATTERN, TableExtractor
+from .terminology import default_index
+
+# PIL is imported on the first image, not when the parser is
+Image = lazy_import('PIL.Image')
 
 class DocumentParser:
     def __init__(self):
@@ -13,59 +15,26 @@ class DocumentParser:
             'blood_pressure': r'(?:blood\s*pressure|bp)[:\s]*(\d+)[/\-](\d+)',
             'date': r'(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})',
             'range': r'(\d+\.?\d*)\s*[-–]\s*(\d+\.?\d*)',
-            'table_row': r'([A-Za-z\s]+)\s+(\d+\.?\d*)\s+([A-Za-z/μ%]*)\s+([A-Za-z\s]*)'
+            'table_row': ROW_PATTERN.pattern
         }
+        self.table_extractor = TableExtractor()
+        self.terminology = default_index()
 
-    def preprocess_image(self, image_path: str) -> Image:
+    def preprocess_image(self, image_path: str) -> 'Image.Image':
         """Enhance image for better OCR results"""
-        # Read image
-        img = cv2.imread(image_path)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply denoising
-        denoised = cv2.fastNlMeansDenoising(gray)
-        
-        # Enhance contrast
-        enhanced = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8)).apply(denoised)
+        # Decode at OCR resolution, then denoise and equalize contrast in place
+        enhanced = preprocess_image(image_path)
         
         # Convert back to PIL Image
         return Image.fromarray(enhanced)
 
-    def extract_tables(self, text: str) -> List[Dict]:
+    def extract_tables(self, text: str) -> List[List[Dict]]:
         """Extract tabular data from text"""
-        tables = []
-        lines = text.split('\n')
-        
-        current_table = []
-        in_table = False
-        
-        for line in lines:
-            # Detect table headers or structured data
-            if re.search(r'\b(test|parameter|value|normal|range)\b', line.lower()):
-                in_table = True
-                current_table = []
-                continue
-            
-            if in_table:
-                # Check if line contains structured data
-                match = re.search(self.medical_patterns['table_row'], line)
-                if match:
-                    current_table.append({
-                        'test': match.group(1).strip(),
-                        'value': float(match.group(2)),
-                        'unit': match.group(3) or '',
-                        'status': match.group(4) or ''
-                    })
-                elif len(line.strip()) == 0:
-                    # End of table
-                    if current_table:
-                        tables.append(current_table)
-                        current_table = []
-                    in_table = False
-        
-        return tables
+        return self.table_extractor.extract(text)
+
+    def iter_table_rows(self, text: str) -> Iterator[Tuple[int, Dict]]:
+        """Yield (table number, row) pairs incrementally"""
+        return self.table_extractor.iter_rows(text)
 
     def extract_medical_entities(self, text: str) -> Dict:
         """Extract medical entities and their values"""
@@ -93,22 +62,5 @@ class DocumentParser:
 
     def normalize_entity_name(self, name: str) -> Optional[str]:
         """Normalize entity names to standard medical terminology"""
-        name = name.lower().strip()
-        
-        # Mapping dictionary for common variations
-        mappings = {
-            'cholesterol': ['cholesterol', 'chol', 'total cholesterol'],
-            'glucose': ['glucose', 'sugar', 'blood sugar', 'fasting glucose'],
-            'hemoglobin': ['hemoglobin', 'hgb', 'hb'],
-            'blood_pressure_systolic': ['systolic', 'systolic bp', 'sys'],
-            'blood_pressure_diastolic': ['diastolic', 'diastolic bp', 'dia'],
-            'bmi': ['bmi', 'body mass index'],
-            'creatinine': ['creatinine', 'creat'],
-            'triglycerides': ['triglycerides', 'trig']
-        }
-        
-        for standard_name, variations in mappings.items():
-            if any(variation in name for variation in variations):
-                return standard_name
-        
-        return None
\ No newline at end of file
+        # One pass over the name through the shared alias/keyword automaton
+        return self.terminology.resolve(name).analyte
@@ -0,0 +1,100 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), 'recommendations.json')
+
+# Category used by rule sets that return one flat list
+DEFAULT_CATEGORY = 'general'
+
+
+class RuleSet:
+    """Recommendation rules compiled to bitmasks over (test, status) states
+
+    Every distinct (test, status) pair and risk threshold named by a rule
+    gets one bit. A report is reduced to the mask of states it has, and the
+    recommendations for a mask are computed once (rule order, duplicates
+    dropped) and kept in a bounded LRU, so repeated combinations are a
+    single lookup and the output order never varies.
+    """
+
+    def __init__(self, rules: List[Dict], categories: Optional[List[str]] = None,
+                 default: Optional[List[str]] = None, cache_size: int = 1024):
+        self.categories = tuple(categories or [DEFAULT_CATEGORY])
+        self.default = tuple(default or ())
+        self.state_bits = {}
+        self.risk_bits = {}
+        # (category, rule mask, advice) in table order
+        self.rules = []
+        for rule in rules:
+            mask = 0
+            for test, statuses in rule.get('when', {}).items():
+                for status in statuses:
+                    mask |= self._bit(self.state_bits, (test, status))
+            for risk, threshold in rule.get('when_risk', {}).items():
+                mask |= self._bit(self.risk_bits, (risk, threshold))
+            category = rule.get('category', DEFAULT_CATEGORY)
+            if category not in self.categories:
+                raise ValueError(f"Rule category {category!r} is not one of {self.categories}")
+            self.rules.append((category, mask, tuple(rule['advice'])))
+        self.lookup = lru_cache(maxsize=cache_size)(self._compile)
+
+    def _bit(self, bits: Dict[Tuple, int], key: Tuple) -> int:
+        if key not in bits:
+            bits[key] = 1 << (len(self.state_bits) + len(self.risk_bits))
+        return bits[key]
+
+    def mask(self, states: Iterable[Tuple[str, str]], risk_scores: Optional[Dict[str, float]] = None) -> int:
+        """Bitmask of the (test, status) states and exceeded risk thresholds the rules know about"""
+        state_bits = self.state_bits
+        mask = 0
+        for state in states:
+            mask |= state_bits.get(state, 0)
+        if risk_scores:
+            for (risk, threshold), bit in self.risk_bits.items():
+                if risk_scores.get(risk, 0) > threshold:
+                    mask |= bit
+        return mask
+
+    def _compile(self, mask: int) -> Dict[str, Tuple[str, ...]]:
+        found = {category: [] for category in self.categories}
+        seen = {category: set() for category in self.categories}
+        for category, rule_mask, advice in self.rules:
+            if rule_mask & mask:
+                for line in advice:
+                    if line not in seen[category]:
+                        seen[category].add(line)
+                        found[category].append(line)
+        return {category: tuple(lines) for category, lines in found.items()}
+
+    def recommend(self, states: Iterable[Tuple[str, str]],
+                  risk_scores: Optional[Dict[str, float]] = None) -> Dict[str, Tuple[str, ...]]:
+        """Ordered, deduplicated recommendations per category; shared tuples, do not mutate"""
+        return self.lookup(self.mask(states, risk_scores))
+
+    def recommend_flat(self, states: Iterable[Tuple[str, str]]) -> Tuple[str, ...]:
+        """Recommendations of a single-category rule set, or the defaults when no rule fires"""
+        found = self.recommend(states)[self.categories[0]]
+        return found or self.default
+
+
+def load_rule_sets(path: str = DEFAULT_RULES_PATH) -> Dict[str, RuleSet]:
+    """Compile every rule set in a recommendations file"""
+    with open(path, encoding='utf-8') as file:
+        table = json.load(file)
+    return {
+        name: RuleSet(spec['rules'], spec.get('categories'), spec.get('default'))
+        for name, spec in table.items()
+    }
+
+
+_default_rule_sets = None
+
+
+def default_rule_sets(path: Optional[str] = None) -> Dict[str, RuleSet]:
+    """Process-wide rule sets, compiled on first use from path or the bundled recommendations.json"""
+    global _default_rule_sets
+    if _default_rule_sets is None:
+        _default_rule_sets = load_rule_sets(path or DEFAULT_RULES_PATH)
+    return _default_rule_sets
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .units import DECIMALS, Measurement, UnitTable, on_canonical_scale
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANGES_PATH = os.path.join(os.path.dirname(__file__), 'reference_ranges.json')
+
+SEXES = ('male', 'female')
+# Spellings read as a sex, lowercased; anything else ('fe', 'ma', 'other') is unspecified
+SEX_NAMES = {'m': 'male', 'male': 'male', 'f': 'female', 'female': 'female'}
+MAX_AGE = 130
+
+# Distinct (analyte, unit, printed range) rows remembered per index; a lab prints the same few
+PRINTED_RANGE_CACHE_SIZE = 4096
+
+
+class ReferenceRange(NamedTuple):
+    """One compiled reference interval; immutable and tuple-backed"""
+    analyte: str
+    min: float
+    max: float
+    unit: str
+    display: str
+    sex: Optional[str] = None
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    # False for a lab's printed range the value could not be put in the canonical unit for
+    unit_known: bool = True
+
+    def status(self, value: float) -> str:
+        if value < self.min:
+            return 'low'
+        if value > self.max:
+            return 'high'
+        return 'normal'
+
+
+def normalize_sex(sex: Optional[str]) -> Optional[str]:
+    """Map 'M', 'Male', 'f', 'FEMALE' onto 'male'/'female'; anything else means unspecified"""
+    if not sex:
+        return None
+    return SEX_NAMES.get(sex.strip().lower())
+
+
+def _specificity(row: ReferenceRange) -> int:
+    return (2 if row.sex else 0) + (1 if row.age_min is not None or row.age_max is not None else 0)
+
+
+def _covers_age(row: ReferenceRange, age: int) -> bool:
+    return ((row.age_min is None or age >= row.age_min)
+            and (row.age_max is None or age <= row.age_max))
+
+
+class ReferenceIndex:
+    """Reference ranges compiled for O(1) lookup by analyte, sex and age
+
+    Every (analyte, sex) pair is resolved ahead of time to a default range
+    and a per-year age table, so lookups never scan rows.
+    """
+
+    __slots__ = ('digest', 'units', '_lookup', '_panels', '_printed')
+
+    def __init__(self, data: Dict, digest: str = ''):
+        self.digest = digest
+        rows = [self._compile_row(raw) for raw in data.get('ranges', [])]
+
+        by_analyte = {}
+        for row in rows:
+            by_analyte.setdefault(row.analyte, []).append(row)
+
+        self._lookup = {}
+        for analyte, candidates in by_analyte.items():
+            for sex in (None,) + SEXES:
+                matching = [row for row in candidates if row.sex in (None, sex)]
+                if not matching:
+                    continue
+                self._lookup[(analyte, sex)] = self._resolve(matching)
+
+        # The first row of an analyte sets its canonical unit
+        canonical = {}
+        for row in rows:
+            canonical.setdefault(row.analyte, row.unit)
+        self.units = UnitTable(canonical, data.get('conversions', {}))
+        self._printed = {}
+
+        # Legacy name -> {'min', 'max', 'unit'} views, e.g. 'hemoglobin_male' in extended
+        self._panels = {}
+        for raw, row in zip(data.get('ranges', []), rows):
+            name = f"{row.analyte}_{row.sex}" if row.sex else row.analyte
+            for panel in raw.get('panels', ()):
+                self._panels.setdefault(panel, {})[name] = {
+                    'min': row.min, 'max': row.max, 'unit': row.unit
+                }
+
+    @staticmethod
+    def _compile_row(raw: Dict) -> ReferenceRange:
+        return ReferenceRange(
+            analyte=raw['analyte'],
+            min=raw['min'],
+            max=raw['max'],
+            unit=raw.get('unit', ''),
+            display=f"{raw['min']}-{raw['max']} {raw.get('unit', '')}",
+            sex=normalize_sex(raw.get('sex')),
+            age_min=raw.get('age_min'),
+            age_max=raw.get('age_max')
+        )
+
+    @staticmethod
+    def _resolve(rows: List[ReferenceRange]) -> Tuple[ReferenceRange, Optional[Tuple]]:
+        ageless = [row for row in rows if row.age_min is None and row.age_max is None]
+        default = max(ageless or rows, key=_specificity)
+        if len(ageless) == len(rows):
+            return default, None
+
+        ages = []
+        for age in range(MAX_AGE + 1):
+            covering = [row for row in rows if _covers_age(row, age)]
+            ages.append(max(covering, key=_specificity) if covering else default)
+        return default, tuple(ages)
+
+    def lookup(self, analyte: str, sex: Optional[str] = None,
+               age: Optional[float] = None) -> Optional[ReferenceRange]:
+        """Most specific range for the analyte, or None when it has no reference data"""
+        resolved = self._lookup.get((analyte, sex)) or self._lookup.get((analyte, None))
+        if resolved is None:
+            return None
+        default, ages = resolved
+        if age is None or ages is None:
+            return default
+        return ages[min(max(int(age), 0), MAX_AGE)]
+
+    def conversion_factor(self, analyte: str, unit: str) -> Optional[float]:
+        """Multiplier from unit to the analyte's canonical unit (1.0 if already canonical)"""
+        return self.units.factor(analyte, unit)
+
+    def normalize(self, analyte: str, measurement: Measurement) -> Tuple[float, Optional[ReferenceRange], bool]:
+        """Value in the canonical unit, the lab's printed range as a ReferenceRange when the row had one,
+        and whether the value's unit is known
+
+        A value in a unit that is not known for the analyte, or printed without
+        a unit next to a range that does not fit the canonical one, is kept as
+        printed and reported with unit_known False; its printed range, if any,
+        keeps the printed unit (none when there was none) and unit_known False.
+        """
+        if not measurement.unit and measurement.high is None:
+            # As printed before units were read: canonical, no lab range
+            return measurement.value, None, True
+        key = (analyte, measurement.unit, measurement.low, measurement.high)
+        printed = self._printed.get(key)
+        if printed is None:
+            printed = self._printed_range(analyte, measurement)
+            if len(self._printed) < PRINTED_RANGE_CACHE_SIZE:
+                self._printed[key] = printed
+        factor, lab_range, unit_known = printed
+        value = measurement.value if factor == 1.0 else round(measurement.value * factor, DECIMALS)
+        return value, lab_range, unit_known
+
+    def _printed_range(self, analyte: str, measurement: Measurement) -> Tuple[float, Optional[ReferenceRange], bool]:
+        factor = self.units.factor(analyte, measurement.unit)
+        if factor is None or (not measurement.unit and not self._on_canonical_scale(analyte, measurement.high)):
+            # Left as printed: only the lab's own range can judge the value
+            return 1.0, self._range(analyte, measurement.low, measurement.high, measurement.unit, False), False
+        _, low, high, unit = self.units.scale(analyte, measurement)
+        return factor, self._range(analyte, low, high, unit, True), True
+
+    def _on_canonical_scale(self, analyte: str, high: float) -> bool:
+        reference = self.lookup(analyte)
+        # Without reference data there is nothing the value could be wrongly compared to
+        return reference is None or bool(on_canonical_scale(high, reference.max))
+
+    @staticmethod
+    def _range(analyte: str, low: Optional[float], high: Optional[float], unit: str,
+               unit_known: bool) -> Optional[ReferenceRange]:
+        if high is None:
+            return None
+        if low is None:
+            return ReferenceRange(analyte, float('-inf'), high, unit, f"<{high:g} {unit}".rstrip(),
+                                  unit_known=unit_known)
+        return ReferenceRange(analyte, low, high, unit, f"{low:g}-{high:g} {unit}".rstrip(), unit_known=unit_known)
+
+    def panel(self, name: str) -> Dict[str, Dict]:
+        """Flat dict in the shape of the original normal_ranges/extended_ranges"""
+        return self._panels.get(name, {})
+
+
+class ReferenceRangeStore:
+    """Holds the current ReferenceIndex and swaps in a new one when the file changes
+
+    The file is stat'ed at most once per check_interval seconds; readers never
+    block and never see a partially built index.
+    """
+
+    def __init__(self, path: str = DEFAULT_RANGES_PATH, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self._index = self._load()
+
+    def current(self) -> ReferenceIndex:
+        """Return the live index, reloading first if the file changed"""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            self._reload_if_changed()
+        return self._index
+
+    def _load(self) -> ReferenceIndex:
+        with open(self.path, 'rb') as file:
+            content = file.read()
+        self._mtime = os.stat(self.path).st_mtime_ns
+        return ReferenceIndex(json.loads(content), hashlib.sha256(content).hexdigest())
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._index = self._load()
+            logger.info('Reloaded reference ranges from %s', self.path)
+        except (OSError, ValueError, KeyError) as e:
+            # Keep serving the last good index; retry on the next change
+            self._mtime = mtime
+            logger.error('Could not reload reference ranges from %s: %s', self.path, e)
+        finally:
+            self._lock.release()
+
+
+_default_store = None
+
+
+def default_store(path: Optional[str] = None) -> ReferenceRangeStore:
+    """Process-wide store, created on first use from path or the bundled reference_ranges.json"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ReferenceRangeStore(path or DEFAULT_RANGES_PATH)
+    return _default_store
@@ -0,0 +1,168 @@
+import sys
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+# Results are built once per report and only read afterwards; __slots__ keeps
+# each entry to a few pointers instead of a per-instance dict. to_json()
+# returns the original /analyze response shapes. Instances pickle by slot, so
+# they can come back from batch and job worker processes.
+
+
+@lru_cache(maxsize=None)
+def display_name(test: str) -> str:
+    """'blood_pressure_systolic' -> 'Blood Pressure Systolic', interned"""
+    return sys.intern(test.replace('_', ' ').title())
+
+
+@lru_cache(maxsize=None)
+def alert_message(test: str, status: str) -> str:
+    """Shared message string for an out-of-range alert"""
+    direction = 'below' if status == 'low' else 'above'
+    return sys.intern(f"{display_name(test)} is {direction} normal range")
+
+
+class _Record:
+    """Base for the flat result types: JSON and dict-style reads by field name"""
+
+    __slots__ = ()
+    _fields = ()
+    # Flags only in the JSON when set, so the usual shape stays as it was
+    _optional = ()
+
+    def __getitem__(self, key: str):
+        # Callers written against the old result dicts keep working
+        if key in self._fields or key in self._optional:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_json(self) -> Dict:
+        result = {name: getattr(self, name) for name in self._fields}
+        for name in self._optional:
+            if getattr(self, name):
+                result[name] = getattr(self, name)
+        return result
+
+
+class LabValue(_Record):
+    """One extracted measurement"""
+
+    __slots__ = _fields = ('test', 'value')
+
+    def __init__(self, test: str, value: float):
+        self.test = sys.intern(test)
+        self.value = value
+
+
+class AnalysisEntry(_Record):
+    """Status of one value against its reference range
+
+    unit_unknown marks a value left in a unit the reference data is not in,
+    judged against the lab's printed range only.
+    """
+
+    __slots__ = ('value', 'status', 'normal_range', 'unit_unknown')
+    _fields = ('value', 'status', 'normal_range')
+    _optional = ('unit_unknown',)
+
+    def __init__(self, value: float, status: str, normal_range: str, unit_unknown: bool = False):
+        self.value = value
+        self.status = status
+        self.normal_range = normal_range
+        self.unit_unknown = unit_unknown
+
+
+class Alert(_Record):
+    """A value outside its reference range; the message is derived, not stored"""
+
+    __slots__ = ('test', 'value', 'status')
+    _fields = ('test', 'value', 'status', 'message')
+
+    def __init__(self, test: str, value: float, status: str):
+        self.test = sys.intern(test)
+        self.value = value
+        self.status = status
+
+    @property
+    def message(self) -> str:
+        return alert_message(self.test, self.status)
+
+
+class Summary(_Record):
+    """Overall verdict for a report"""
+
+    __slots__ = _fields = ('overall_status', 'summary_text', 'total_tests', 'normal_tests', 'abnormal_tests')
+
+    def __init__(self, overall_status: str, summary_text: str, total_tests: int,
+                 normal_tests: int, abnormal_tests: int):
+        self.overall_status = overall_status
+        self.summary_text = summary_text
+        self.total_tests = total_tests
+        self.normal_tests = normal_tests
+        self.abnormal_tests = abnormal_tests
+
+
+class AnalysisReport:
+    """Everything /analyze returns for one document
+
+    unit_unknown names the tests whose values could not be put in the
+    reference unit; they are reported as printed and kept out of trends.
+    """
+
+    __slots__ = ('extracted_text', 'lab_values', 'analysis', 'alerts', 'recommendations', 'summary',
+                 'unit_unknown')
+
+    success = True
+
+    def __init__(self, extracted_text: str, lab_values: Sequence[LabValue], analysis: Dict[str, AnalysisEntry],
+                 alerts: List[Alert], recommendations: Sequence[str], summary: Summary,
+                 unit_unknown: Sequence[str] = ()):
+        self.extracted_text = extracted_text
+        self.lab_values = tuple(lab_values)
+        self.analysis = analysis
+        self.alerts = alerts
+        self.recommendations = recommendations
+        self.summary = summary
+        self.unit_unknown = tuple(unit_unknown)
+
+    def lab_values_dict(self) -> Dict[str, float]:
+        return {lab_value.test: lab_value.value for lab_value in self.lab_values}
+
+    def to_json(self, compact: bool = False) -> Dict:
+        """Response dict; compact leaves out extracted_text"""
+        result = {'success': True}
+        if not compact:
+            result['extracted_text'] = self.extracted_text
+        result['lab_values'] = self.lab_values_dict()
+        if self.unit_unknown:
+            result['unit_unknown'] = list(self.unit_unknown)
+        result['analysis'] = {test: entry.to_json() for test, entry in self.analysis.items()}
+        result['alerts'] = [alert.to_json() for alert in self.alerts]
+        result['recommendations'] = list(self.recommendations)
+        result['summary'] = self.summary.to_json()
+        return result
+
+
+def as_response(result, compact: bool = False) -> Dict:
+    """Response dict for a report or for a plain dict read back from a cache or job store"""
+    if isinstance(result, AnalysisReport):
+        return result.to_json(compact)
+    if compact and 'extracted_text' in result:
+        return {key: value for key, value in result.items() if key != 'extracted_text'}
+    return dict(result)
+
+
+def lab_values_of(result) -> Dict[str, float]:
+    """Extracted values of a report or of a plain result dict, leaving out those in an unknown unit"""
+    if isinstance(result, AnalysisReport):
+        lab_values, unit_unknown = result.lab_values_dict(), result.unit_unknown
+    else:
+        lab_values, unit_unknown = result['lab_values'], result.get('unit_unknown', ())
+    if not unit_unknown:
+        return lab_values
+    return {test: value for test, value in lab_values.items() if test not in unit_unknown}
@@ -0,0 +1,162 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Every pattern below is matched once per line from a fixed anchor and only
+# backtracks within a single token, so the cost is linear in the line length.
+
+# Words that mark a table header, e.g. "Test  Result  Unit  Reference Range"
+HEADER_PATTERN = re.compile(r'\b(?:test|parameter|value|normal|range)\b', re.IGNORECASE)
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Header words mapped to the field their column holds
+HEADER_FIELDS = {
+    'test': 'test', 'parameter': 'test', 'investigation': 'test', 'analyte': 'test',
+    'value': 'value', 'result': 'value',
+    'unit': 'unit',
+    'normal': 'range', 'reference': 'range', 'range': 'range', 'interval': 'range',
+    'status': 'status', 'flag': 'status'
+}
+HEADER_FIELD_PATTERN = re.compile(
+    r'\b(' + '|'.join(HEADER_FIELDS) + r')s?\b', re.IGNORECASE
+)
+
+# Cells of a fixed-width row are separated by two or more spaces or a tab
+CELL_PATTERN = re.compile(r'\S+(?: \S+)*')
+# Cells may drift this many characters left of their header under OCR
+COLUMN_SLACK = 2
+
+# Free-form row: optional numbering, a name of letter-initial words, then the value.
+# Name words must start with a letter, so the first number always ends the name.
+ROW_PATTERN = re.compile(
+    r'[^A-Za-z\n]*'
+    r'(?P<test>[A-Za-z]\S*(?:[ \t]+[A-Za-z]\S*)*)'
+    r'[ \t]+(?P<value>\d+(?:\.\d+)?)(?![\d.])'
+    r'(?:[ \t]+(?P<unit>[A-Za-z/μµ%]\S*))?'
+    r'(?P<rest>.*)'
+)
+NUMBER_PATTERN = re.compile(r'(?<![\d.])\d+(?:\.\d+)?')
+RANGE_PATTERN = re.compile(r'(?<![\d.])\d+(?:\.\d+)?[ \t]*[-–][ \t]*\d+(?:\.\d+)?')
+WORD_PATTERN = re.compile(r'[A-Za-z]+')
+
+# Column start offsets and their field names, set by the most recent header
+Columns = Tuple[List[int], List[str]]
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yield lines of text one at a time without building a list of them"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:].rstrip('\r')
+            return
+        yield text[start:end].rstrip('\r')
+        start = end + 1
+
+
+def _header_columns(line: str) -> Optional[Columns]:
+    starts, fields = [], []
+    for match in HEADER_FIELD_PATTERN.finditer(line):
+        field = HEADER_FIELDS[match.group(1).lower()]
+        if field not in fields:
+            starts.append(match.start())
+            fields.append(field)
+    if 'test' in fields and 'value' in fields:
+        return starts, fields
+    return None
+
+
+def _row(test: str, value: str, unit: str, range_: str, status: str) -> Dict:
+    return {
+        'test': test.strip(),
+        'value': float(value),
+        'unit': unit or '',
+        'status': status or '',
+        'range': range_
+    }
+
+
+def _parse_fixed_width(line: str, columns: Columns) -> Optional[Dict]:
+    """Assign each cell to the header column it starts under"""
+    starts, fields = columns
+    cells = {}
+    for match in CELL_PATTERN.finditer(line):
+        index = max(bisect_right(starts, match.start() + COLUMN_SLACK) - 1, 0)
+        field = fields[index]
+        cells[field] = f"{cells[field]} {match.group()}" if field in cells else match.group()
+
+    test = cells.get('test', '')
+    value_cell = cells.get('value', '')
+    value = NUMBER_PATTERN.search(value_cell)
+    if not WORD_PATTERN.search(test) or value is None:
+        return None
+    # Without a unit column the unit is printed right after the value
+    unit = cells.get('unit') or value_cell[value.end():].strip()
+    return _row(test, value.group(), unit, cells.get('range', ''), cells.get('status', ''))
+
+
+def _parse_free_form(line: str) -> Optional[Dict]:
+    match = ROW_PATTERN.match(line)
+    if match is None:
+        return None
+    rest = match.group('rest')
+    range_match = RANGE_PATTERN.search(rest)
+    if range_match:
+        status_text = rest[:range_match.start()] + ' ' + rest[range_match.end():]
+    else:
+        status_text = rest
+    return _row(
+        match.group('test'),
+        match.group('value'),
+        match.group('unit'),
+        range_match.group() if range_match else '',
+        ' '.join(WORD_PATTERN.findall(status_text))
+    )
+
+
+class TableExtractor:
+    """Single pass, line-at-a-time extraction of lab result tables
+
+    A header line starts a table and records where its columns begin, so
+    fixed-width rows are split by position; rows that do not fit the columns
+    fall back to free-form parsing. A blank line or the end of input closes
+    the table.
+    """
+
+    def iter_rows(self, source: Union[str, Iterable[str]]) -> Iterator[Tuple[int, Dict]]:
+        """Yield (table number, row) pairs as soon as each row is parsed"""
+        lines = iter_lines(source) if isinstance(source, str) else source
+        table = -1
+        in_table = False
+        columns = None
+
+        for line in lines:
+            # Headers name the columns; a line with numbers is a row even if it says "normal"
+            if HEADER_PATTERN.search(line) and not DIGIT_PATTERN.search(line):
+                table += 1
+                in_table = True
+                columns = _header_columns(line)
+                continue
+
+            if in_table:
+                row = None
+                if columns is not None:
+                    row = _parse_fixed_width(line, columns)
+                if row is None:
+                    row = _parse_free_form(line)
+                if row is not None:
+                    yield table, row
+                elif not line.strip():
+                    in_table = False
+
+    def extract(self, source: Union[str, Iterable[str]]) -> List[List[Dict]]:
+        """Group rows into tables; tables without rows are omitted"""
+        tables = []
+        current = None
+        for table, row in self.iter_rows(source):
+            if table != current:
+                tables.append([])
+                current = table
+            tables[-1].append(row)
+        return tables
@@ -0,0 +1,235 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .extractor import ANALYTE_ALIASES
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(__file__), 'terminology.json')
+
+# Words are runs of letters and digits; terms and text are split the same way
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+class TermMatch(NamedTuple):
+    """One vocabulary term found in a text; end is exclusive"""
+    start: int
+    end: int
+    term: str
+    analyte: Optional[str]
+    categories: Tuple[str, ...]
+
+
+class Resolution(NamedTuple):
+    """Canonical analyte and organ-system category for a span of text
+
+    ``ambiguous`` lists terms that overlapped a chosen match and lost, e.g.
+    'hb' inside 'hba1c'.
+    """
+    analyte: Optional[str]
+    category: Optional[str]
+    matches: Tuple[TermMatch, ...]
+    ambiguous: Tuple[TermMatch, ...]
+
+
+class TerminologyIndex:
+    """Aho-Corasick automaton over analyte aliases and category keywords
+
+    The automaton runs over word tokens, so every term is found as whole
+    words in one left-to-right pass. Overlaps are settled leftmost-longest
+    and the losers are reported as ambiguous, together with terms hidden
+    inside a matched word (e.g. 'hb' in 'hba1c'). When several analytes are
+    mentioned, the one listed first in the vocabulary wins, as with the
+    original mapping loop.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]], categories: Dict[str, List[str]],
+                 analyte_categories: Optional[Dict[str, List[str]]] = None,
+                 resolve_cache_size: int = 4096):
+        self.analyte_priority = {analyte: rank for rank, analyte in enumerate(aliases)}
+        self.category_priority = {category: rank for rank, category in enumerate(categories)}
+        self.category_keywords = {category: list(keywords) for category, keywords in categories.items()}
+
+        # term -> [analyte or None, ordered categories]
+        entries = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                entry = entries.setdefault(keyword.lower(), [None, []])
+                if category not in entry[1]:
+                    entry[1].append(category)
+        for analyte, variations in aliases.items():
+            for variation in variations:
+                entry = entries.setdefault(variation.lower(), [None, []])
+                entry[0] = entry[0] or analyte
+
+        # An analyte belongs to every category one of its spellings is a keyword of
+        self.analyte_categories = {}
+        for analyte in aliases:
+            found = list((analyte_categories or {}).get(analyte, []))
+            for variation in aliases[analyte]:
+                for category in entries[variation.lower()][1]:
+                    if category not in found:
+                        found.append(category)
+            self.analyte_categories[analyte] = tuple(
+                sorted(found, key=lambda name: self.category_priority.get(name, len(categories)))
+            )
+
+        self.terms = tuple(sorted(entries))
+        self.entries = {term: (entries[term][0], tuple(entries[term][1])) for term in self.terms}
+        self._build(self.terms)
+
+        # Terms spelled inside another term but not on word boundaries, e.g. 'hba1c' -> ('hb',)
+        self.embedded = {}
+        for term in self.terms:
+            hidden = tuple(
+                other for other in self.terms
+                if other != term and other in term and not self._same_meaning(other, term)
+                and other not in TOKEN_PATTERN.findall(term)
+            )
+            if hidden:
+                self.embedded[term] = hidden
+
+        # Entity names repeat across reports; resolutions are immutable and safe to share
+        self.resolve = lru_cache(maxsize=resolve_cache_size)(self._resolve)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_VOCABULARY_PATH,
+                  base_aliases: Optional[Dict[str, List[str]]] = None) -> 'TerminologyIndex':
+        """Build from a vocabulary file; its aliases extend base_aliases (the extractor's table by default)"""
+        with open(path, encoding='utf-8') as file:
+            vocabulary = json.load(file)
+
+        aliases = {analyte: list(variations) for analyte, variations in (base_aliases or ANALYTE_ALIASES).items()}
+        for analyte, variations in vocabulary.get('aliases', {}).items():
+            known = aliases.setdefault(analyte, [])
+            known.extend(variation for variation in variations if variation not in known)
+        return cls(aliases, vocabulary.get('categories', {}), vocabulary.get('analyte_categories', {}))
+
+    def _same_meaning(self, term: str, other: str) -> bool:
+        analyte, categories = self.entries[term]
+        other_analyte, other_categories = self.entries[other]
+        if analyte or other_analyte:
+            return analyte == other_analyte
+        return categories == other_categories
+
+    def _build(self, terms: Iterable[str]):
+        # Trie over word tokens: goto[state][token] -> state, outputs[state] -> terms ending here
+        goto = [{}]
+        outputs = [()]
+        for term in terms:
+            state = 0
+            for token in TOKEN_PATTERN.findall(term):
+                next_state = goto[state].get(token)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][token] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            if state:
+                outputs[state] = ((term, len(TOKEN_PATTERN.findall(term))),)
+
+        # Breadth-first failure links, folded into a full transition table so
+        # scanning costs one dict lookup per token
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = list(goto[0].values())
+        for state in queue:
+            for token, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and token not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(token, 0) if state else 0
+                outputs[child] = outputs[child] + outputs[fail[child]]
+            if state:
+                for token, target in delta[fail[state]].items():
+                    delta[state].setdefault(token, target)
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def _scan(self, text: str) -> List[TermMatch]:
+        """Every whole-word term occurrence in lowercased text, in order of end position"""
+        delta = self._delta
+        outputs = self._outputs
+        entries = self.entries
+        tokens = list(TOKEN_PATTERN.finditer(text))
+        hits = []
+        state = 0
+        for position, token in enumerate(tokens):
+            state = delta[state].get(token.group(), 0)
+            for term, length in outputs[state]:
+                analyte, categories = entries[term]
+                start = tokens[position + 1 - length].start()
+                hits.append(TermMatch(start, token.end(), term, analyte, categories))
+        return hits
+
+    def find(self, text: str) -> Tuple[List[TermMatch], List[TermMatch]]:
+        """Non-overlapping matches (leftmost-longest) and the differently-meant terms they beat"""
+        text = text.lower()
+        hits = self._scan(text)
+        if len(hits) > 1:
+            hits.sort(key=lambda hit: (hit.start, hit.start - hit.end))
+
+        matches = []
+        ambiguous = []
+        covered_until = 0
+        for hit in hits:
+            if hit.start >= covered_until:
+                matches.append(hit)
+                covered_until = hit.end
+            elif not self._same_meaning(hit.term, matches[-1].term):
+                ambiguous.append(hit)
+
+        for match in matches:
+            for other in self.embedded.get(match.term, ()):
+                start = text.find(other, match.start, match.end)
+                analyte, categories = self.entries[other]
+                ambiguous.append(TermMatch(start, start + len(other), other, analyte, categories))
+        ambiguous.sort(key=lambda hit: (hit.start, hit.end))
+        return matches, ambiguous
+
+    def _resolve(self, span: str) -> Resolution:
+        """Canonical analyte and category for a candidate span"""
+        matches, ambiguous = self.find(span)
+        analyte_matches = [match for match in matches if match.analyte]
+        analyte = None
+        category = None
+        if analyte_matches:
+            analyte = min(analyte_matches, key=lambda match: self.analyte_priority[match.analyte]).analyte
+            categories = self.analyte_categories.get(analyte, ())
+            category = categories[0] if categories else None
+        if category is None:
+            for match in matches:
+                if match.categories:
+                    category = match.categories[0]
+                    break
+        return Resolution(analyte, category, tuple(matches), tuple(ambiguous))
+
+    def categorize(self, text: str) -> Dict[str, List[str]]:
+        """Keywords found in text grouped by category, in vocabulary order"""
+        found = {}
+        for match in self.find(text)[0]:
+            categories = match.categories or self.analyte_categories.get(match.analyte, ())
+            for category in categories:
+                terms = found.setdefault(category, [])
+                if match.term not in terms:
+                    terms.append(match.term)
+        return {category: found[category] for category in sorted(found, key=self.category_priority.get)}
+
+    def keywords(self) -> Dict[str, List[str]]:
+        """Category -> keywords, in the shape of AdvancedHealthAnalyzer.medical_keywords"""
+        return {category: list(keywords) for category, keywords in self.category_keywords.items()}
+
+
+_default_index = None
+
+
+def default_index(path: Optional[str] = None) -> TerminologyIndex:
+    """Process-wide index, built on first use from path or the bundled terminology.json"""
+    global _default_index
+    if _default_index is None:
+        _default_index = TerminologyIndex.from_file(path or DEFAULT_VOCABULARY_PATH)
+    return _default_index
@@ -0,0 +1,137 @@
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# What may follow a value on the same row: its unit, then the lab's printed
+# reference range, e.g. 'Hb 11.2 g/dL 13.5-17.5', 'glucose 5.4 mmol/L  ref: 3.9-5.6'
+# or 'cholesterol 4.2 (< 5.2)'. Matched on lowercased text. Only unit spellings
+# listed here are read, so a following word ('date', 'on') is never a unit
+UNITS = (
+    'mg/dl', 'g/dl', 'g/l', 'mg/l', 'ng/dl', 'mmol/l', 'umol/l', 'μmol/l', 'µmol/l', 'pmol/l',
+    'u/l', 'iu/l', 'miu/l', 'kg/m2', 'kg/m²', 'kg', 'lbs', 'lb', 'cm', 'mmhg', 'bpm', '%',
+    'cells/ul', 'cells/μl', 'cells/µl', '/ul', '/μl', '/µl', '/mm3', '/mm³'
+)
+UNIT_PATTERN = (
+    r'(?:(?:[x×*][ \t]?)?10[\^*]?\d+/(?:[uμµ]l|l)|'
+    + '|'.join(re.escape(unit) for unit in sorted(UNITS, key=len, reverse=True))
+    + r')(?![\w/])'
+)
+# Two numbers joined by '-', or '<' a number; a year-first date ('2023-01-05') or
+# one going on past the second number ('12-15-2023', '12-15/23') is not a range
+RANGE_PATTERN = (
+    r'(?:(?!\d{4}[-/.]\d{1,2}(?!\d))(?P<low>\d+\.?\d*)[ \t]*[-–][ \t]*(?P<high>\d+\.?\d*)(?![-/.:]?\d)'
+    r'|<=?[ \t]*(?P<below>\d+\.?\d*)(?![-/.:]?\d))'
+)
+RANGE_LABEL_PATTERN = r'(?:(?:ref(?:erence)?\.?|normal)(?:[ \t]*(?:range|interval))?[ \t]*:?[ \t]*)?'
+# The range is read when it is bracketed, or right after a unit from UNITS
+PRINTED_RANGE_PATTERN = (
+    rf'[ \t]*(?P<open>[(\[][ \t]*)?(?(open)|(?(unit)|(?!))){RANGE_LABEL_PATTERN}{RANGE_PATTERN}'
+    r'(?(open)[ \t]*[)\]])'
+)
+VALUE_TAIL = rf'(?:[ \t]*(?P<unit>{UNIT_PATTERN}))?(?:{PRINTED_RANGE_PATTERN})?'
+
+MICRO_PATTERN = re.compile(r'(^|/)u(?=[a-z])')
+POWER_PATTERN = re.compile(r'^[x×*]?10[\^*]?(\d+)')
+
+# Converted values keep two decimals, like most printed results
+DECIMALS = 2
+
+# A range printed without a unit is read in the canonical unit only when its upper
+# end is within this factor of the reference one. The usual conversions (mmol/L to
+# mg/dL is x18 for glucose, x38.7 for cholesterol; g/L to g/dL is x0.1) fall outside
+CANONICAL_SCALE_TOLERANCE = 3.0
+
+_new_tuple = tuple.__new__
+
+
+class Measurement(NamedTuple):
+    """A value as printed, with its unit and the lab's range from the same row when there is one"""
+    value: float
+    unit: str = ''
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+    @classmethod
+    def from_match(cls, match: 're.Match', value: str = 'value') -> 'Measurement':
+        """Measurement from a match of a pattern ending in VALUE_TAIL"""
+        number, unit, low, high, below = match.group(value, 'unit', 'low', 'high', 'below')
+        # tuple.__new__ skips the generated __new__, about a third of the cost per value
+        if high is not None:
+            return _new_tuple(cls, (float(number), unit or '', float(low), float(high)))
+        if below is not None:
+            return _new_tuple(cls, (float(number), unit or '', None, float(below)))
+        return _new_tuple(cls, (float(number), unit or '', None, None))
+
+
+@lru_cache(maxsize=1024)
+def normalize_unit(unit: str) -> str:
+    """Comparable spelling: 'mmol/L' ~ 'mmol/l', 'umol/L' ~ 'µmol/L' ~ 'μmol/L', 'x10^9/L' ~ '10^9/L'"""
+    unit = unit.strip().lower().replace(' ', '').replace('µ', 'μ').replace('²', '2').replace('³', '3')
+    unit = MICRO_PATTERN.sub(r'\1μ', unit)
+    return POWER_PATTERN.sub(r'10^\1', unit)
+
+
+def _round(value: float) -> float:
+    return round(value, DECIMALS)
+
+
+def on_canonical_scale(high, reference_max):
+    """Whether a printed upper limit can be in the canonical unit; floats or arrays"""
+    return (high * CANONICAL_SCALE_TOLERANCE >= reference_max) & (high <= reference_max * CANONICAL_SCALE_TOLERANCE)
+
+
+class UnitTable:
+    """Multipliers to each analyte's canonical unit, precomputed per reference index
+
+    Values without a unit are taken as canonical, as before units were read.
+    The lab's printed range is in the value's unit, so it is scaled by the
+    same factor.
+    """
+
+    def __init__(self, canonical: Dict[str, str], conversions: Dict[str, Dict[str, float]]):
+        self.canonical = dict(canonical)
+        self.factors = {}
+        for analyte in set(canonical) | set(conversions):
+            factors = {normalize_unit(unit): float(factor) for unit, factor in conversions.get(analyte, {}).items()}
+            if analyte in canonical:
+                factors[normalize_unit(canonical[analyte])] = 1.0
+            self.factors[analyte] = factors
+
+    def factor(self, analyte: str, unit: str) -> Optional[float]:
+        """Multiplier from unit to the canonical unit; None when the unit is not known for the analyte"""
+        if not unit:
+            return 1.0
+        return self.factors.get(analyte, {}).get(normalize_unit(unit))
+
+    def scale(self, analyte: str, measurement: Measurement) -> Tuple[float, Optional[float], Optional[float], str]:
+        """(value, low, high, unit) of a measurement converted to the canonical unit
+
+        A value in a unit the table does not know for the analyte is kept as
+        printed, but that unit and a range printed in it are dropped.
+        """
+        factor = self.factor(analyte, measurement.unit)
+        if factor is None:
+            return measurement.value, None, None, ''
+        unit = self.canonical.get(analyte, measurement.unit)
+        if factor == 1.0:
+            return measurement.value, measurement.low, measurement.high, unit
+        return (
+            _round(measurement.value * factor),
+            None if measurement.low is None else _round(measurement.low * factor),
+            None if measurement.high is None else _round(measurement.high * factor),
+            unit
+        )
+
+    def factor_matrix(self, analytes: Sequence[str], units: np.ndarray) -> np.ndarray:
+        """Factors for an (N, len(analytes)) array of unit strings, one lookup per distinct unit per column
+
+        Empty units give 1.0 and units unknown for the analyte NaN.
+        """
+        factors = np.ones(units.shape, dtype=float)
+        for column, analyte in enumerate(analytes):
+            distinct, inverse = np.unique(units[:, column].astype(str), return_inverse=True)
+            lookup = np.array([self.factor(analyte, unit) or np.nan for unit in distinct])
+            factors[:, column] = lookup[inverse.ravel()]
+        return factors
@@ -0,0 +1,140 @@
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+
+from .limits import DocumentTooLarge, ResourceLimitExceeded
+
+# One document to analyze: display name plus a path or the raw bytes
+BatchItem = Tuple[str, Union[str, bytes]]
+
+# Analyzer built once per worker process by _init_worker
+_worker_analyzer = None
+
+
+def _init_worker(analyzer_factory: Callable):
+    global _worker_analyzer
+    _worker_analyzer = analyzer_factory()
+
+
+def _analyze_item(item: BatchItem, budget: Optional[Callable] = None) -> Dict:
+    name, source = item
+    started = time.perf_counter()
+    record = {'file': name}
+    try:
+        record['result'] = _worker_analyzer.analyze_document(name, source, budget=budget)
+        record['success'] = True
+    except ResourceLimitExceeded as e:
+        record['success'] = False
+        record['error'] = str(e)
+        record['limit'] = e.limit
+        if e.partial is not None:
+            record['result'] = e.partial
+    except Exception as e:
+        record['success'] = False
+        record['error'] = str(e)
+    record['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return record
+
+
+def _has_extension(name: str, extensions: Set[str]) -> bool:
+    return '.' in name and name.rsplit('.', 1)[1].lower() in extensions
+
+
+def iter_directory(root: str, extensions: Set[str]) -> Iterator[BatchItem]:
+    """Walk a directory tree yielding every report with an allowed extension"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if _has_extension(filename, extensions):
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, root), path
+
+
+def iter_zip(stream: BinaryIO, extensions: Set[str]) -> Iterator[BatchItem]:
+    """Yield allowed members of a zip archive, reading one member at a time"""
+    with zipfile.ZipFile(stream) as archive:
+        for member in archive.infolist():
+            if not member.is_dir() and _has_extension(member.filename, extensions):
+                yield member.filename, archive.read(member)
+
+
+def check_zip(stream: BinaryIO, extensions: Set[str], max_member_size: int,
+              max_members: Optional[int] = None, max_total_size: Optional[int] = None):
+    """Refuse an archive whose allowed members are too large or too many
+
+    Each allowed member must be at most max_member_size bytes uncompressed,
+    there may be at most max_members of them and together at most
+    max_total_size bytes. Reads only the central directory; zipfile never
+    inflates a member past its recorded size, so this bounds what iter_zip
+    will hold in memory and how much work the archive can ask for.
+    """
+    members = total_size = 0
+    with zipfile.ZipFile(stream) as archive:
+        for member in archive.infolist():
+            if member.is_dir() or not _has_extension(member.filename, extensions):
+                continue
+            if member.file_size > max_member_size:
+                raise DocumentTooLarge(
+                    f"{member.filename} is {member.file_size} bytes uncompressed; "
+                    f"the limit is {max_member_size}", limit='archive_member'
+                )
+            members += 1
+            total_size += member.file_size
+            if max_members is not None and members > max_members:
+                raise DocumentTooLarge(
+                    f"The archive has more than {max_members} reports", limit='archive_members'
+                )
+            if max_total_size is not None and total_size > max_total_size:
+                raise DocumentTooLarge(
+                    f"The archive's reports are over {max_total_size} bytes uncompressed", limit='archive_size'
+                )
+
+
+def run_batch(items: Iterable[BatchItem], analyzer_factory: Callable, workers: Optional[int] = None,
+              max_in_flight: Optional[int] = None, budget: Optional[Callable] = None) -> Iterator[Dict]:
+    """Analyze items in a process pool, yielding per-file records as they finish
+
+    At most max_in_flight documents are held in memory at once. budget is a
+    picklable Budget factory; each document gets a fresh one in its worker,
+    and one past a limit is a failed record with the limit and its partial
+    result. The last record is a throughput summary.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    items = iter(items)
+    started = time.perf_counter()
+    counts = {'files': 0, 'succeeded': 0, 'failed': 0}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(analyzer_factory,)) as executor:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            # Keep the pool fed without reading the whole batch up front
+            while not exhausted and len(in_flight) < max_in_flight:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    in_flight.add(executor.submit(_analyze_item, item, budget))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                counts['files'] += 1
+                counts['succeeded' if record['success'] else 'failed'] += 1
+                yield record
+
+    elapsed = time.perf_counter() - started
+    yield {
+        'summary': dict(
+            counts,
+            workers=workers,
+            elapsed_s=round(elapsed, 3),
+            files_per_s=round(counts['files'] / elapsed, 2) if elapsed > 0 else None
+        )
+    }
@@ -0,0 +1,100 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from .serialization import dumps_str, loads
+
+
+def hash_upload(stream: BinaryIO, namespace: str = '', chunk_size: int = 1 << 16) -> str:
+    """Hash uploaded bytes plus a namespace (analyzer version) into a cache key"""
+    digest = hashlib.sha256(namespace.encode('utf-8'))
+    start = stream.tell()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(start)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier result cache: in-memory LRU with TTL, optional sqlite tier on disk"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached result or None, counting the hit or miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                del self._entries[key]
+
+            row = self._disk_get(key, now)
+            if row is not None:
+                value, created = row
+                self._remember(key, value, created)
+                self.stats['hits'] += 1
+                self.stats['disk_hits'] += 1
+                return value
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key: str, value: Dict):
+        """Store a result (JSON-serializable or a models.results report) in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)',
+                    (key, dumps_str(value), now)
+                )
+                self._db.commit()
+
+    def info(self) -> Dict:
+        """Counters and sizes for the health endpoint"""
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), persistent=self._db is not None)
+
+    def _remember(self, key: str, value: Dict, created: float):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[Dict, float]]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            'SELECT value, created FROM results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.ttl:
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            self._db.commit()
+            return None
+        return loads(row[0]), row[1]
@@ -0,0 +1,51 @@
+import io
+import os
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, Union
+
+from flask import Request
+
+# A path on disk, raw bytes, or an open binary file-like object (BytesIO, upload stream)
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def make_spooled_request_class(spool_threshold: int):
+    """Build a Request class whose uploads stay in memory up to spool_threshold bytes"""
+
+    class SpooledRequest(Request):
+        def _get_file_stream(self, total_content_length, content_type,
+                             filename=None, content_length=None):
+            return SpooledTemporaryFile(max_size=spool_threshold, mode='rb+')
+
+    return SpooledRequest
+
+
+@contextmanager
+def open_source(source: Source) -> Iterator[BinaryIO]:
+    """Open any supported source as a seekable binary stream positioned at the start"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield file
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        # Caller owns the stream; rewind it but leave it open
+        source.seek(0)
+        yield source
+
+
+def picklable_source(source: Source) -> Union[str, bytes]:
+    """Return a picklable form of source for handing to worker processes"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+def read_text(source: Source, encoding: str = 'utf-8') -> str:
+    """Decode a text upload without touching the filesystem"""
+    with open_source(source) as stream:
+        return stream.read().decode(encoding)
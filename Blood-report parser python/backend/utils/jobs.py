@@ -0,0 +1,347 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+from .limits import ResourceLimitExceeded
+from .serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class JobTimeoutError(Exception):
+    """Raised inside a runner when a job exceeds its time budget"""
+
+
+# Statuses a job never leaves; only these are pruned from the history. 'limit' is
+# a resource limit hit while extracting, with the partial report as the result
+FINISHED_STATUSES = ('done', 'failed', 'timeout', 'limit')
+
+# Columns added after the first release of the shared store, with their types
+STORE_COLUMNS = (('owner', 'INTEGER'), ('status', 'TEXT'))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, under another user
+        return True
+    return True
+
+
+class JobQueue(ABC):
+    """Bounded job queue; subclasses decide where the job function runs
+
+    With db_path, job records are also written to a sqlite file so that any
+    server process sharing the file can answer status polls. Each record
+    names the process that owns it: a process only prunes its own finished
+    jobs, and a queued or running job whose owner has exited (a recycled or
+    killed worker) is reported as failed instead of waiting forever.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 32, timeout: float = 30,
+                 keep_finished: int = 1000, db_path: Optional[str] = None):
+        self.timeout = timeout
+        self.keep_finished = keep_finished
+        self.owner = os.getpid()
+        self._pending = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS jobs '
+                '(id TEXT PRIMARY KEY, job TEXT NOT NULL, updated REAL NOT NULL, owner INTEGER, status TEXT)'
+            )
+            existing = {row[1] for row in self._db.execute('PRAGMA table_info(jobs)')}
+            for column, kind in STORE_COLUMNS:
+                if column not in existing:
+                    self._db.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+            self._db.commit()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func: Callable, *args, on_complete: Optional[Callable] = None) -> str:
+        """Queue func(*args) and return its job id; raise QueueFullError under backpressure"""
+        job_id = uuid.uuid4().hex
+        job = self._new_job(job_id, 'queued')
+        try:
+            self._pending.put_nowait((job_id, func, args, on_complete))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                if self._db is not None:
+                    self._db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+                    self._db.commit()
+            raise QueueFullError('Job queue is full, retry later')
+        return job['id']
+
+    def add_completed(self, result: Dict) -> str:
+        """Register an already available result (e.g. a cache hit) as a finished job"""
+        job_id = uuid.uuid4().hex
+        self._new_job(job_id, 'done')
+        self._finish(job_id, 'done', result=result)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Return a snapshot of a job, or None if it is unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+            if self._db is not None:
+                row = self._db.execute('SELECT job, owner FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                if row is not None:
+                    job, owner = loads(row[0]), row[1]
+                    if job['finished'] is None and owner is not None and not _process_alive(owner):
+                        # Its worker exited without recording an outcome; settle it for every poller
+                        job.update(status='failed', error='The server process running this job exited',
+                                   finished=time.time())
+                        self._store(job, owner)
+                    return job
+            return None
+
+    def info(self) -> Dict:
+        """Queue depth and job counts by status"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {'queued': self._pending.qsize(), 'jobs': counts}
+
+    @abstractmethod
+    def run(self, func: Callable, args: tuple):
+        """Run one job and return its result; raise JobTimeoutError past the deadline"""
+
+    def abandon(self, reason: str):
+        """Record every queued or running job of this process as failed, e.g. as the process exits"""
+        with self._lock:
+            unfinished = [job_id for job_id, job in self._jobs.items() if job['finished'] is None]
+        for job_id in unfinished:
+            self._finish(job_id, 'failed', error=reason)
+
+    def _new_job(self, job_id: str, status: str) -> Dict:
+        job = {
+            'id': job_id,
+            'status': status,
+            'submitted': time.time(),
+            'finished': None,
+            'result': None,
+            'error': None,
+            'limit': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._store(job)
+        return job
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None,
+                error: Optional[str] = None, limit: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(status=status, result=result, error=error, limit=limit, finished=time.time())
+            self._jobs.move_to_end(job_id)
+            self._store(job)
+            # Drop the oldest finished jobs once the history is full
+            while len(self._jobs) > self.keep_finished:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest['finished'] is None:
+                    break
+                del self._jobs[oldest_id]
+            if self._db is not None:
+                # Only this process's finished jobs: other workers' and unfinished ones stay pollable
+                finished = f"owner = ? AND status IN ({', '.join('?' * len(FINISHED_STATUSES))})"
+                self._db.execute(
+                    f'DELETE FROM jobs WHERE {finished} AND id NOT IN '
+                    f'(SELECT id FROM jobs WHERE {finished} ORDER BY updated DESC LIMIT ?)',
+                    (self.owner, *FINISHED_STATUSES, self.owner, *FINISHED_STATUSES, self.keep_finished)
+                )
+                self._db.commit()
+
+    def _store(self, job: Dict, owner: Optional[int] = None):
+        # Caller holds self._lock
+        if self._db is not None:
+            self._db.execute(
+                'INSERT OR REPLACE INTO jobs (id, job, updated, owner, status) VALUES (?, ?, ?, ?, ?)',
+                (job['id'], dumps_str(job), time.time(), owner or self.owner, job['status'])
+            )
+            self._db.commit()
+
+    def _worker_loop(self):
+        while True:
+            job_id, func, args, on_complete = self._pending.get()
+            try:
+                self._process(job_id, func, args, on_complete)
+            except Exception:
+                # A store write failed; the thread must outlive it to serve the rest of the queue
+                logger.exception('Job %s could not be recorded', job_id)
+
+    def _process(self, job_id: str, func: Callable, args: tuple, on_complete: Optional[Callable]):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]['status'] = 'running'
+                self._store(self._jobs[job_id])
+        try:
+            result = self.run(func, args)
+        except JobTimeoutError:
+            self._finish(job_id, 'timeout', error=f'Processing exceeded {self.timeout} seconds')
+            return
+        except ResourceLimitExceeded as e:
+            self._finish(job_id, 'limit', result=e.partial, error=str(e), limit=e.limit)
+            return
+        except Exception as e:
+            self._finish(job_id, 'failed', error=str(e))
+            return
+
+        if on_complete is not None:
+            try:
+                on_complete(result)
+            except Exception:
+                # Caching or trend recording failed; the result itself is still good
+                logger.exception('on_complete failed for job %s', job_id)
+        self._finish(job_id, 'done', result=result)
+
+
+class InProcessJobQueue(JobQueue):
+    """Runs jobs on the worker threads themselves; used for tests and tiny deployments
+
+    Timeouts are reported but the job cannot be interrupted.
+    """
+
+    def run(self, func: Callable, args: tuple):
+        started = time.monotonic()
+        result = func(*args)
+        if time.monotonic() - started > self.timeout:
+            raise JobTimeoutError()
+        return result
+
+
+def _run_in_child(conn, func: Callable, args: tuple):
+    if hasattr(os, 'setsid'):
+        # Lead a process group of its own, so a timeout also stops the pools the job starts
+        os.setsid()
+    try:
+        conn.send(('ok', func(*args)))
+    except ResourceLimitExceeded as e:
+        # Sent whole, so the partial report reaches the job record
+        conn.send(('limit', e))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+
+def _kill_process_group(process):
+    """Stop a job process together with the processes it started (PDF/OCR pools, tesseract)"""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except (ProcessLookupError, PermissionError):
+            # Not yet in its own group; nothing else can have been started
+            pass
+    process.terminate()
+
+
+def default_start_method() -> str:
+    """forkserver where available, else spawn; never a plain fork of a threaded server process"""
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class ProcessJobQueue(JobQueue):
+    """Runs each job in its own process so CPU-bound OCR can be killed at the deadline
+
+    At most ``workers`` processes run at once; each worker thread supervises one.
+    A job's process leads its own process group, and at the deadline the whole
+    group is killed, so no pool child outlives it.
+
+    Jobs are started from a forkserver (spawn where there is none), not forked
+    from this process: its request threads may hold locks (logging, sqlite,
+    caches) that a fork would copy held into the child. func and its arguments
+    must therefore be picklable, i.e. module-level functions. preload names
+    modules the forkserver imports once, so each job starts warm.
+    """
+
+    def __init__(self, *args, start_method: Optional[str] = None, preload: Iterable[str] = (), **kwargs):
+        self._context = multiprocessing.get_context(start_method or default_start_method())
+        if preload and self._context.get_start_method() == 'forkserver':
+            self._context.set_forkserver_preload(list(preload))
+        self._processes = set()
+        super().__init__(*args, **kwargs)
+
+    def run(self, func: Callable, args: tuple):
+        parent_conn, child_conn = self._context.Pipe(duplex=False)
+        # Not a daemon: the job may itself fan out (e.g. the parallel PDF page pool)
+        process = self._context.Process(target=_run_in_child, args=(child_conn, func, args))
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self._processes.add(process)
+        try:
+            if not parent_conn.poll(self.timeout):
+                raise JobTimeoutError()
+            status, payload = parent_conn.recv()
+        except EOFError:
+            raise RuntimeError(f'Worker process exited with code {process.exitcode}')
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+            if process.is_alive():
+                _kill_process_group(process)
+            process.join()
+            parent_conn.close()
+
+        if status == 'limit':
+            raise payload
+        if status == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+    def abandon(self, reason: str):
+        """Fail this process's unfinished jobs and stop the job processes still running"""
+        super().abandon(reason)
+        with self._lock:
+            running = list(self._processes)
+        for process in running:
+            _kill_process_group(process)
+
+
+JOB_QUEUE_BACKENDS = {
+    'process': ProcessJobQueue,
+    'inprocess': InProcessJobQueue
+}
+
+
+def create_job_queue(backend: str = 'process', preload: Iterable[str] = (), **kwargs) -> JobQueue:
+    """Instantiate the configured queue backend; preload only matters to job processes"""
+    try:
+        queue_class = JOB_QUEUE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown job queue backend '{backend}'")
+    if queue_class is ProcessJobQueue:
+        kwargs['preload'] = preload
+    return queue_class(**kwargs)
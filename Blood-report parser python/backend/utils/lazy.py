@@ -0,0 +1,93 @@
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent importing each lazily loaded module, in load order
+_import_costs = {}
+_import_lock = threading.Lock()
+
+
+class LazyModule(ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    _import_costs[self.__name__] = time.perf_counter() - started
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+# One proxy per module name so the cost is recorded once however many modules use it
+_proxies = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a proxy for module name; the import happens when the proxy is first used"""
+    proxy = _proxies.get(name)
+    if proxy is None:
+        proxy = _proxies.setdefault(name, LazyModule(name))
+    return proxy
+
+
+def preload(names: Iterable[str]) -> Dict[str, Optional[float]]:
+    """Import the named modules now; returns seconds per module, None where the import failed"""
+    costs = {}
+    for name in names:
+        try:
+            lazy_import(name)._load()
+            costs[name] = _import_costs.get(name)
+        except ImportError as e:
+            logger.warning('Warm-up could not import %s: %s', name, e)
+            costs[name] = None
+    return costs
+
+
+def start_warmup(names: Iterable[str], delay: float = 1.0) -> Optional[threading.Thread]:
+    """Preload modules on a background thread once the server has had time to start listening"""
+    names = [name for name in names if name]
+    if not names:
+        return None
+
+    def warm():
+        time.sleep(delay)
+        costs = preload(names)
+        logger.info('Warm-up finished: %s', import_report(costs))
+
+    thread = threading.Thread(target=warm, name='lazy-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def import_report(costs: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, Optional[float]]:
+    """Import cost in milliseconds for every lazy module; None if not loaded yet"""
+    if costs is None:
+        costs = {name: _import_costs.get(name) for name in _proxies}
+    return {
+        name: round(seconds * 1000, 1) if seconds is not None else None
+        for name, seconds in costs.items()
+    }
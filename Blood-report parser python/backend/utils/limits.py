@@ -0,0 +1,115 @@
+import os
+import time
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+
+class ResourceLimitExceeded(Exception):
+    """A document or request went past one of its resource limits
+
+    status is the HTTP code to answer with. partial holds the report built
+    from whatever was read before extraction stopped, when there is one.
+    """
+
+    status = 413
+
+    def __init__(self, message: str, limit: str = ''):
+        super().__init__(message)
+        self.limit = limit
+        self.partial = None
+
+    def __reduce__(self):
+        # Keep the limit name and partial report when raised in a job or batch worker process
+        return self.__class__, (str(self), self.limit), {'partial': self.partial}
+
+
+class DocumentTooLarge(ResourceLimitExceeded):
+    """Too many pages, too many pixels or too many bytes to process"""
+
+
+class MemoryLimitExceeded(ResourceLimitExceeded):
+    """The worker's memory grew past the per-request allowance"""
+
+
+class ProcessingTimeout(ResourceLimitExceeded):
+    """Extraction ran past the per-request wall-clock limit"""
+
+    status = 408
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes; None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def check_pixels(width: int, height: int, max_pixels: int):
+    """Refuse an image before decoding it when it would exceed max_pixels (0 disables)"""
+    if max_pixels and width * height > max_pixels:
+        raise DocumentTooLarge(
+            f"Image is {width}x{height} pixels; the limit is {max_pixels:,} pixels", limit='pixels'
+        )
+
+
+def check_pages(pages: int, max_pages: int):
+    """Refuse a document with more than max_pages pages (0 disables)"""
+    if max_pages and pages > max_pages:
+        raise DocumentTooLarge(f"Document has {pages} pages; the limit is {max_pages}", limit='pages')
+
+
+class Budget:
+    """Wall-clock and memory allowance for extracting one document
+
+    Limits are checked before each page and OCR tile, so one running
+    tesseract call is never interrupted. Memory is the growth of this process's RSS
+    since the budget started; with threaded workers that includes other
+    requests running at the same time. A limit of 0 disables it.
+    """
+
+    def __init__(self, seconds: float = 0, memory_bytes: int = 0):
+        self.seconds = seconds
+        self.memory_bytes = memory_bytes
+        self.deadline = time.monotonic() + seconds if seconds > 0 else None
+        self.rss_start = current_rss() if memory_bytes > 0 else None
+        # The limit that stopped guard(), if any
+        self.exceeded = None
+
+    def check(self):
+        """Raise the limit this request is past, if any"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ProcessingTimeout(f"Processing took longer than {self.seconds:g}s", limit='time')
+        if self.rss_start is not None:
+            growth = (current_rss() or self.rss_start) - self.rss_start
+            if growth > self.memory_bytes:
+                raise MemoryLimitExceeded(
+                    f"Processing used more than {self.memory_bytes >> 20} MB", limit='memory'
+                )
+
+    def guard(self, chunks: Iterable) -> Iterator:
+        """Pass pages or tiles through until a limit is hit, then stop and keep it in exceeded
+
+        Checked before asking for each chunk, the first one included, so
+        nothing already produced is dropped and no work starts once the
+        budget is spent (queued jobs, a slow upload).
+        """
+        chunks = iter(chunks)
+        while True:
+            try:
+                self.check()
+            except ResourceLimitExceeded as e:
+                self.exceeded = e
+                return
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            yield chunk
+
+
+def start_budget(budget: Union[Budget, Callable[[], Budget], None]) -> Budget:
+    """The Budget to extract with: budget itself, a new one from a factory, or an unlimited one"""
+    if callable(budget):
+        return budget()
+    return budget or Budget()
@@ -0,0 +1,227 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Seconds; covers a cached text report (~1ms) up to a long OCR job
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Upper bounds (bytes) and labels for upload size buckets
+SIZE_BUCKETS = ((100 << 10, '<100KB'), (1 << 20, '100KB-1MB'), (5 << 20, '1MB-5MB'))
+LARGEST_SIZE_BUCKET = '>5MB'
+
+def size_bucket(size: Optional[int]) -> str:
+    """Coarse label for an upload size, for histogram labels"""
+    if size is None:
+        return 'unknown'
+    for limit, label in SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return LARGEST_SIZE_BUCKET
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_format_labels(self.labels, key)} {value}'
+
+
+class Gauge(Counter):
+    """Value that is set rather than incremented, e.g. a configured limit"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, key)} {total}'
+            yield f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}'
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self._metrics = {}
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help_text, labels, buckets))
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(prefix='health_analyzer_')
+
+STAGE_SECONDS = registry.histogram(
+    'stage_duration_seconds', 'Time spent in each analysis stage', ('stage',)
+)
+REQUEST_SECONDS = registry.histogram(
+    'request_duration_seconds', 'End-to-end request latency', ('endpoint', 'file_type', 'size_bucket')
+)
+REQUESTS = registry.counter('requests_total', 'Requests by endpoint and status code', ('endpoint', 'status'))
+ERRORS = registry.counter('errors_total', 'Unhandled errors by endpoint and exception type', ('endpoint', 'error'))
+CACHE_LOOKUPS = registry.counter('cache_lookups_total', 'Result cache lookups', ('result',))
+PAGES = registry.counter('pages_total', 'Document pages extracted, by method', ('method',))
+LIMIT_REJECTIONS = registry.counter(
+    'limit_rejections_total', 'Requests stopped by a resource limit', ('endpoint', 'limit')
+)
+RESOURCE_LIMITS = registry.gauge('resource_limit', 'Configured resource limits (0 = disabled)', ('limit',))
+MODEL_BATCH_SIZE = registry.histogram(
+    'model_batch_size', 'Items per batched model call', ('model',), buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+# Stage -> seconds for the request being handled; None outside an instrumented request
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('timings', default=None)
+
+
+def start_timings():
+    """Begin collecting spans for the current request; returns a token for stop_timings"""
+    return _timings.set({})
+
+
+def stop_timings(token) -> Dict[str, float]:
+    timings = _timings.get() or {}
+    _timings.reset(token)
+    return timings
+
+
+def record_stage(stage: str, seconds: float):
+    """Add time to a stage for the current request and the stage histogram"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as one stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+class TimedIterator:
+    """Iterator wrapper that charges only the time spent producing items to a stage
+
+    Lets interleaved work (PDF pages pulled by the parser) be split between
+    the producer and the consumer; the stage is recorded on close().
+    """
+
+    def __init__(self, iterable: Iterable, stage: str):
+        self._iterator = iter(iterable)
+        self.stage = stage
+        self.elapsed = 0.0
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            record_stage(self.stage, self.elapsed)
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Header value such as 'extract=12.1ms, parse=0.4ms'"""
+    return ', '.join(f'{stage}={seconds * 1000:.1f}ms' for stage, seconds in timings.items())
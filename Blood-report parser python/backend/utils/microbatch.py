@@ -0,0 +1,80 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+from .metrics import MODEL_BATCH_SIZE
+
+
+class MicroBatcher:
+    """Coalesce predictions requested by concurrent threads into batched model calls
+
+    Callers block on predict(); one background thread takes the first waiting
+    request, keeps collecting for up to max_wait seconds or max_batch_size
+    items, runs predict_batch once on everything collected and hands each
+    caller its slice. A lone caller pays at most max_wait of extra latency.
+    The thread is started on first use in each process, so a batcher built
+    before a fork still works in the children.
+    """
+
+    def __init__(self, predict_batch: Callable[[List], List], max_batch_size: int = 64,
+                 max_wait: float = 0.001, name: str = 'model'):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def predict(self, items: Sequence) -> List:
+        """Predictions for items in order, computed in a shared batch"""
+        if not items:
+            return []
+        future = Future()
+        self._requests().put((list(items), future))
+        return future.result()
+
+    def _requests(self) -> queue.Queue:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, args=(self._queue,), name=f'{self.name}-batcher',
+                                 daemon=True).start()
+            return self._queue
+
+    def _run(self, requests: queue.Queue):
+        while True:
+            batch = [requests.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                try:
+                    request = requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            items = [item for request_items, _ in batch for item in request_items]
+            MODEL_BATCH_SIZE.observe(len(items), model=self.name)
+            try:
+                results = self.predict_batch(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_items, future in batch:
+                future.set_result(results[start:start + len(request_items)])
+                start += len(request_items)
+
+
+def run_batched(batcher: Optional[MicroBatcher], predict_batch: Callable[[List], List], items: Sequence) -> List:
+    """Predict through the batcher when there is one, otherwise directly"""
+    if batcher is None:
+        return predict_batch(list(items))
+    return batcher.predict(items)
@@ -0,0 +1,203 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+import PyPDF2
+
+from .cache import ResultCache, hash_upload
+from .ingest import Source, open_source, picklable_source
+from .limits import check_pages, check_pixels
+
+# A page with fewer non-whitespace characters than this has no usable text layer
+MIN_TEXT_CHARS = 16
+
+# Text of a page, or the scanned image of a page that has no text layer
+PageContent = Union[str, bytes]
+
+# Reader and scanned page handling set once per worker process by _init_worker
+_worker_reader = None
+_worker_scanned_images = False
+_worker_max_pixels = 0
+
+
+def _init_worker(source: Union[str, bytes], scanned_images: bool = False, max_pixels: int = 0):
+    global _worker_reader, _worker_scanned_images, _worker_max_pixels
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    _worker_scanned_images = scanned_images
+    _worker_max_pixels = max_pixels
+
+
+def _extract_page_range(bounds) -> List[PageContent]:
+    start, stop = bounds
+    return [
+        read_page(_worker_reader.pages[i], _worker_scanned_images, _worker_max_pixels)
+        for i in range(start, stop)
+    ]
+
+
+def has_text_layer(text: str, min_chars: int = MIN_TEXT_CHARS) -> bool:
+    """Whether extracted page text is more than the stray marks a scanned page yields"""
+    return len(''.join(text.split())) >= min_chars
+
+
+def image_sizes(page) -> List[Tuple[int, int]]:
+    """(width, height) of each image on a page, read from its dictionary without decoding it"""
+    try:
+        xobjects = page['/Resources']['/XObject'].get_object()
+        return [
+            (int(xobject.get('/Width', 0)), int(xobject.get('/Height', 0)))
+            for xobject in (xobjects[name].get_object() for name in xobjects)
+            if xobject.get('/Subtype') == '/Image'
+        ]
+    except Exception:
+        return []
+
+
+def scanned_image(page, max_pixels: int = 0) -> Optional[bytes]:
+    """Largest embedded image of a page, encoded as PNG/JPEG; None if it has none
+
+    Images over max_pixels raise DocumentTooLarge before any of them is decoded.
+    """
+    for width, height in image_sizes(page):
+        check_pixels(width, height, max_pixels)
+    try:
+        images = page.images
+    except Exception:
+        # Missing resources or an image filter PyPDF2 cannot decode
+        return None
+    if not images:
+        return None
+    return max(images, key=lambda image: len(image.data)).data
+
+
+def read_page(page, scanned_images: bool = False, max_pixels: int = 0) -> PageContent:
+    """Text of a page; with scanned_images, the page's scan image when it has no text layer"""
+    text = page.extract_text()
+    if not scanned_images or has_text_layer(text):
+        return text
+    image = scanned_image(page, max_pixels)
+    return text if image is None else image
+
+
+def iter_pages(source: Source, scanned_images: bool = False, max_pixels: int = 0,
+               parallel_threshold: int = 0, workers: Optional[int] = None,
+               max_pages: int = 0) -> Iterator[PageContent]:
+    """Yield the content of each PDF page in order, one page at a time
+
+    The document is opened once: its page count is checked against
+    max_pages before any page is read, and PDFs of parallel_threshold
+    pages or more are handed to the process pool (0 disables either).
+    """
+    with open_source(source) as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        total_pages = len(pdf_reader.pages)
+        check_pages(total_pages, max_pages)
+        if 0 < parallel_threshold <= total_pages:
+            pages = iter_pages_parallel(source, total_pages, workers, scanned_images=scanned_images,
+                                        max_pixels=max_pixels)
+            try:
+                yield from pages
+            finally:
+                pages.close()
+            return
+        for page in pdf_reader.pages:
+            yield read_page(page, scanned_images, max_pixels)
+
+
+def iter_pages_parallel(source: Source, total_pages: int, workers: Optional[int] = None,
+                        chunk_size: int = 8, scanned_images: bool = False,
+                        max_pixels: int = 0) -> Iterator[PageContent]:
+    """Yield PDF page content in order while a process pool extracts page chunks"""
+    bounds = [(start, min(start + chunk_size, total_pages))
+              for start in range(0, total_pages, chunk_size)]
+    executor = ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        initializer=_init_worker,
+        initargs=(picklable_source(source), scanned_images, max_pixels)
+    )
+    try:
+        for chunk in executor.map(_extract_page_range, bounds):
+            yield from chunk
+    finally:
+        # Closing the generator early (all analytes found) drops pending chunks
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stream_pdf_pages(source: Source, parallel_threshold: int = 0, workers: Optional[int] = None,
+                     ocr: Optional[Callable[[bytes], str]] = None, ocr_workers: int = 1,
+                     ocr_cache: Optional[ResultCache] = None, ocr_namespace: str = '',
+                     max_pages: int = 0, max_pixels: int = 0) -> Iterator[str]:
+    """Stream page text, using the process pool for PDFs above parallel_threshold pages
+
+    With ocr, pages without a text layer are read from their scan image
+    instead; see ocr_scanned_pages. PDFs over max_pages raise
+    DocumentTooLarge before any page is read, and scan images over
+    max_pixels when their page is reached (0 disables either).
+    """
+    scanned_images = ocr is not None
+    pages = iter_pages(source, scanned_images, max_pixels, parallel_threshold, workers, max_pages)
+    if not scanned_images:
+        return pages
+    return ocr_scanned_pages(pages, ocr, ocr_workers, ocr_cache, ocr_namespace)
+
+
+def ocr_scanned_pages(pages: Iterator[PageContent], ocr: Callable[[bytes], str], workers: int = 1,
+                      cache: Optional[ResultCache] = None, namespace: str = '') -> Iterator[str]:
+    """Yield page text in order, running ocr on the scan images among pages
+
+    Text pages pass straight through. Scan images are OCR'd on a thread pool
+    (each pytesseract call is its own process) while later pages are read, up
+    to workers pages ahead. Results are cached by a hash of the image bytes
+    plus namespace, so a letterhead or cover page repeated within a report or
+    shared by many reports is only OCR'd once. Closing the generator cancels pages not yet started.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-ocr') if workers > 1 else None
+    # Text or pending future per image hash, so a page repeated within this document is OCR'd once
+    seen = {}
+
+    def start(image: bytes) -> Union[str, Future]:
+        key = hash_upload(io.BytesIO(image), namespace)
+        if key not in seen:
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                seen[key] = cached['text']
+            elif executor is None:
+                seen[key] = _ocr_page(ocr, image, cache, key)
+            else:
+                seen[key] = executor.submit(_ocr_page, ocr, image, cache, key)
+        return seen[key]
+
+    pending = deque()
+    try:
+        for page in pages:
+            pending.append(start(page) if isinstance(page, bytes) else page)
+            # Hand pages on as soon as they are ready, never holding more than workers OCR pages back
+            while pending and (len(pending) > workers or not isinstance(pending[0], Future) or pending[0].done()):
+                yield _result(pending.popleft())
+        while pending:
+            yield _result(pending.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if hasattr(pages, 'close'):
+            pages.close()
+
+
+def _ocr_page(ocr: Callable[[bytes], str], image: bytes, cache: Optional[ResultCache], key: str) -> str:
+    text = ocr(image)
+    if cache is not None:
+        cache.set(key, {'text': text})
+    return text
+
+
+def _result(page: Union[str, Future]) -> str:
+    return page.result() if isinstance(page, Future) else page
+
+
+def record_pages(pages: Iterator[str], sink: List[str]) -> Iterator[str]:
+    """Pass pages through unchanged while keeping the ones actually consumed"""
+    for page in pages:
+        sink.append(page)
+        yield page
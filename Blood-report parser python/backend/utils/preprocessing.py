@@ -1,64 +1,179 @@
+import os
 import re
-import string
-from typing import List, Dict
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+from .lazy import lazy_import
+
+# NLTK is optional and only imported when use_nltk is set
+nltk = lazy_import('nltk')
+
+# NLTK data, downloaded here by the Docker image; outside it populate it once with
+#   python -m nltk.downloader -d backend/nltk_data punkt stopwords
+NLTK_DATA_PATH = os.environ.get(
+    'NLTK_DATA_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'nltk_data')
+)
+
+# Anything but word characters, whitespace and the medical symbols - / : . % μ
+SYMBOL_PATTERN = re.compile(r'[^\w\s\-/:.%μ]')
+# The same rule for ASCII as a translate table, one C-level pass instead of a regex
+CLEAN_TABLE = str.maketrans({char: ' ' for char in map(chr, range(128)) if SYMBOL_PATTERN.match(char)})
+
+DIGIT_PATTERN = re.compile(r'\d')
+# Sentence ends: a line break, or . ! ? before whitespace and a capital letter.
+# A period between digits (11.2) is never followed by whitespace, so it never splits.
+SENTENCE_BREAK_PATTERN = re.compile(r'\n|(?<=[.!?])[ \t]+(?=[A-Z(])')
+ABBREVIATIONS = frozenset({'dr.', 'mr.', 'mrs.', 'ms.', 'vs.', 'no.', 'approx.', 'ref.', 'e.g.', 'i.e.'})
+
+# Numbers with decimals and %, words with internal - or / (mg/dl, covid-19), or single symbols
+TOKEN_PATTERN = re.compile(r'\d+(?:\.\d+)?%?|[^\W\d_]+(?:[-/]\w+)*\b|[^\w\s]')
+
+# English stop words (NLTK's list) so the default path needs no downloaded data
+STOP_WORDS = frozenset("""
+a about above after again against ain all am an and any are aren aren't as at be because been before
+being below between both but by can couldn couldn't d did didn didn't do does doesn doesn't doing don
+don't down during each few for from further had hadn hadn't has hasn hasn't have haven haven't having
+he her here hers herself him himself his how i if in into is isn isn't it it's its itself just ll m ma
+me mightn mightn't more most mustn mustn't my myself needn needn't no nor not now o of off on once
+only or other our ours ourselves out over own re s same shan shan't she she's should should've
+shouldn shouldn't so some such t than that that'll the their theirs them themselves then there these
+they this those through to too under until up ve very was wasn wasn't we were weren weren't what when
+where which while who whom why will with won won't wouldn wouldn't y you you'd you'll you're you've
+your yours yourself yourselves
+""".split())
+
+# Medical abbreviations that should not be removed
+MEDICAL_TERMS = frozenset({
+    'bp', 'hr', 'bmi', 'ldl', 'hdl', 'tsh', 'wbc', 'rbc',
+    'hgb', 'hct', 'mcv', 'mch', 'mchc', 'rdw', 'plt'
+})
+
+
+def _ensure_nltk_data(resource: str, package: str):
+    """Find NLTK data offline, in the vendored directory or NLTK's default paths"""
+    if NLTK_DATA_PATH not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_PATH)
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        raise LookupError(
+            f"NLTK resource {package!r} not found; vendor it with "
+            f"`python -m nltk.downloader -d {NLTK_DATA_PATH} {package}`"
+        ) from None
+
+
+def split_sentences(text: str) -> Iterator[str]:
+    """Yield sentences split at line breaks and at . ! ? before a capitalized word"""
+    start = 0
+    for match in SENTENCE_BREAK_PATTERN.finditer(text):
+        end = match.start()
+        if match.group() != '\n':
+            # "Dr. Smith" and "No. 5" do not end a sentence
+            words = text[start:end].rsplit(None, 1)
+            if words and words[-1].lower() in ABBREVIATIONS:
+                continue
+        sentence = text[start:end].strip()
+        if sentence:
+            yield sentence
+        start = match.end()
+    sentence = text[start:].strip()
+    if sentence:
+        yield sentence
+
 
 class TextPreprocessor:
-    def __init__(self):
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-            
-        self.stop_words = set(stopwords.words('english'))
-        
-        # Medical abbreviations that should not be removed
-        self.medical_terms = {
-            'bp', 'hr', 'bmi', 'ldl', 'hdl', 'tsh', 'wbc', 'rbc',
-            'hgb', 'hct', 'mcv', 'mch', 'mchc', 'rdw', 'plt'
-        }
+    """Text cleanup, sentence splitting and tokenization for report text
+
+    The default path is pure Python with precompiled patterns and needs no
+    downloaded data. use_nltk switches sentence and word tokenization and the
+    stop word list to NLTK, loaded offline from NLTK_DATA_PATH.
+    """
+
+    def __init__(self, use_nltk: bool = False):
+        self.use_nltk = use_nltk
+        self._stop_words = None
+        self.medical_terms = MEDICAL_TERMS
+
+    @property
+    def stop_words(self) -> frozenset:
+        if self._stop_words is None:
+            if self.use_nltk:
+                _ensure_nltk_data('corpora/stopwords', 'stopwords')
+                self._stop_words = frozenset(nltk.corpus.stopwords.words('english'))
+            else:
+                self._stop_words = STOP_WORDS
+        return self._stop_words
 
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove special characters but preserve medical symbols
-        text = re.sub(r'[^\w\s\-/:.%μ]', ' ', text)
-        
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove extra spaces
-        text = text.strip()
-        
-        return text
+        if text.isascii():
+            text = text.translate(CLEAN_TABLE)
+        else:
+            # Accented names, OCR noise and other Unicode need the full pattern
+            text = SYMBOL_PATTERN.sub(' ', text)
+
+        # Normalize whitespace and trim
+        return ' '.join(text.split())
+
+    def iter_sentences(self, text: str) -> Iterator[str]:
+        if self.use_nltk:
+            _ensure_nltk_data('tokenizers/punkt', 'punkt')
+            return iter(nltk.tokenize.sent_tokenize(text))
+        return split_sentences(text)
+
+    def iter_sentences_with_numbers(self, text: str) -> Iterator[str]:
+        """Yield sentences that contain numeric values"""
+        return (sentence for sentence in self.iter_sentences(text) if DIGIT_PATTERN.search(sentence))
 
     def extract_sentences_with_numbers(self, text: str) -> List[str]:
         """Extract sentences that contain numeric values"""
-        sentences = sent_tokenize(text)
-        numeric_sentences = []
-        
-        for sentence in sentences:
-            if re.search(r'\d+', sentence):
-                numeric_sentences.append(sentence)
-        
-        return numeric_sentences
+        return list(self.iter_sentences_with_numbers(text))
+
+    def iter_tokens(self, text: str) -> Iterator[str]:
+        """Yield lowercased tokens, skipping stop words but keeping medical terms"""
+        stop_words = self.stop_words
+        medical_terms = self.medical_terms
+        if self.use_nltk:
+            _ensure_nltk_data('tokenizers/punkt', 'punkt')
+            tokens = iter(nltk.tokenize.word_tokenize(text.lower()))
+        else:
+            tokens = (match.group() for match in TOKEN_PATTERN.finditer(text.lower()))
+        for token in tokens:
+            if token not in stop_words or token in medical_terms:
+                yield token
 
     def tokenize_medical_text(self, text: str) -> List[str]:
         """Tokenize text while preserving medical terminology"""
-        # Convert to lowercase but preserve medical abbreviations
-        tokens = word_tokenize(text.lower())
-        
-        # Filter out stopwords but keep medical terms
-        filtered_tokens = [
-            token for token in tokens 
-            if token not in self.stop_words or token in self.medical_terms
-        ]
-        
-        return filtered_tokens
+        return list(self.iter_tokens(text))
+
+    def process(self, text: str) -> Dict:
+        """Cleaned text, numeric sentences and tokens for one document"""
+        return {
+            'clean_text': self.clean_text(text),
+            'numeric_sentences': self.extract_sentences_with_numbers(text),
+            'tokens': self.tokenize_medical_text(text)
+        }
+
+    def process_many(self, texts: Iterable[str], workers: Optional[int] = None,
+                     chunksize: int = 8) -> Iterator[Dict]:
+        """process() each text, in input order, across worker processes when workers > 1"""
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            yield from map(self.process, texts)
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.use_nltk,)) as executor:
+            yield from executor.map(_process, texts, chunksize=chunksize)
+
+
+# Preprocessor built once per worker process by _init_worker
+_worker_preprocessor = None
+
+
+def _init_worker(use_nltk: bool):
+    global _worker_preprocessor
+    _worker_preprocessor = TextPreprocessor(use_nltk)
+
+
+def _process(text: str) -> Dict:
+    return _worker_preprocessor.process(text)
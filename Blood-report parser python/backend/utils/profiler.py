@@ -0,0 +1,64 @@
+import cProfile
+import heapq
+import itertools
+import os
+import random
+import threading
+from typing import List, Optional, Tuple
+
+
+class SlowRequestProfiler:
+    """Profile a sample of requests and keep cProfile dumps of the slowest ones
+
+    Only one request per process is profiled at a time: cProfile sees just the
+    thread that enabled it, and newer Pythons allow a single active profiler.
+    Dumps are named by latency so ``ls`` lists the worst first; load them with
+    ``python -m pstats <file>`` or snakeviz.
+    """
+
+    def __init__(self, directory: str, keep: int = 10, sample_rate: float = 0.1):
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = sample_rate
+        os.makedirs(directory, exist_ok=True)
+        # Min-heap of (seconds, path); the fastest kept dump is evicted first
+        self._slowest = []
+        self._sequence = itertools.count()
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Begin profiling the current request if it is sampled and no other is being profiled"""
+        if random.random() >= self.sample_rate or not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) is already active
+            self._active.release()
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, seconds: float, label: str):
+        """Stop profiling and keep the dump if the request is among the slowest seen"""
+        profile.disable()
+        self._active.release()
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            name = f"{seconds * 1000:09.1f}ms-{label}-{os.getpid()}-{next(self._sequence)}.prof"
+            path = os.path.join(self.directory, name)
+            profile.dump_stats(path)
+            heapq.heappush(self._slowest, (seconds, path))
+            evicted = heapq.heappop(self._slowest)[1] if len(self._slowest) > self.keep else None
+        if evicted:
+            try:
+                os.remove(evicted)
+            except OSError:
+                pass
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """Kept (seconds, dump path) pairs, slowest first"""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
@@ -0,0 +1,56 @@
+import json
+from typing import Any, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for objects the encoder does not know: result models and numpy values"""
+    to_json = getattr(obj, 'to_json', None)
+    if to_json is not None:
+        return to_json()
+    tolist = getattr(obj, 'tolist', None)
+    if tolist is not None:
+        return tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj, default=_default, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    return dumps(obj, sort_keys).decode('utf-8')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps(), so jsonify() accepts result models
+
+    Keys stay sorted like Flask's default provider, keeping responses
+    byte-for-byte stable.
+    """
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps_str(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys))
+
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys), mimetype=self.mimetype)
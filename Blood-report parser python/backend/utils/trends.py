@@ -0,0 +1,194 @@
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+SECONDS_PER_DAY = 86400.0
+DAYS_PER_YEAR = 365.25
+
+# A trend moving less than this fraction of the rolling mean per year is reported as stable
+STABLE_FRACTION_PER_YEAR = 0.05
+
+# Running sums per (patient, analyte). Times are days since the series' first
+# observation; the w_* sums weight each point by exp(-decay * age) relative to
+# the newest point, so they can be rescaled in O(1) when a newer report arrives.
+AGGREGATE_COLUMNS = (
+    'origin', 'count', 'first_at', 'last_at', 'last_value', 'previous_value', 'min_value', 'max_value',
+    'sum_t', 'sum_v', 'sum_tt', 'sum_tv',
+    'w', 'w_t', 'w_v', 'w_tt', 'w_tv'
+)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS observations ('
+    'patient_id TEXT NOT NULL, analyte TEXT NOT NULL, report_id TEXT NOT NULL, '
+    'observed_at REAL NOT NULL, value REAL NOT NULL, '
+    'PRIMARY KEY (patient_id, analyte, report_id))',
+    'CREATE TABLE IF NOT EXISTS aggregates ('
+    'patient_id TEXT NOT NULL, analyte TEXT NOT NULL, '
+    + ', '.join(f'{column} REAL' for column in AGGREGATE_COLUMNS) +
+    ', PRIMARY KEY (patient_id, analyte))',
+)
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _slope(n: float, sum_t: float, sum_v: float, sum_tt: float, sum_tv: float) -> Optional[float]:
+    """Least-squares slope per day from running sums; None without two distinct times"""
+    denominator = n * sum_tt - sum_t * sum_t
+    if denominator <= 1e-9 * n * sum_tt:
+        return None
+    return (n * sum_tv - sum_t * sum_v) / denominator
+
+
+class TrendStore:
+    """Per-patient analyte time series with incrementally maintained aggregates
+
+    Observations are appended to sqlite and each one updates its series'
+    running sums in O(1): last value, min/max, mean, a least-squares slope
+    and time-decayed (half-life weighted) mean and slope. Reading trends
+    never scans the history. Re-recording the same report is a no-op, and
+    reports may arrive out of date order.
+    """
+
+    def __init__(self, db_path: str, half_life_days: float = 180):
+        self.decay = math.log(2) / half_life_days
+        self._lock = threading.Lock()
+        # Autocommit mode; record() opens its own write transaction
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+    def record(self, patient_id: str, values: Dict[str, float], observed_at: Optional[float] = None,
+               report_id: Optional[str] = None) -> List[str]:
+        """Add one report's values; returns the analytes whose aggregates changed"""
+        observed_at = time.time() if observed_at is None else observed_at
+        report_id = report_id or f'{observed_at!r}'
+        updated = []
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so processes sharing the file serialize here
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                for analyte, value in values.items():
+                    inserted = self._db.execute(
+                        'INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?)',
+                        (patient_id, analyte, report_id, observed_at, float(value))
+                    ).rowcount
+                    if inserted:
+                        self._update(patient_id, analyte, observed_at, float(value))
+                        updated.append(analyte)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return updated
+
+    def _update(self, patient_id: str, analyte: str, observed_at: float, value: float):
+        row = self._db.execute(
+            f'SELECT {", ".join(AGGREGATE_COLUMNS)} FROM aggregates WHERE patient_id = ? AND analyte = ?',
+            (patient_id, analyte)
+        ).fetchone()
+        if row is None:
+            aggregate = dict.fromkeys(AGGREGATE_COLUMNS, 0.0)
+            aggregate.update(
+                origin=observed_at, first_at=observed_at, last_at=observed_at,
+                last_value=value, previous_value=None, min_value=value, max_value=value
+            )
+        else:
+            aggregate = dict(zip(AGGREGATE_COLUMNS, row))
+
+        t = (observed_at - aggregate['origin']) / SECONDS_PER_DAY
+        aggregate['count'] += 1
+        aggregate['sum_t'] += t
+        aggregate['sum_v'] += value
+        aggregate['sum_tt'] += t * t
+        aggregate['sum_tv'] += t * value
+        aggregate['min_value'] = min(aggregate['min_value'], value)
+        aggregate['max_value'] = max(aggregate['max_value'], value)
+        aggregate['first_at'] = min(aggregate['first_at'], observed_at)
+
+        age = (aggregate['last_at'] - observed_at) / SECONDS_PER_DAY
+        if age <= 0:
+            # Newest point: age the decayed sums by the gap, then add it at full weight
+            scale = math.exp(self.decay * age)
+            for column in ('w', 'w_t', 'w_v', 'w_tt', 'w_tv'):
+                aggregate[column] *= scale
+            weight = 1.0
+            if row is not None:
+                aggregate['previous_value'] = aggregate['last_value']
+            aggregate['last_at'] = observed_at
+            aggregate['last_value'] = value
+        else:
+            # An older report arriving late only contributes at its decayed weight
+            weight = math.exp(-self.decay * age)
+        aggregate['w'] += weight
+        aggregate['w_t'] += weight * t
+        aggregate['w_v'] += weight * value
+        aggregate['w_tt'] += weight * t * t
+        aggregate['w_tv'] += weight * t * value
+
+        self._db.execute(
+            f'INSERT OR REPLACE INTO aggregates (patient_id, analyte, {", ".join(AGGREGATE_COLUMNS)}) '
+            f'VALUES (?, ?, {", ".join("?" * len(AGGREGATE_COLUMNS))})',
+            (patient_id, analyte, *(aggregate[column] for column in AGGREGATE_COLUMNS))
+        )
+
+    def trends(self, patient_id: str, analytes: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Current aggregates per analyte, read from the running sums"""
+        query = f'SELECT analyte, {", ".join(AGGREGATE_COLUMNS)} FROM aggregates WHERE patient_id = ?'
+        params = [patient_id]
+        if analytes:
+            query += f' AND analyte IN ({", ".join("?" * len(analytes))})'
+            params.extend(analytes)
+        with self._lock:
+            rows = self._db.execute(query + ' ORDER BY analyte', params).fetchall()
+        return {row[0]: self._summarize(dict(zip(AGGREGATE_COLUMNS, row[1:]))) for row in rows}
+
+    def history(self, patient_id: str, analyte: str, limit: int = 500) -> List[Dict]:
+        """Most recent raw observations of one analyte, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT observed_at, value, report_id FROM observations '
+                'WHERE patient_id = ? AND analyte = ? ORDER BY observed_at DESC LIMIT ?',
+                (patient_id, analyte, limit)
+            ).fetchall()
+        return [
+            {'observed_at': _isoformat(observed_at), 'value': value, 'report_id': report_id}
+            for observed_at, value, report_id in reversed(rows)
+        ]
+
+    def _summarize(self, aggregate: Dict) -> Dict:
+        count = int(aggregate['count'])
+        slope = _slope(count, aggregate['sum_t'], aggregate['sum_v'], aggregate['sum_tt'], aggregate['sum_tv'])
+        rolling_slope = _slope(
+            aggregate['w'], aggregate['w_t'], aggregate['w_v'], aggregate['w_tt'], aggregate['w_tv']
+        )
+        rolling_mean = aggregate['w_v'] / aggregate['w']
+        rolling_slope_per_year = None if rolling_slope is None else rolling_slope * DAYS_PER_YEAR
+
+        direction = None
+        if rolling_slope_per_year is not None:
+            if abs(rolling_slope_per_year) < STABLE_FRACTION_PER_YEAR * abs(rolling_mean):
+                direction = 'stable'
+            else:
+                direction = 'rising' if rolling_slope_per_year > 0 else 'falling'
+
+        previous = aggregate['previous_value']
+        return {
+            'count': count,
+            'first_at': _isoformat(aggregate['first_at']),
+            'last_at': _isoformat(aggregate['last_at']),
+            'last_value': aggregate['last_value'],
+            'change': None if previous is None else aggregate['last_value'] - previous,
+            'min': aggregate['min_value'],
+            'max': aggregate['max_value'],
+            'mean': aggregate['sum_v'] / count,
+            'rolling_mean': rolling_mean,
+            'slope_per_year': None if slope is None else slope * DAYS_PER_YEAR,
+            'rolling_slope_per_year': rolling_slope_per_year,
+            'direction': direction
+        }
@@ -0,0 +1,103 @@
+"""Pathological-input benchmark for DocumentParser.extract_tables
+
+Feeds lines built to trigger regex backtracking (long whitespace runs, word
+runs with no value, long digit runs) at doubling sizes and reports how the
+time grows. A linear extractor roughly doubles per step; the original
+table_row search grows cubically on whitespace-padded lines.
+
+Run from the project root:
+    python benchmarks/bench_extract_tables.py
+    python benchmarks/bench_extract_tables.py --sizes 2000 4000 8000 16000 --legacy-max 1000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models.tables import TableExtractor  # noqa: E402
+
+HEADER = "Test          Result    Unit      Reference Range"
+
+# Each case builds one table body of roughly n characters
+CASES = {
+    'padded_name': lambda n: "Glucose" + " " * n + "x",
+    'blank_padding': lambda n: " " * n + "x",
+    'words_no_value': lambda n: "ab " * (n // 3),
+    'digit_run': lambda n: "Glucose " + "1" * n + " mg/dL",
+    'many_rows': lambda n: "\n".join(["Glucose     95     mg/dL     70-100"] * max(1, n // 35)),
+    'dash_run': lambda n: "Glucose 95 " + "-" * n,
+}
+
+# Largest growth factor per doubling accepted as linear (timer noise included)
+MAX_GROWTH = 3.0
+
+
+def legacy_extract_tables(text):
+    """Original implementation: re-compiled search per line with the backtracking row pattern"""
+    table_row = r'([A-Za-z\s]+)\s+(\d+\.?\d*)\s+([A-Za-z/μ%]*)\s+([A-Za-z\s]*)'
+    tables = []
+    current_table = []
+    in_table = False
+    for line in text.split('\n'):
+        if re.search(r'\b(test|parameter|value|normal|range)\b', line.lower()):
+            in_table = True
+            current_table = []
+            continue
+        if in_table:
+            match = re.search(table_row, line)
+            if match:
+                current_table.append(match.group(1))
+            elif len(line.strip()) == 0:
+                if current_table:
+                    tables.append(current_table)
+                    current_table = []
+                in_table = False
+    return tables
+
+
+def best_of(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 4000, 8000, 16000])
+    parser.add_argument('--legacy-max', type=int, default=1000,
+                        help='largest size to run the original extractor on (it is cubic)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    extractor = TableExtractor()
+    failures = []
+    print(f"{'case':>15} {'n':>7} {'new_ms':>9} {'growth':>7} {'legacy_ms':>10}")
+    for case, build in CASES.items():
+        previous = None
+        for n in args.sizes:
+            text = f"{HEADER}\n{build(n)}\n"
+            elapsed = best_of(extractor.extract, text, args.repeat)
+            growth = elapsed / previous if previous else None
+            # Sub-millisecond timings are too noisy to judge growth
+            if growth is not None and previous > 1e-3 and growth > MAX_GROWTH:
+                failures.append(f"{case} at n={n}: x{growth:.1f}")
+            legacy = best_of(legacy_extract_tables, text, 1) if n <= args.legacy_max else None
+            print(f"{case:>15} {n:>7} {elapsed * 1000:>9.3f} "
+                  f"{'' if growth is None else f'x{growth:.1f}':>7} "
+                  f"{'' if legacy is None else f'{legacy * 1000:.1f}':>10}")
+            previous = elapsed
+
+    if failures:
+        print("Super-linear growth detected:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("All cases scale linearly")
+
+
+if __name__ == '__main__':
+    main()
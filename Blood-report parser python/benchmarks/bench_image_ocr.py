@@ -0,0 +1,170 @@
+"""Benchmark: image OCR pipeline vs sending the raw photo to tesseract
+
+Renders synthetic scanned reports (600 DPI scans and 72 DPI phone photos with
+noise and uneven lighting), then reports latency and the fraction of lab
+values recovered exactly. Needs the tesseract binary unless --stages-only.
+
+Run from the project root:
+    python benchmarks/bench_image_ocr.py --reports 5
+    python benchmarks/bench_image_ocr.py --stages-only
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models.extractor import LabValueExtractor  # noqa: E402
+from utils import image_ocr  # noqa: E402
+
+PAGE_SIZE = (2480, 3508)  # A4 at 300 DPI
+
+FILLER = [
+    "Specimen collected at 08:15, received by laboratory at 09:02.",
+    "Method: enzymatic colorimetric assay on automated analyzer.",
+    "Results verified by technologist.",
+]
+
+RESULTS = {
+    'hemoglobin': ("Hemoglobin: {:.1f} g/dL", (9, 18)),
+    'cholesterol': ("Cholesterol: {:.0f} mg/dL", (120, 280)),
+    'glucose': ("Glucose: {:.0f} mg/dL", (60, 220)),
+    'bmi': ("BMI: {:.1f}", (17, 38)),
+    'weight': ("Weight: {:.0f} kg", (45, 120)),
+}
+
+
+def render_report(seed: int):
+    """Clean 300 DPI page plus the values printed on it"""
+    rng = random.Random(seed)
+    page = Image.new('L', PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=44)
+
+    expected = {}
+    lines = ["CITY DIAGNOSTIC LABORATORY", "Patient: Test Patient    Age: 45", ""]
+    for test, (template, (low, high)) in RESULTS.items():
+        value = round(rng.uniform(low, high), 1 if '.1f' in template else 0)
+        expected[test] = value
+        lines.append(template.format(value))
+        lines.append(rng.choice(FILLER))
+    systolic, diastolic = rng.randint(100, 160), rng.randint(60, 100)
+    expected['blood_pressure_systolic'], expected['blood_pressure_diastolic'] = systolic, diastolic
+    lines.append(f"Blood Pressure: {systolic}/{diastolic} mmHg")
+
+    for i, line in enumerate(lines):
+        draw.text((220, 260 + i * 80), line, fill=20, font=font)
+    return page, expected
+
+
+def as_scan(page: Image.Image, rng: random.Random) -> bytes:
+    """600 DPI flatbed scan with speckle noise"""
+    image = page.resize((PAGE_SIZE[0] * 2, PAGE_SIZE[1] * 2), Image.BICUBIC)
+    pixels = np.asarray(image, dtype=np.int16)
+    noise = np.random.default_rng(rng.randint(0, 1 << 30)).normal(0, 18, pixels.shape)
+    image = Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', dpi=(600, 600))
+    return buffer.getvalue()
+
+
+def as_photo(page: Image.Image, rng: random.Random) -> bytes:
+    """Phone photo: 12 MP, soft focus, lighting gradient, JPEG with 72 DPI metadata"""
+    image = page.resize((3024, 4032), Image.BICUBIC).filter(ImageFilter.GaussianBlur(1.2))
+    pixels = np.asarray(image, dtype=np.float32)
+    gradient = np.linspace(0.75, 1.0, pixels.shape[1], dtype=np.float32)
+    noise = np.random.default_rng(rng.randint(0, 1 << 30)).normal(0, 8, pixels.shape)
+    image = Image.fromarray(np.clip(pixels * gradient + noise, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=88, dpi=(72, 72))
+    return buffer.getvalue()
+
+
+def legacy_ocr(data: bytes) -> str:
+    """Original app.py path: raw PIL image straight to tesseract"""
+    return image_ocr.pytesseract.image_to_string(Image.open(io.BytesIO(data)))
+
+
+def accuracy(text: str, expected: dict, extractor: LabValueExtractor) -> float:
+    found = extractor.extract(text)
+    hits = sum(1 for test, value in expected.items() if abs(found.get(test, -1) - value) < 0.05)
+    return hits / len(expected)
+
+
+def time_stages(data: bytes, max_tiles: int):
+    timings = {}
+    started = time.perf_counter()
+    pixels = image_ocr.decode_image(data)
+    timings['decode'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image_ocr.enhance(pixels)
+    timings['enhance'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    regions = image_ocr.detect_text_regions(pixels, max_tiles=max_tiles)
+    timings['regions'] = time.perf_counter() - started
+    return pixels, regions, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=3, help='synthetic reports per kind')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--stages-only', action='store_true',
+                        help='time decode/enhance/region detection without running tesseract')
+    args = parser.parse_args()
+    if not args.stages_only:
+        try:
+            image_ocr.pytesseract.get_tesseract_version()
+        except image_ocr.pytesseract.TesseractNotFoundError:
+            parser.error('tesseract binary not found; install it or pass --stages-only')
+
+    extractor = LabValueExtractor()
+    rng = random.Random(11)
+    kinds = {'scan600': as_scan, 'photo': as_photo}
+
+    print(f"{'kind':>8} {'path':>8} {'median_ms':>10} {'accuracy':>9}  stages_ms")
+    for kind, make in kinds.items():
+        samples = []
+        for seed in range(args.reports):
+            page, expected = render_report(seed)
+            samples.append((make(page, rng), expected))
+
+        results = {'legacy': ([], []), 'pipeline': ([], [])}
+        stage_totals = {}
+        for data, expected in samples:
+            started = time.perf_counter()
+            pixels, regions, timings = time_stages(data, args.workers)
+            if not args.stages_only:
+                text = image_ocr.ocr_regions(pixels, regions, args.workers)
+                results['pipeline'][0].append(time.perf_counter() - started)
+                results['pipeline'][1].append(accuracy(text, expected, extractor))
+
+                started = time.perf_counter()
+                text = legacy_ocr(data)
+                results['legacy'][0].append(time.perf_counter() - started)
+                results['legacy'][1].append(accuracy(text, expected, extractor))
+            for stage, seconds in timings.items():
+                stage_totals.setdefault(stage, []).append(seconds)
+
+        stages = ' '.join(
+            f"{stage}={statistics.median(values) * 1000:.0f}" for stage, values in stage_totals.items()
+        )
+        if args.stages_only:
+            print(f"{kind:>8} {'pipeline':>8} {'-':>10} {'-':>9}  {stages}")
+            continue
+        for path, (latencies, scores) in results.items():
+            print(f"{kind:>8} {path:>8} {statistics.median(latencies) * 1000:>10.0f} "
+                  f"{statistics.mean(scores):>9.0%}  {stages if path == 'pipeline' else ''}")
+
+
+if __name__ == '__main__':
+    main()
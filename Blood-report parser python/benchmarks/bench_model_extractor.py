@@ -0,0 +1,102 @@
+"""Benchmark: regex-only vs hybrid (regex + model) extraction throughput and recall
+
+Run from the project root:
+    python benchmarks/bench_model_extractor.py --reports 200 --variants 0.5 --threads 1 8
+
+Reports come from the synthetic corpus with the given fraction of analytes
+printed under lab-specific spellings the patterns miss. Recall counts
+values matching the report exactly; a wrong value found for an analyte is
+reported separately, since filling it is worse than leaving it out. The
+hybrid path is timed cold (empty prediction cache) and warm, and with
+several threads so concurrent requests share batched model calls.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from models.extractor import LabValueExtractor, order_values  # noqa: E402
+from models.model_extractor import DEFAULT_VOCABULARY_PATH, LineClassifier, ModelExtractor  # noqa: E402
+from synthetic import LAYOUTS, generate_report  # noqa: E402
+from utils.microbatch import MicroBatcher  # noqa: E402
+
+
+def score(reports, results):
+    expected = sum(len(report.expected) for report in reports)
+    correct = wrong = 0
+    for report, found in zip(reports, results):
+        for test, value in found.items():
+            if report.expected.get(test) == value:
+                correct += 1
+            else:
+                wrong += 1
+    return correct / expected, wrong
+
+
+def run(extract, texts, threads):
+    started = time.perf_counter()
+    if threads == 1:
+        results = [extract(text) for text in texts]
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(extract, texts))
+    return results, len(texts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=200)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--variants', type=float, default=0.5, help='Fraction of analytes under variant spellings')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--batch-wait-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    reports = [
+        generate_report(seed=seed, pages=args.pages, layout=LAYOUTS[seed % len(LAYOUTS)], variants=args.variants)
+        for seed in range(args.reports)
+    ]
+    texts = [report.text for report in reports]
+    rules = LabValueExtractor()
+    classifier = LineClassifier.from_file(DEFAULT_VOCABULARY_PATH)
+
+    def regex_only(text):
+        return rules.extract(text)
+
+    print(f"{args.reports} reports x {args.pages} pages, {args.variants:.0%} variant spellings")
+    print(f"{'path':<22} {'threads':>7} {'reports/s':>10} {'recall':>7} {'wrong':>6} {'mean batch':>11}")
+    for threads in args.threads:
+        results, throughput = run(regex_only, texts, threads)
+        recall, wrong = score(reports, results)
+        print(f"{'regex only':<22} {threads:>7} {throughput:>10.1f} {recall:>7.1%} {wrong:>6} {'-':>11}")
+
+        batches = []
+
+        def predict(labels):
+            batches.append(len(labels))
+            return classifier.predict(labels)
+
+        batcher = MicroBatcher(predict, max_batch_size=args.batch_size, max_wait=args.batch_wait_ms / 1000)
+        model = ModelExtractor(classifier, batcher)
+
+        def hybrid(text):
+            measurements = rules.extract_measurements(text)
+            measurements.update(model.fill_missing(text, measurements))
+            return {test: measurement.value for test, measurement in order_values(measurements).items()}
+
+        for state in ('cold', 'warm'):
+            batches.clear()
+            results, throughput = run(hybrid, texts, threads)
+            recall, wrong = score(reports, results)
+            batch = f"{sum(batches) / len(batches):.1f}" if batches else '-'
+            print(f"{'hybrid (' + state + ' cache)':<22} {threads:>7} {throughput:>10.1f} {recall:>7.1%} "
+                  f"{wrong:>6} {batch:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Micro-benchmark: precompiled lab value extractor vs the original per-test findall scans
+
+Run from the project root:
+    python benchmarks/bench_parse_lab_values.py --pages 40 --repeat 20
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models.extractor import LabValueExtractor  # noqa: E402
+
+FILLER = [
+    "Patient was seen in the outpatient clinic for routine follow-up.",
+    "Specimen collected at 08:15, received by laboratory at 09:02.",
+    "Method: enzymatic colorimetric assay on automated analyzer.",
+    "Comments: sample slightly hemolysed, results verified by technologist.",
+    "Reference intervals are age and sex specific where indicated.",
+]
+
+RESULTS = [
+    "Hemoglobin: {:.1f}",
+    "Cholesterol: {:.0f}",
+    "Glucose: {:.0f}",
+    "Blood Pressure: {:.0f}/{:.0f}",
+    "BMI: {:.1f}",
+    "Weight: {:.0f}",
+    "Height: {:.0f}",
+]
+
+
+def legacy_parse_lab_values(text):
+    """Original implementation: one full re.findall scan per test"""
+    lab_values = {}
+    patterns = {
+        'cholesterol': r'cholesterol[:\s]*(\d+\.?\d*)',
+        'glucose': r'glucose[:\s]*(\d+\.?\d*)',
+        'hemoglobin': r'hemoglobin[:\s]*(\d+\.?\d*)',
+        'blood_pressure': r'blood pressure[:\s]*(\d+)/(\d+)',
+        'bmi': r'bmi[:\s]*(\d+\.?\d*)',
+        'weight': r'weight[:\s]*(\d+\.?\d*)',
+        'height': r'height[:\s]*(\d+\.?\d*)'
+    }
+    text_lower = text.lower()
+    for test, pattern in patterns.items():
+        matches = re.findall(pattern, text_lower)
+        if matches:
+            if test == 'blood_pressure':
+                lab_values['blood_pressure_systolic'] = float(matches[0][0])
+                lab_values['blood_pressure_diastolic'] = float(matches[0][1])
+            else:
+                lab_values[test] = float(matches[0])
+    return lab_values
+
+
+def make_report(pages: int, lines_per_page: int = 60, seed: int = 7) -> str:
+    """Build a multi-panel report with every panel repeated on each page"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(pages):
+        for _ in range(lines_per_page):
+            if rng.random() < 0.2:
+                template = rng.choice(RESULTS)
+                lines.append(template.format(rng.uniform(5, 250), rng.uniform(50, 100)))
+            else:
+                lines.append(rng.choice(FILLER))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 40])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    extractor = LabValueExtractor()
+    print(f"{'pages':>6} {'chars':>9} {'legacy ms':>10} {'compiled ms':>12} {'speedup':>8}")
+    for pages in args.pages:
+        text = make_report(pages)
+        legacy = legacy_parse_lab_values(text)
+        current = extractor.extract(text)
+        # The new extractor may find extra aliased analytes but never disagrees
+        assert all(current[k] == v for k, v in legacy.items()), (legacy, current)
+
+        legacy_s = timeit.timeit(lambda: legacy_parse_lab_values(text), number=args.repeat)
+        current_s = timeit.timeit(lambda: extractor.extract(text), number=args.repeat)
+        print(f"{pages:>6} {len(text):>9} {legacy_s / args.repeat * 1000:>10.3f} "
+              f"{current_s / args.repeat * 1000:>12.3f} {legacy_s / current_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Micro-benchmark: TextPreprocessor fast path vs the original regex/NLTK implementation
+
+Run from the project root:
+    python benchmarks/bench_preprocessing.py --pages 1 10 40 --repeat 20 --workers 4
+
+The NLTK columns are skipped unless punkt and stopwords are available offline
+(NLTK_DATA_PATH or NLTK's default search paths).
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from bench_parse_lab_values import make_report  # noqa: E402
+from utils.preprocessing import TextPreprocessor  # noqa: E402
+
+
+def legacy_clean_text(text):
+    """Original implementation: two regex substitutions and a strip"""
+    text = re.sub(r'[^\w\s\-/:.%μ]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def nltk_available(preprocessor: TextPreprocessor) -> bool:
+    try:
+        preprocessor.tokenize_medical_text('BP 120/80')
+        preprocessor.extract_sentences_with_numbers('BP 120/80.')
+    except (LookupError, ImportError):
+        return False
+    return True
+
+
+def per_call_ms(function, text, repeat):
+    return timeit.timeit(lambda: function(text), number=repeat) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 40])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--documents', type=int, default=200, help='Batch size for process_many')
+    args = parser.parse_args()
+
+    fast = TextPreprocessor()
+    legacy = TextPreprocessor(use_nltk=True)
+    with_nltk = nltk_available(legacy)
+
+    print(f"{'pages':>6} {'chars':>9} {'clean legacy':>13} {'clean fast':>11} "
+          f"{'split nltk':>11} {'split fast':>11} {'tokens nltk':>12} {'tokens fast':>12}  (ms/call)")
+    for pages in args.pages:
+        text = make_report(pages)
+        assert fast.clean_text(text) == legacy_clean_text(text)
+        row = [
+            per_call_ms(legacy_clean_text, text, args.repeat),
+            per_call_ms(fast.clean_text, text, args.repeat),
+            per_call_ms(legacy.extract_sentences_with_numbers, text, args.repeat) if with_nltk else None,
+            per_call_ms(fast.extract_sentences_with_numbers, text, args.repeat),
+            per_call_ms(legacy.tokenize_medical_text, text, args.repeat) if with_nltk else None,
+            per_call_ms(fast.tokenize_medical_text, text, args.repeat),
+        ]
+        widths = (13, 11, 11, 11, 12, 12)
+        cells = ' '.join('-'.rjust(width) if ms is None else f'{ms:>{width}.3f}' for ms, width in zip(row, widths))
+        print(f"{pages:>6} {len(text):>9} {cells}")
+
+    texts = [make_report(1, seed=seed) for seed in range(args.documents)]
+    start = time.perf_counter()
+    serial = list(fast.process_many(texts, workers=1))
+    serial_s = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = list(fast.process_many(texts, workers=args.workers))
+    parallel_s = time.perf_counter() - start
+    assert parallel == serial
+    print(f"\nprocess_many, {args.documents} one-page documents: serial {serial_s * 1000:.1f} ms, "
+          f"{args.workers} workers {parallel_s * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
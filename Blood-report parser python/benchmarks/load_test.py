@@ -0,0 +1,95 @@
+"""Load test: POST the sample report to a running server and report latency percentiles
+
+Start the server first, e.g. from backend/:
+    gunicorn -c gunicorn.conf.py app:app
+
+then from the project root:
+    python benchmarks/load_test.py --concurrency 8 --requests 400
+    python benchmarks/load_test.py --unique   # defeat the result cache
+
+Uses only the standard library.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib import error, request
+
+SAMPLE_REPORT = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_reports', 'sample_report.txt')
+
+
+def multipart_body(filename: str, content: bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        'Content-Type: text/plain\r\n\r\n'
+    ).encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000/analyze')
+    parser.add_argument('--file', default=SAMPLE_REPORT)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10, help='requests sent before measuring')
+    parser.add_argument('--unique', action='store_true',
+                        help='make every upload distinct so the result cache never answers')
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as file:
+        content = file.read()
+    filename = os.path.basename(args.file)
+    counter = iter(range(1 << 62))
+    counter_lock = threading.Lock()
+
+    def send():
+        payload = content
+        if args.unique:
+            with counter_lock:
+                payload = content + f'\nRequest {next(counter)}\n'.encode('utf-8')
+        body, content_type = multipart_body(filename, payload)
+        req = request.Request(args.url, data=body, headers={'Content-Type': content_type})
+        started = time.perf_counter()
+        try:
+            with request.urlopen(req, timeout=120) as response:
+                response.read()
+                status = response.status
+        except error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = None
+        return time.perf_counter() - started, status
+
+    for _ in range(args.warmup):
+        send()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda _: send(), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, status in results if status == 200)
+    failures = len(results) - len(latencies)
+    print(f"url          {args.url}")
+    print(f"requests     {len(results)} ({failures} failed), concurrency {args.concurrency}")
+    print(f"throughput   {len(results) / elapsed:.1f} req/s")
+    if latencies:
+        print(f"latency ms   p50 {percentile(latencies, 0.50) * 1000:.1f}  "
+              f"p90 {percentile(latencies, 0.90) * 1000:.1f}  "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f}  "
+              f"max {latencies[-1] * 1000:.1f}  mean {statistics.mean(latencies) * 1000:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Compare a benchmark run with the stored baseline; exit 1 if throughput regressed
+
+Run from the project root:
+    python -m pytest tests/test_benchmarks.py --bench-json bench.json
+    python tests/compare_benchmarks.py bench.json                 # fail on >25% lower ops/s
+    python tests/compare_benchmarks.py bench.json --threshold 0.1
+    python tests/compare_benchmarks.py bench.json --update        # accept the run as the new baseline
+
+Baselines are only comparable on the machine that recorded them; record a
+new one (--update) when the hardware or Python version changes.
+"""
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+
+def load(path: str) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Yield (name, baseline ops, current ops, change, verdict) per benchmark, sorted by name"""
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            yield name, baseline[name]['ops'], None, None, 'missing'
+            continue
+        if name not in baseline:
+            yield name, None, current[name]['ops'], None, 'new'
+            continue
+        before, after = baseline[name]['ops'], current[name]['ops']
+        change = after / before - 1
+        if change < -threshold:
+            verdict = 'REGRESSED'
+        elif change > threshold:
+            verdict = 'faster'
+        else:
+            verdict = 'ok'
+        yield name, before, after, change, verdict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('results', help='JSON written by pytest --bench-json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed fractional drop in ops/s before failing (default 0.25)')
+    parser.add_argument('--update', action='store_true', help='Write the results as the new baseline')
+    args = parser.parse_args()
+
+    results = load(args.results)
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f"Baseline updated: {len(results['benchmarks'])} benchmarks -> {args.baseline}")
+        return 0
+
+    baseline = load(args.baseline)
+    if baseline['machine'] != results['machine']:
+        print(f"warning: baseline recorded on {baseline['machine']}, this run on {results['machine']}")
+
+    rows = list(compare(baseline['benchmarks'], results['benchmarks'], args.threshold))
+    width = max(len(row[0]) for row in rows)
+    print(f"{'name':<{width}} {'base ops/s':>12} {'ops/s':>12} {'change':>8}  verdict")
+    for name, before, after, change, verdict in rows:
+        print(f"{name:<{width}} {'-' if before is None else f'{before:.1f}':>12} "
+              f"{'-' if after is None else f'{after:.1f}':>12} "
+              f"{'-' if change is None else f'{change:+.1%}':>8}  {verdict}")
+
+    regressed = [row[0] for row in rows if row[4] == 'REGRESSED']
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
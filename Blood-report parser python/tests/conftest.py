@@ -0,0 +1,148 @@
+"""Shared pytest setup: backend on sys.path, the app and analyzer fixtures and a small
+pytest-benchmark-style fixture
+
+benchmark(function, *args, **kwargs) calls function once for its result,
+then times repeated rounds of it and records ops/second (from the fastest
+round) under the test's node id. Results are printed at the end of the run and, with
+--bench-json PATH, written for tests/compare_benchmarks.py.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import pytest
+
+TESTS_DIR = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'backend'))
+sys.path.insert(0, TESTS_DIR)
+
+# One timed round lasts at least this long; short calls are repeated inside a round
+MIN_ROUND_SECONDS = 0.002
+MIN_ROUNDS = 5
+
+# Node id -> stats of every benchmark run in this session
+_RESULTS = pytest.StashKey[dict]()
+
+
+@pytest.fixture(scope='session')
+def make_app():
+    """create_app with TestingConfig, any settings given overriding it"""
+    from app import create_app
+    from config import TestingConfig
+
+    def make(**settings):
+        return create_app(type('TestConfig', (TestingConfig,), settings) if settings else TestingConfig)
+
+    return make
+
+
+@pytest.fixture(scope='session')
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture(scope='session')
+def analyzer():
+    from app import HealthReportAnalyzer
+    return HealthReportAnalyzer()
+
+
+@pytest.fixture(scope='session')
+def advanced_analyzer():
+    from models.analyzer import AdvancedHealthAnalyzer
+    return AdvancedHealthAnalyzer()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'benchmarks')
+    group.addoption('--bench-json', metavar='PATH', help='Write benchmark results to PATH')
+    group.addoption('--bench-time', type=float, default=0.3,
+                    help='Seconds of timed rounds per benchmark (default 0.3)')
+    group.addoption('--bench-quick', action='store_true',
+                    help='Call each benchmarked function once, without timing (correctness only)')
+
+
+class Benchmark:
+    """Times one function and keeps its stats"""
+
+    def __init__(self, name: str, max_time: float, quick: bool):
+        self.name = name
+        self.max_time = max_time
+        self.quick = quick
+        self.stats = None
+
+    def __call__(self, function, *args, **kwargs):
+        result = function(*args, **kwargs)
+        if self.quick:
+            return result
+
+        # Calibrate: repeat short calls within a round so timer resolution does not dominate
+        iterations = 1
+        while self._time(function, args, kwargs, iterations) < MIN_ROUND_SECONDS and iterations < 10 ** 6:
+            iterations *= 10
+
+        rounds = []
+        deadline = time.perf_counter() + self.max_time
+        while len(rounds) < MIN_ROUNDS or time.perf_counter() < deadline:
+            rounds.append(self._time(function, args, kwargs, iterations) / iterations)
+        self.stats = {
+            'rounds': len(rounds),
+            'iterations': iterations,
+            'min': min(rounds),
+            'median': statistics.median(rounds),
+            'mean': statistics.fmean(rounds),
+            'stddev': statistics.stdev(rounds),
+            # The fastest round is the least disturbed by other load on the machine
+            'ops': 1 / min(rounds),
+        }
+        return result
+
+    @staticmethod
+    def _time(function, args, kwargs, iterations: int) -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function(*args, **kwargs)
+        return time.perf_counter() - started
+
+
+@pytest.fixture
+def benchmark(request):
+    config = request.config
+    bench = Benchmark(request.node.nodeid, config.getoption('--bench-time'), config.getoption('--bench-quick'))
+    yield bench
+    if bench.stats is not None:
+        config.stash.setdefault(_RESULTS, {})[bench.name] = bench.stats
+
+
+def machine_info() -> dict:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash.get(_RESULTS, {})
+    if not results:
+        return
+    terminalreporter.section('benchmarks')
+    width = max(len(name) for name in results)
+    terminalreporter.write_line(f"{'name':<{width}} {'min ms':>10} {'median ms':>11} {'ops/s':>12} {'rounds':>7}")
+    for name, stats in sorted(results.items()):
+        terminalreporter.write_line(
+            f"{name:<{width}} {stats['min'] * 1000:>10.4f} {stats['median'] * 1000:>11.4f} "
+            f"{stats['ops']:>12.1f} {stats['rounds']:>7}"
+        )
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('--bench-json')
+    results = session.config.stash.get(_RESULTS, {})
+    if path and results:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'machine': machine_info(), 'benchmarks': results}, file, indent=2, sort_keys=True)
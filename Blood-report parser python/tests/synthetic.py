@@ -0,0 +1,210 @@
+"""Deterministic synthetic lab reports for the benchmark and regression suites
+
+A SyntheticReport is generated from a seed and renders to plain text, a PDF
+with a text layer, or a PNG scan. The same seed and options always give the
+same bytes, so timings and extracted values are comparable between runs.
+
+    report = generate_report(seed=3, pages=10, analytes=8, noise=0.5, layout='table')
+    report = generate_report(seed=3, variants=1.0)   # lab-specific spellings the patterns miss
+    report = generate_report(seed=3, si_units=1.0)   # SI units; expected holds canonical values
+    report.text, report.to_pdf(), report.to_image(), report.expected
+"""
+import io
+import random
+from typing import Dict, List, Optional
+
+# Analyte -> (printed name, unit, generated value range, decimals, printed reference range)
+ANALYTES = {
+    'hemoglobin': ('Hemoglobin', 'g/dL', (9.0, 18.0), 1, '12.0-15.5'),
+    'cholesterol': ('Cholesterol', 'mg/dL', (120, 280), 0, '0-200'),
+    'glucose': ('Glucose', 'mg/dL', (60, 220), 0, '70-100'),
+    'bmi': ('BMI', 'kg/m2', (17.0, 38.0), 1, '18.5-24.9'),
+    'creatinine': ('Creatinine', 'mg/dL', (0.5, 2.5), 2, '0.6-1.2'),
+    'triglycerides': ('Triglycerides', 'mg/dL', (60, 400), 0, '0-150'),
+    'weight': ('Weight', 'kg', (45, 120), 0, ''),
+    'height': ('Height', 'cm', (150, 195), 0, ''),
+}
+# Spellings other labs print that the rule patterns do not match, for the model-backed extractor
+VARIANTS = {
+    'hemoglobin': ['Haemoglobin', 'Haemoglobin (Hb)', 'Hemoglobin (HGB)'],
+    'cholesterol': ['Cholesterol, Total', 'S. Cholesterol (Total)'],
+    'glucose': ['Fasting Blood Sugar (FBS)', 'Glucose, Fasting', 'Plasma Glucose (F)'],
+    'bmi': ['Body Mass Index (BMI)'],
+    'creatinine': ['Creatinine, Serum', 'Serum Creatinine (S.Cr)'],
+    'triglycerides': ['Triglyceride', 'TG', 'Triglycerides (TG)'],
+    'weight': ['Body Wt.', 'Wt.'],
+    'height': ['Ht.', 'Stature'],
+}
+# SI printing: analyte -> (unit, factor to the canonical unit, decimals, printed reference range);
+# factors match the conversions in backend/models/reference_ranges.json
+SI_UNITS = {
+    'hemoglobin': ('g/L', 0.1, 0, '120-155'),
+    'cholesterol': ('mmol/L', 38.67, 2, '0.00-5.17'),
+    'glucose': ('mmol/L', 18.016, 1, '3.9-5.6'),
+    'creatinine': ('µmol/L', 0.01131, 0, '53-106'),
+    'triglycerides': ('mmol/L', 88.57, 2, '0.00-1.69'),
+}
+# Blood pressure is printed as one "systolic/diastolic" reading
+BLOOD_PRESSURE = ('blood_pressure_systolic', 'blood_pressure_diastolic')
+MAX_ANALYTES = len(ANALYTES) + 1
+
+LAYOUTS = ('colon', 'table', 'prose')
+
+# Filler lines never name an analyte, so they can only add noise, not values
+FILLER = [
+    "Specimen collected at 08:15, received by laboratory at 09:02.",
+    "Method: enzymatic colorimetric assay on automated analyzer.",
+    "Comments: sample slightly hemolysed, results verified by technologist.",
+    "Reference intervals are age and sex specific where indicated.",
+    "Report ID 2024-118734, page printed on 12/03/2024.",
+    "Please correlate clinically; repeat testing advised if results are unexpected.",
+]
+HEADER = ["CITY DIAGNOSTIC LABORATORY", "Patient: Test Patient    Age: 45    Sex: F", ""]
+TABLE_HEADER = f"{'Test':<24}{'Result':<10}{'Unit':<10}Reference Range"
+
+
+class SyntheticReport:
+    """Generated report lines plus the values a correct extractor must find"""
+
+    def __init__(self, pages: List[List[str]], expected: Dict[str, float], seed: int):
+        self.pages = pages
+        self.expected = expected
+        self.seed = seed
+
+    @property
+    def text(self) -> str:
+        return '\n'.join('\n'.join(lines) for lines in self.pages)
+
+    def to_txt(self) -> bytes:
+        return self.text.encode('utf-8')
+
+    def to_pdf(self) -> bytes:
+        """PDF with one text-layer page per report page (Helvetica, no external tools)"""
+        return _write_pdf(self.pages)
+
+    def to_image(self, width: int = 1240, line_height: int = 30, dpi: int = 150) -> bytes:
+        """First page rendered as a grayscale PNG scan"""
+        from PIL import Image, ImageDraw, ImageFont
+
+        lines = self.pages[0]
+        image = Image.new('L', (width, line_height * (len(lines) + 4)), 255)
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=line_height * 2 // 3)
+        for number, line in enumerate(lines):
+            draw.text((line_height * 2, line_height * (number + 2)), line, fill=0, font=font)
+        output = io.BytesIO()
+        image.save(output, 'PNG', dpi=(dpi, dpi))
+        return output.getvalue()
+
+
+def generate_report(seed: int = 0, pages: int = 1, analytes: int = MAX_ANALYTES, noise: float = 0.5,
+                    layout: str = 'colon', names: Optional[List[str]] = None,
+                    variants: float = 0.0, si_units: float = 0.0) -> SyntheticReport:
+    """Build a report; every page repeats the panel with new values
+
+    analytes picks how many panel entries are printed (blood pressure counts
+    as one), noise is the fraction of lines that are filler, and layout is
+    'colon' ("Glucose: 105 mg/dL"), 'table' (fixed-width columns under a
+    header) or 'prose' (values inside sentences). variants is the fraction
+    of analytes printed under a VARIANTS spelling, the same one on every
+    page. si_units is the fraction of SI_UNITS analytes printed in SI units
+    with an SI reference range. expected holds the values of the first page
+    in canonical units, which is what the extractors report.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}")
+    rng = random.Random(seed)
+    panel = names or (list(ANALYTES) + ['blood_pressure'])[:analytes]
+    filler_per_result = noise / (1 - noise) if noise < 1 else 0
+    # Drawn from a separate generator so variants=0 reports keep their exact bytes
+    spelling_rng = random.Random(f'{seed}:spellings')
+    labels = {
+        name: spelling_rng.choice(VARIANTS[name])
+        for name in panel if name in VARIANTS and spelling_rng.random() < variants
+    }
+    unit_rng = random.Random(f'{seed}:units')
+    si = {name for name in panel if name in SI_UNITS and unit_rng.random() < si_units}
+
+    report_pages, expected = [], {}
+    for page in range(pages):
+        lines = list(HEADER) if page == 0 else []
+        if layout == 'table':
+            lines.append(TABLE_HEADER)
+        for name in panel:
+            line, values = _result_line(rng, name, layout, labels.get(name), name in si)
+            lines.append(line)
+            if page == 0:
+                expected.update(values)
+            # Fractional filler counts are spread evenly over the panel
+            for _ in range(int(filler_per_result) + (rng.random() < filler_per_result % 1)):
+                lines.append(rng.choice(FILLER))
+        report_pages.append(lines)
+    return SyntheticReport(report_pages, expected, seed)
+
+
+def _result_line(rng: random.Random, name: str, layout: str, spelling: Optional[str] = None, si: bool = False):
+    if name == 'blood_pressure':
+        systolic, diastolic = rng.randint(100, 170), rng.randint(60, 105)
+        values = dict(zip(BLOOD_PRESSURE, (float(systolic), float(diastolic))))
+        if layout == 'table':
+            return f"{'Blood Pressure':<24}{f'{systolic}/{diastolic}':<10}{'mmHg':<10}120/80", values
+        if layout == 'prose':
+            return f"Resting blood pressure {systolic}/{diastolic} mmHg, seated.", values
+        return f"Blood Pressure: {systolic}/{diastolic} mmHg", values
+
+    label, unit, (low, high), decimals, reference = ANALYTES[name]
+    label = spelling or label
+    value = round(rng.uniform(low, high), decimals)
+    printed = f"{value:.{decimals}f}"
+    canonical = float(printed)
+    if si:
+        unit, factor, decimals, reference = SI_UNITS[name]
+        printed = f"{value / factor:.{decimals}f}"
+        # The same arithmetic as the converter, so the values compare exactly
+        canonical = round(float(printed) * factor, 2)
+    if layout == 'table':
+        line = f"{label:<{max(24, len(label) + 2)}}{printed:<10}{unit:<10}{reference}"
+    elif layout == 'prose':
+        line = f"Measured {label.lower()} {printed} {unit} on the automated analyzer."
+    else:
+        line = f"{label}: {printed} {unit}"
+    return line.rstrip(), {name: canonical}
+
+
+def _escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _write_pdf(pages: List[List[str]], font_size: int = 10) -> bytes:
+    """Minimal PDF 1.4 writer: one content stream of Tj lines per page"""
+    page_count = len(pages)
+    # Objects: 1 catalog, 2 page tree, 3 font, then a (page, contents) pair per page
+    page_ids = [4 + 2 * index for index in range(page_count)]
+    objects = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        2: ('<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join(f'{page_id} 0 R' for page_id in page_ids), page_count)).encode(),
+        3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    }
+    leading = font_size + 2
+    for page_id, lines in zip(page_ids, pages):
+        height = max(842, 72 + leading * len(lines))
+        content = f'BT /F1 {font_size} Tf {leading} TL 36 {height - 36} Td\n'
+        content += ''.join(f'({_escape(line)}) Tj T*\n' for line in lines) + 'ET'
+        content = content.encode('latin-1', 'replace')
+        objects[page_id] = (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 {height}] '
+            f'/Contents {page_id + 1} 0 R /Resources << /Font << /F1 3 0 R >> >> >>'
+        ).encode()
+        objects[page_id + 1] = b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content)
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number in range(1, len(objects) + 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, objects[number])
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
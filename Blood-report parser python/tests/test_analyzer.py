@@ -0,0 +1,142 @@
+"""Behavior of lab value extraction, unit normalization and range evaluation"""
+import io
+
+import pytest
+
+from models.units import Measurement
+from synthetic import LAYOUTS, generate_report
+
+
+def _analyze(app, text):
+    data = {'file': (io.BytesIO(text.encode('utf-8')), 'report.txt')}
+    response = app.test_client().post('/analyze', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.mark.parametrize('text, test, expected', [
+    ('Glucose 7.2 mmol/L (3.9-5.6)', 'glucose', Measurement(7.2, 'mmol/l', 3.9, 5.6)),
+    ('Glucose 5.4 mmol/L  ref: 3.9-5.6', 'glucose', Measurement(5.4, 'mmol/l', 3.9, 5.6)),
+    ('Glucose 5.4 mmol/L [ref range: 3.9 - 5.6]', 'glucose', Measurement(5.4, 'mmol/l', 3.9, 5.6)),
+    ('Cholesterol 4.2 mmol/L < 5.2', 'cholesterol', Measurement(4.2, 'mmol/l', None, 5.2)),
+    ('Cholesterol 180 (< 200)', 'cholesterol', Measurement(180.0, '', None, 200.0)),
+    ('White blood cells 7.2 x10^9/L (4.0-11.0)', 'white_blood_cells', Measurement(7.2, 'x10^9/l', 4.0, 11.0)),
+])
+def test_printed_range_after_unit_or_in_brackets(analyzer, text, test, expected):
+    assert analyzer.lab_extractor.extract_measurements(text) == {test: expected}
+
+
+@pytest.mark.parametrize('text, expected', [
+    # A date is not a range, after a unit or in brackets
+    ('Hemoglobin: 14.1 g/dL 2023-01-05', Measurement(14.1, 'g/dl')),
+    ('Glucose 95 mg/dL 12-15-2023', Measurement(95.0, 'mg/dl')),
+    ('Glucose 95 mg/dL 12/15', Measurement(95.0, 'mg/dl')),
+    ('Glucose 95 (2023-01-05)', Measurement(95.0)),
+    # A word after the value is not a unit, so what follows it is not a range either
+    ('Glucose: 95 Date 12-15', Measurement(95.0)),
+    ('Glucose: 95 on 12-15', Measurement(95.0)),
+    # Without a unit or brackets two numbers are not taken as a range
+    ('Glucose 95 70-100', Measurement(95.0)),
+])
+def test_text_after_value_not_taken_as_range(analyzer, text, expected):
+    assert list(analyzer.lab_extractor.extract_measurements(text).values()) == [expected]
+
+
+def test_date_after_value_keeps_reference_range(app):
+    analysis = _analyze(app, 'Hemoglobin: 14.1 g/dL 2023-01-05\nSex: male')['analysis']['hemoglobin']
+    assert analysis['normal_range'] == '12.0-17.5 g/dL'
+    assert analysis['status'] == 'normal'
+
+
+def test_word_after_value_is_not_a_unit(app):
+    analysis = _analyze(app, 'Glucose: 95 Date 12-15')['analysis']['glucose']
+    assert analysis['normal_range'] == '70-100 mg/dL'
+    assert analysis['status'] == 'normal'
+
+
+def test_si_value_converted_and_judged_against_printed_range(app):
+    result = _analyze(app, 'Glucose 7.2 mmol/L (3.9-5.6)\nCholesterol 4.2 mmol/L < 5.2')
+    assert result['lab_values'] == {'glucose': 129.72, 'cholesterol': 162.41}
+    assert result['analysis']['glucose']['normal_range'] == '70.26-100.89 mg/dL'
+    assert result['analysis']['glucose']['status'] == 'high'
+    assert result['analysis']['cholesterol']['normal_range'] == '<201.08 mg/dL'
+    assert result['analysis']['cholesterol']['status'] == 'normal'
+
+
+def test_unitless_range_off_reference_scale_left_as_printed(app, advanced_analyzer):
+    from models.results import lab_values_of
+
+    # 3.9-5.6 is a mmol/L range printed without its unit, not mg/dL
+    result = _analyze(app, 'Glucose: 7.2 (3.9-5.6)\nCholesterol: 180 (< 200)')
+    assert result['lab_values'] == {'glucose': 7.2, 'cholesterol': 180.0}
+    assert result['analysis']['glucose'] == {
+        'value': 7.2, 'status': 'high', 'normal_range': '3.9-5.6', 'unit_unknown': True
+    }
+    # A unitless range that fits the reference one is read in its unit
+    assert result['analysis']['cholesterol'] == {'value': 180.0, 'status': 'normal', 'normal_range': '<200 mg/dL'}
+    assert result['unit_unknown'] == ['glucose']
+    assert lab_values_of(result) == {'cholesterol': 180.0}
+    assert advanced_analyzer.calculate_risk_score(result['analysis'])['diabetes_risk'] == 0
+
+
+def test_unit_unknown_for_analyte_kept_as_printed(analyzer):
+    # kg is a unit, but not one hemoglobin is converted from
+    lab_values, lab_ranges = analyzer.normalize_measurements({'hemoglobin': Measurement(14.1, 'kg', 1.0, 2.0)})
+    assert lab_values == {'hemoglobin': 14.1}
+    assert (lab_ranges['hemoglobin'].display, lab_ranges['hemoglobin'].unit_known) == ('1-2 kg', False)
+
+    # Without a printed range nothing can judge it
+    lab_values, lab_ranges = analyzer.normalize_measurements({'hemoglobin': Measurement(14.1, 'kg')})
+    assert lab_ranges == {'hemoglobin': None}
+    assert analyzer.analyze_values(lab_values, lab_ranges=lab_ranges) == ({}, [])
+
+
+def test_evaluate_batch_keeps_unknown_unit_as_printed(analyzer, advanced_analyzer):
+    from models.batch_analyzer import HIGH
+
+    reports = [
+        {'glucose': Measurement(95.0, 'kg', 5.0, 6.0)},
+        {'glucose': Measurement(95.0, 'mg/dl', 5.0, 6.0)},
+        {'glucose': Measurement(7.2, '', 3.9, 5.6)},
+        {'glucose': Measurement(95.0, 'kg')},
+    ]
+    result = advanced_analyzer.evaluate_batch(reports)
+    column = result.analyzer.columns['glucose']
+    assert result.status[:3, column].tolist() == [HIGH, HIGH, HIGH]
+    assert result.unit_unknown[:, column].tolist() == [True, False, True, True]
+    assert result.present[:, column].tolist() == [True, True, True, False]
+    assert result.risk_scores()['diabetes_risk'].tolist() == [0, 50, 0, 0]
+
+    for row, measurements in enumerate(reports):
+        lab_values, lab_ranges = analyzer.normalize_measurements(measurements)
+        analysis, _ = analyzer.analyze_values(lab_values, lab_ranges=lab_ranges)
+        assert {test: entry.to_json() for test, entry in result.report(row)[0].items()} == \
+            {test: entry.to_json() for test, entry in analysis.items()}
+
+
+def test_evaluate_batch_matches_per_report_path(analyzer, advanced_analyzer):
+    reports = [generate_report(seed=seed, layout=LAYOUTS[seed % len(LAYOUTS)]) for seed in range(40)]
+    batch = advanced_analyzer.evaluate_batch([report.expected for report in reports])
+    scores = batch.risk_scores()
+
+    for row, report in enumerate(reports):
+        analysis, alerts = analyzer.analyze_values(report.expected)
+        batch_analysis, batch_alerts = batch.report(row)
+        assert {test: entry.to_json() for test, entry in batch_analysis.items()} == \
+            {test: entry.to_json() for test, entry in analysis.items()}
+        assert {alert.test: alert.to_json() for alert in batch_alerts} == \
+            {alert.test: alert.to_json() for alert in alerts}
+
+        expected = advanced_analyzer.calculate_risk_score({test: entry.to_json() for test, entry in analysis.items()})
+        assert {name: float(values[row]) for name, values in scores.items()} == pytest.approx(expected)
+    # Glucose and cholesterol weigh in, as in calculate_risk_score
+    assert scores['diabetes_risk'].any()
+
+
+def test_basic_recommendations_only_name_judged_tests(analyzer):
+    # The basic analyzer judges the standard panel; a rule on anything else can never fire
+    from models.reference_ranges import default_store
+
+    panel = default_store().current().panel('standard')
+    named = {test for test, _ in analyzer.recommendation_rules.state_bits}
+    assert named <= set(panel)
@@ -0,0 +1,96 @@
+"""Batch analysis: the NDJSON endpoint, zip archives and the directory CLI"""
+import io
+import zipfile
+
+import pytest
+
+from synthetic import generate_report
+from utils.serialization import loads
+
+REPORTS = [generate_report(seed=seed) for seed in range(10, 14)]
+
+
+@pytest.fixture(scope='module')
+def batch_app(make_app):
+    return make_app(BATCH_WORKERS=1, MAX_CONTENT_LENGTH=1 << 20, MAX_ARCHIVE_MEMBERS=4, MAX_ARCHIVE_SIZE=3 << 19)
+
+
+def _zip(members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return output.getvalue()
+
+
+def _post(app, files, query=''):
+    data = {'files': [(io.BytesIO(content), name) for name, content in files]}
+    return app.test_client().post('/analyze/batch' + query, data=data, content_type='multipart/form-data')
+
+
+def _records(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    *records, summary = [loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return {record['file']: record for record in records}, summary['summary']
+
+
+def test_files_and_zip_members_each_get_a_record(batch_app):
+    archive = _zip({
+        'lab/c.txt': REPORTS[2].to_txt(),
+        'lab/d.txt': REPORTS[3].to_txt(),
+        'lab/notes.docx': b'not a report',
+    })
+    records, summary = _records(_post(batch_app, [
+        ('a.txt', REPORTS[0].to_txt()), ('b.txt', REPORTS[1].to_txt()), ('reports.zip', archive),
+        ('skipped.exe', b'MZ')
+    ]))
+    assert sorted(records) == ['a.txt', 'b.txt', 'lab/c.txt', 'lab/d.txt']
+    for name, report in zip(sorted(records), REPORTS):
+        assert records[name]['success'] is True
+        assert records[name]['result']['lab_values'] == report.expected
+    assert (summary['files'], summary['succeeded'], summary['failed']) == (4, 4, 0)
+
+
+def test_compact_leaves_out_text(batch_app):
+    records, _ = _records(_post(batch_app, [('a.txt', REPORTS[0].to_txt())], '?compact=1'))
+    assert 'extracted_text' not in records['a.txt']['result']
+
+
+def test_oversized_zip_member_refused_before_inflating(batch_app):
+    archive = _zip({'big.txt': b'0' * (2 << 20)})
+    response = _post(batch_app, [('reports.zip', archive)])
+    assert response.status_code == 413
+    assert response.get_json()['limit'] == 'archive_member'
+
+
+@pytest.mark.parametrize('members, limit', [
+    # Only reports count: the skipped member does not
+    ({f'{i}.txt': b'0' for i in range(5)}, 'archive_members'),
+    ({'a.txt': b'0' * (1 << 20), 'b.txt': b'0' * (1 << 19) + b'0', 'skipped.bin': b'0' * (1 << 20)}, 'archive_size'),
+])
+def test_too_many_or_too_large_zip_members_refused(batch_app, members, limit):
+    response = _post(batch_app, [('reports.zip', _zip(members))])
+    assert response.status_code == 413
+    assert response.get_json()['limit'] == limit
+
+
+def test_no_files(batch_app):
+    assert batch_app.test_client().post('/analyze/batch').status_code == 400
+
+
+def test_cli_writes_ndjson(tmp_path):
+    from batch import main
+
+    reports = tmp_path / 'reports'
+    (reports / 'nested').mkdir(parents=True)
+    (reports / 'a.txt').write_bytes(REPORTS[0].to_txt())
+    (reports / 'nested' / 'b.txt').write_bytes(REPORTS[1].to_txt())
+    (reports / 'readme.md').write_text('not a report')
+    output = tmp_path / 'results.ndjson'
+
+    main([str(reports), '--workers', '1', '--compact', '-o', str(output)])
+    *records, summary = [loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record['file'] for record in records) == ['a.txt', 'nested/b.txt']
+    assert all('extracted_text' not in record['result'] for record in records)
+    assert summary['summary']['succeeded'] == 2
@@ -0,0 +1,146 @@
+"""Benchmarks of the extraction and analysis hot paths on synthetic reports
+
+Each benchmark also checks its output, so a faster but wrong change fails
+here before its timings are compared. Run from the project root:
+
+    python -m pytest tests/test_benchmarks.py --bench-json bench.json
+    python tests/compare_benchmarks.py bench.json
+"""
+import io
+import itertools
+import shutil
+
+import pytest
+
+from synthetic import LAYOUTS, generate_report
+
+# Pages per report: a single page, a typical multi-panel report, a long history
+SIZES = (1, 10, 40)
+
+
+@pytest.fixture(scope='module')
+def document_parser():
+    from models.parser import DocumentParser
+    return DocumentParser()
+
+
+@pytest.mark.parametrize('pages', SIZES)
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_parse_lab_values(benchmark, analyzer, layout, pages):
+    report = generate_report(seed=pages, pages=pages, layout=layout)
+    lab_values = benchmark(analyzer.parse_lab_values, report.text)
+    assert lab_values == report.expected
+
+
+@pytest.mark.parametrize('noise', (0.0, 0.5, 0.9))
+def test_parse_lab_values_noise(benchmark, analyzer, noise):
+    report = generate_report(seed=11, pages=10, noise=noise)
+    assert benchmark(analyzer.parse_lab_values, report.text) == report.expected
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_parse_lab_values_si_units(benchmark, analyzer, layout):
+    report = generate_report(seed=5, pages=10, layout=layout, si_units=1.0)
+    assert benchmark(analyzer.parse_lab_values, report.text) == report.expected
+
+
+def test_evaluate_batch_units(benchmark, analyzer):
+    from models.batch_analyzer import BatchRangeAnalyzer
+    index = analyzer.reference_ranges.current()
+    batch_analyzer = BatchRangeAnalyzer(index.panel('standard'), units=index.units)
+    reports = [
+        analyzer.lab_extractor.extract_measurements(
+            generate_report(seed=seed, layout=LAYOUTS[seed % len(LAYOUTS)], si_units=0.5).text)
+        for seed in range(200)
+    ]
+    batch = benchmark(batch_analyzer.evaluate, reports)
+    # Vectorized conversion and printed ranges agree with the per-report path
+    for measurements, (analysis, _) in zip(reports[:20], batch):
+        lab_values, lab_ranges = analyzer.normalize_measurements(measurements)
+        expected, _ = analyzer.analyze_values(lab_values, lab_ranges=lab_ranges)
+        assert {test: entry.to_json() for test, entry in analysis.items()} == \
+            {test: entry.to_json() for test, entry in expected.items()}
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_model_extractor(benchmark, analyzer, layout):
+    from models.model_extractor import default_model_extractor
+    model = default_model_extractor()
+    report = generate_report(seed=7, pages=10, layout=layout, variants=1.0)
+
+    def hybrid(text):
+        measurements = analyzer.lab_extractor.extract_measurements(text)
+        measurements.update(model.fill_missing(text, measurements))
+        return analyzer.normalize_measurements(measurements)[0]
+    # Only blood pressure is printed the way the patterns expect
+    assert len(analyzer.parse_lab_values(report.text)) == 2
+    assert benchmark(hybrid, report.text) == report.expected
+
+
+@pytest.mark.parametrize('pages', SIZES)
+def test_extract_medical_entities(benchmark, document_parser, pages):
+    report = generate_report(seed=pages, pages=pages)
+    entities = benchmark(document_parser.extract_medical_entities, report.text)
+    assert entities['glucose']['unit'] == 'mg/dl'
+
+
+@pytest.mark.parametrize('pages', SIZES)
+def test_extract_tables(benchmark, document_parser, pages):
+    report = generate_report(seed=pages, pages=pages, layout='table')
+    tables = benchmark(document_parser.extract_tables, report.text)
+    assert len(tables) == pages
+    assert tables[0][0]['test'] == 'Hemoglobin'
+    assert tables[0][0]['value'] == report.expected['hemoglobin']
+
+
+@pytest.mark.parametrize('analytes', (3, 9))
+def test_analyze_values(benchmark, analyzer, analytes):
+    lab_values = generate_report(seed=analytes, analytes=analytes).expected
+    analysis, alerts = benchmark(analyzer.analyze_values, lab_values, 'female', 45)
+    assert set(analysis) <= set(lab_values)
+    assert all(alert.test in analysis for alert in alerts)
+
+
+def test_calculate_risk_score(benchmark, analyzer, advanced_analyzer):
+    analysis, _ = analyzer.analyze_values(generate_report(seed=5).expected)
+    scores = benchmark(advanced_analyzer.calculate_risk_score, analysis)
+    assert set(scores) == {'cardiovascular_risk', 'diabetes_risk', 'overall_risk'}
+    assert all(0 <= score <= 100 for score in scores.values())
+
+
+def _post_unique(client, filename, content):
+    """POST /analyze with a counter appended so the result cache never answers"""
+    counter = itertools.count()
+    suffix = b'\n%% %d' if filename.endswith('.pdf') else b'\n# %d'
+
+    def post():
+        data = {'file': (io.BytesIO(content + suffix % next(counter)), filename)}
+        return client.post('/analyze', data=data, content_type='multipart/form-data')
+    return post
+
+
+@pytest.mark.parametrize('pages', (1, 10))
+@pytest.mark.parametrize('fmt', ('txt', 'pdf'))
+def test_analyze_endpoint(benchmark, app, fmt, pages):
+    report = generate_report(seed=pages, pages=pages)
+    content = report.to_pdf() if fmt == 'pdf' else report.to_txt()
+    response = benchmark(_post_unique(app.test_client(), f'report.{fmt}', content))
+    assert response.status_code == 200
+    assert response.get_json()['lab_values'] == report.expected
+
+
+@pytest.mark.skipif(shutil.which('tesseract') is None, reason='needs the tesseract binary')
+def test_analyze_endpoint_image(benchmark, app):
+    report = generate_report(seed=1, analytes=5, noise=0.2)
+    response = benchmark(_post_unique(app.test_client(), 'report.png', report.to_image()))
+    assert response.status_code == 200
+    found = response.get_json()['lab_values']
+    # OCR may misread a digit, but most values must come through exactly
+    assert sum(found.get(test) == value for test, value in report.expected.items()) >= len(report.expected) // 2
+
+
+def test_preprocess_image(benchmark):
+    from utils.image_ocr import preprocess_image
+    image = generate_report(seed=1).to_image()
+    pixels = benchmark(preprocess_image, image)
+    assert pixels.ndim == 2
@@ -0,0 +1,87 @@
+"""Result cache: hits, LRU eviction, expiry, the sqlite tier and /analyze reuse"""
+import io
+import time
+
+import pytest
+
+from synthetic import generate_report
+from utils.cache import ResultCache, hash_upload
+
+
+def test_hit_and_miss():
+    cache = ResultCache()
+    assert cache.get('a') is None
+    cache.set('a', {'value': 1})
+    assert cache.get('a') == {'value': 1}
+    assert cache.info() == {'hits': 1, 'disk_hits': 0, 'misses': 1, 'evictions': 0,
+                            'entries': 1, 'persistent': False}
+
+
+def test_least_recently_used_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    cache.get('a')
+    cache.set('c', {'value': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 1}
+    assert cache.get('c') == {'value': 3}
+    assert cache.info()['evictions'] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = ResultCache(ttl=0.01)
+    cache.set('a', {'value': 1})
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.info()['entries'] == 0
+
+
+def test_disk_tier_survives_memory_eviction(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache = ResultCache(max_entries=1, db_path=path)
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    assert cache.get('a') == {'value': 1}
+    # Another process sharing the file sees it too
+    assert ResultCache(db_path=path).get('b') == {'value': 2}
+    assert cache.info()['disk_hits'] == 1
+
+
+def test_hash_covers_namespace_and_rewinds():
+    stream = io.BytesIO(b'report')
+    stream.seek(2)
+    key = hash_upload(stream, 'v1')
+    assert stream.tell() == 2
+    assert key == hash_upload(io.BytesIO(b'port'), 'v1')
+    assert key != hash_upload(io.BytesIO(b'port'), 'v2')
+
+
+@pytest.fixture
+def app(monkeypatch):
+    import app as app_module
+    from config import TestingConfig
+
+    # Services are per process; start a fresh cache and restore the shared one after
+    monkeypatch.setattr(app_module, '_worker_state', None)
+    return app_module.create_app(TestingConfig)
+
+
+def test_identical_upload_reuses_result(app):
+    import app as app_module
+
+    client = app.test_client()
+    data = generate_report(seed=8).to_txt()
+
+    def analyze(**form):
+        form['file'] = (io.BytesIO(data), 'report.txt')
+        response = client.post('/analyze', data=form, content_type='multipart/form-data')
+        assert response.status_code == 200
+        return response.get_json()
+
+    first = analyze()
+    again = analyze()
+    other_context = analyze(sex='female')
+    stats = app_module.worker_state().result_cache.info()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+    assert again['lab_values'] == first['lab_values'] == other_context['lab_values']
@@ -0,0 +1,196 @@
+"""Job queue lifecycle: results, failures, timeouts, backpressure and callbacks"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from utils.jobs import InProcessJobQueue, JobQueue, ProcessJobQueue, QueueFullError
+from utils.limits import ProcessingTimeout
+
+
+def _wait(jobs, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.status(job_id)
+        if job['finished'] is not None:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish: {jobs.status(job_id)}')
+
+
+def _fail():
+    raise ValueError('bad report')
+
+
+def _stop_at_limit():
+    error = ProcessingTimeout('Processing took longer than 1s', limit='time')
+    error.partial = {'lab_values': {'glucose': 95.0}}
+    raise error
+
+
+def _start_sleeper_and_hang(pid_path):
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    with open(pid_path, 'w') as file:
+        file.write(str(child.pid))
+    time.sleep(60)
+
+
+def _exited_pid():
+    child = subprocess.Popen([sys.executable, '-c', 'pass'])
+    child.wait()
+    return child.pid
+
+
+def _running(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as file:
+            return file.read().split(') ')[1][0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.fixture
+def jobs():
+    return InProcessJobQueue(workers=1, max_queued=2, timeout=5)
+
+
+def test_job_result(jobs):
+    job_id = jobs.submit(sum, (1, 2, 3))
+    job = _wait(jobs, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == 6
+    assert jobs.info()['jobs'] == {'done': 1}
+
+
+def test_job_failure_is_recorded(jobs):
+    job = _wait(jobs, jobs.submit(_fail))
+    assert job['status'] == 'failed'
+    assert job['error'] == 'bad report'
+
+
+def test_job_over_time_budget():
+    jobs = InProcessJobQueue(workers=1, timeout=0.01)
+    job = _wait(jobs, jobs.submit(time.sleep, 0.05))
+    assert job['status'] == 'timeout'
+
+
+def test_failing_on_complete_still_finishes_job(jobs):
+    def on_complete(result):
+        raise OSError('disk full')
+
+    job = _wait(jobs, jobs.submit(sum, (1, 2), on_complete=on_complete))
+    assert job['status'] == 'done'
+    assert job['result'] == 3
+    # The worker thread survived and serves the next job
+    assert _wait(jobs, jobs.submit(sum, (4, 5)))['result'] == 9
+
+
+def test_on_complete_receives_result(jobs):
+    seen = []
+    _wait(jobs, jobs.submit(sum, (2, 2), on_complete=seen.append))
+    assert seen == [4]
+
+
+def test_full_queue_rejects_submit(jobs):
+    release = threading.Event()
+    running = jobs.submit(release.wait)
+    while jobs.status(running)['status'] != 'running':
+        time.sleep(0.01)
+    queued = [jobs.submit(sum, ()) for _ in range(2)]
+    with pytest.raises(QueueFullError):
+        jobs.submit(sum, ())
+    release.set()
+    assert [_wait(jobs, job_id)['status'] for job_id in queued] == ['done', 'done']
+
+
+def test_add_completed_and_unknown_job(jobs):
+    job_id = jobs.add_completed({'cached': True})
+    assert jobs.status(job_id)['result'] == {'cached': True}
+    assert jobs.status('missing') is None
+
+
+def test_job_store_shared_between_queues(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    writer = InProcessJobQueue(workers=1, db_path=path)
+    reader = InProcessJobQueue(workers=0, db_path=path)
+    job_id = writer.submit(sum, (1, 1))
+    _wait(writer, job_id)
+    assert reader.status(job_id)['result'] == 2
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc')
+def test_process_timeout_kills_children(tmp_path):
+    jobs = ProcessJobQueue(workers=1, timeout=1)
+    pid_path = str(tmp_path / 'child.pid')
+    job = _wait(jobs, jobs.submit(_start_sleeper_and_hang, pid_path))
+    assert job['status'] == 'timeout'
+    with open(pid_path) as file:
+        pid = int(file.read())
+    try:
+        deadline = time.monotonic() + 5
+        while _running(pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not _running(pid)
+    finally:
+        if _running(pid):
+            os.kill(pid, signal.SIGKILL)
+
+
+def test_job_queue_needs_a_runner():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+def test_prune_keeps_unfinished_and_other_owners_jobs(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    other = InProcessJobQueue(workers=0, db_path=path)
+    # Jobs of another live server process sharing the store
+    other.owner = os.getppid()
+    waiting = other.submit(sum, ())
+    other_done = other.add_completed({'other': True})
+
+    jobs = InProcessJobQueue(workers=1, keep_finished=2, db_path=path)
+    finished = [_wait(jobs, jobs.submit(sum, n)) for n in ([1], [2], [3])]
+    reader = InProcessJobQueue(workers=0, db_path=path)
+    assert reader.status(finished[0]['id']) is None
+    assert [reader.status(job['id'])['result'] for job in finished[1:]] == [2, 3]
+    assert reader.status(waiting)['status'] == 'queued'
+    assert reader.status(other_done)['result'] == {'other': True}
+
+
+def test_job_of_exited_worker_reported_failed(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    gone = InProcessJobQueue(workers=0, db_path=path)
+    gone.owner = _exited_pid()
+    job_id = gone.submit(sum, ())
+
+    job = InProcessJobQueue(workers=0, db_path=path).status(job_id)
+    assert job['status'] == 'failed'
+    assert 'exited' in job['error']
+
+
+def test_abandon_fails_unfinished_jobs(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    jobs = InProcessJobQueue(workers=0, db_path=path)
+    job_id = jobs.submit(sum, ())
+    jobs.abandon('worker restarted')
+    job = InProcessJobQueue(workers=0, db_path=path).status(job_id)
+    assert (job['status'], job['error']) == ('failed', 'worker restarted')
+
+
+def test_job_processes_not_forked_from_server():
+    jobs = ProcessJobQueue(workers=1, timeout=30)
+    assert jobs._context.get_start_method() in ('forkserver', 'spawn')
+    assert _wait(jobs, jobs.submit(sum, (1, 2)), timeout=30)['result'] == 3
+
+
+@pytest.mark.parametrize('queue_class', [InProcessJobQueue, ProcessJobQueue])
+def test_limit_keeps_partial_result(queue_class):
+    jobs = queue_class(workers=1, timeout=30)
+    job = _wait(jobs, jobs.submit(_stop_at_limit), timeout=30)
+    assert (job['status'], job['limit']) == ('limit', 'time')
+    assert job['result'] == {'lab_values': {'glucose': 95.0}}
@@ -0,0 +1,100 @@
+"""Resource limits: budgets, page limits and partial results on every upload path"""
+import io
+import time
+from functools import partial
+
+import pytest
+
+from synthetic import generate_report
+from utils.limits import Budget, DocumentTooLarge, ProcessingTimeout, start_budget
+from utils.serialization import loads
+
+# Spent by the time the first page or line is asked for
+SPENT = 1e-9
+
+
+@pytest.fixture(scope='module')
+def spent_app(make_app):
+    return make_app(MAX_PROCESSING_TIME=SPENT)
+
+
+def test_guard_stops_before_first_chunk_when_spent():
+    asked = []
+
+    def chunks():
+        asked.append(True)
+        yield 'page'
+
+    budget = Budget(SPENT)
+    time.sleep(0.001)
+    assert list(budget.guard(chunks())) == []
+    assert asked == []
+    assert budget.exceeded.limit == 'time'
+
+
+def test_guard_keeps_chunks_read_before_limit():
+    budget = Budget(0.01)
+    read = []
+    for page in budget.guard(['first', 'second', 'third']):
+        read.append(page)
+        time.sleep(0.02)
+    assert read == ['first']
+    assert isinstance(budget.exceeded, ProcessingTimeout)
+
+
+def test_budget_factory_starts_when_called():
+    factory = partial(Budget, 60)
+    time.sleep(0.01)
+    budget = start_budget(factory)
+    assert budget.deadline - time.monotonic() > 59.99
+    assert start_budget(None).deadline is None
+
+
+def test_text_upload_over_budget_answers_408(spent_app):
+    data = {'file': (io.BytesIO(generate_report(seed=1).to_txt()), 'report.txt')}
+    response = spent_app.test_client().post('/analyze', data=data, content_type='multipart/form-data')
+    assert response.status_code == 408
+    body = response.get_json()
+    assert body['limit'] == 'time'
+    assert body['partial_result']['lab_values'] == {}
+
+
+def test_async_job_over_budget_keeps_partial_result(spent_app):
+    client = spent_app.test_client()
+    data = {'file': (io.BytesIO(generate_report(seed=4).to_txt()), 'report.txt')}
+    job_id = client.post('/analyze?async=1', data=data, content_type='multipart/form-data').get_json()['job_id']
+    deadline = time.monotonic() + 10
+    while (job := client.get(f'/jobs/{job_id}').get_json())['status'] in ('queued', 'running'):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert (job['status'], job['limit']) == ('limit', 'time')
+    assert job['partial_result']['lab_values'] == {}
+
+
+def test_batch_item_over_budget_reports_limit(spent_app):
+    data = {'files': [(io.BytesIO(generate_report(seed=seed).to_txt()), f'{seed}.txt') for seed in range(2)]}
+    response = spent_app.test_client().post('/analyze/batch', data=data, content_type='multipart/form-data')
+    records = [loads(line) for line in response.get_data(as_text=True).splitlines()]
+    files = [record for record in records if 'file' in record]
+    assert len(files) == 2
+    for record in files:
+        assert record['success'] is False
+        assert record['limit'] == 'time'
+        assert 'result' in record
+
+
+def test_job_budget_starts_in_worker(analyzer):
+    # A factory gives the job its own allowance, however long it waited
+    factory = partial(Budget, 60)
+    time.sleep(0.01)
+    report = generate_report(seed=2)
+    result = analyzer.analyze_document('report.txt', report.to_txt(), budget=factory)
+    assert result.to_json()['lab_values'] == report.expected
+
+
+def test_pdf_over_page_limit_refused(analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer, 'max_pdf_pages', 2)
+    with pytest.raises(DocumentTooLarge) as error:
+        analyzer.analyze_document('report.pdf', generate_report(seed=3, pages=3).to_pdf())
+    assert error.value.limit == 'pages'
+    assert error.value.status == 413
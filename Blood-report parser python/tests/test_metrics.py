@@ -0,0 +1,65 @@
+"""Request metrics and slow-request profiles, for plain and streamed responses"""
+import io
+import pstats
+
+import pytest
+
+from synthetic import generate_report
+from utils.metrics import LIMIT_REJECTIONS, REQUESTS
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    import app as app_module
+    from config import TestingConfig
+
+    class ProfiledConfig(TestingConfig):
+        PROFILE_SLOWEST = 5
+        PROFILE_SAMPLE_RATE = 1.0
+        PROFILE_DIR = str(tmp_path)
+        MAX_CONTENT_LENGTH = 64 << 10
+
+    # Services are per process; start fresh ones with this config and restore the shared ones after
+    monkeypatch.setattr(app_module, '_worker_state', None)
+    return app_module.create_app(ProfiledConfig)
+
+
+def _upload(data, filename='report.txt'):
+    return {'file': (io.BytesIO(data), filename)}
+
+
+def test_streamed_response_counted_and_profiled_when_closed(app):
+    import app as app_module
+
+    before = REQUESTS.value(endpoint='/analyze', status=200)
+    response = app.test_client().post(
+        '/analyze?stream=1', data=_upload(generate_report(seed=4).to_txt()), content_type='multipart/form-data'
+    )
+    assert REQUESTS.value(endpoint='/analyze', status=200) == before
+    assert response.get_data()
+    response.close()
+    assert REQUESTS.value(endpoint='/analyze', status=200) == before + 1
+
+    (_, path), = app_module.worker_state().profiler.slowest()
+    assert 'api.analyze_report' in path
+    # The generator's work is in the profile, not just the view that returned it
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'iter_document_events' in functions
+
+
+def test_plain_response_counted_before_close(app):
+    before = REQUESTS.value(endpoint='/analyze', status=200)
+    response = app.test_client().post(
+        '/analyze', data=_upload(generate_report(seed=5).to_txt()), content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    assert REQUESTS.value(endpoint='/analyze', status=200) == before + 1
+
+
+def test_oversized_upload_labelled_by_route(app):
+    before = LIMIT_REJECTIONS.value(endpoint='/analyze', limit='upload')
+    response = app.test_client().post(
+        '/analyze', data=_upload(b'x' * (128 << 10)), content_type='multipart/form-data'
+    )
+    assert response.status_code == 413
+    assert LIMIT_REJECTIONS.value(endpoint='/analyze', limit='upload') == before + 1
@@ -0,0 +1,74 @@
+"""Text preprocessing: the fast clean_text and sentence splitter against the original pipeline"""
+import re
+
+import pytest
+
+from synthetic import LAYOUTS, generate_report
+from utils.preprocessing import TextPreprocessor, split_sentences
+
+# Every character up to the letterlike symbols: ASCII punctuation, control and
+# Unicode whitespace, accented letters, µ/μ and other symbols
+ALL_CHARACTERS = ''.join(map(chr, range(0x2150)))
+
+SENTENCES = [
+    'Patient: John Doe. Dr. Smith reviewed the results on 2024-01-05.',
+    'Hemoglobin 11.2 g/dL is low. Glucose was 95 mg/dL! Repeat in 3 months?',
+    'Ref. range 70-100. No. 5 sample e.g. fasting. (Fasting) sample taken.',
+    'Cholesterol 240 mg/dL\nLDL 160 mg/dL\n\nHDL 40',
+]
+
+
+def legacy_clean_text(text):
+    """clean_text before the translate table: two regex substitutions and a strip"""
+    text = re.sub(r'[^\w\s\-/:.%μ]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+@pytest.fixture(scope='module')
+def preprocessor():
+    return TextPreprocessor()
+
+
+@pytest.mark.parametrize('text', [
+    ALL_CHARACTERS,
+    ALL_CHARACTERS.encode('ascii', 'ignore').decode(),
+    'Café patient — Hb 11.2 g/dL (13.5–17.5) ±0.3; Creatinine 88 µmol/L [ref]',
+    '\t  Glucose:  95 mg/dL,\r\n\x0b\x0cBP 120/80 mmHg  ',
+    '',
+] + [generate_report(seed=seed, layout=layout).text for seed, layout in enumerate(LAYOUTS)])
+def test_clean_text_matches_regex_pipeline(preprocessor, text):
+    assert preprocessor.clean_text(text) == legacy_clean_text(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    (SENTENCES[0], ['Patient: John Doe.', 'Dr. Smith reviewed the results on 2024-01-05.']),
+    (SENTENCES[1], ['Hemoglobin 11.2 g/dL is low.', 'Glucose was 95 mg/dL!', 'Repeat in 3 months?']),
+    (SENTENCES[2], ['Ref. range 70-100.', 'No. 5 sample e.g. fasting.', '(Fasting) sample taken.']),
+    (SENTENCES[3], ['Cholesterol 240 mg/dL', 'LDL 160 mg/dL', 'HDL 40']),
+])
+def test_split_sentences(text, expected):
+    assert list(split_sentences(text)) == expected
+
+
+def test_sentences_with_numbers(preprocessor):
+    text = 'Summary of results. Glucose 95 mg/dL. Follow up with Dr. Smith.\nHb 11.2'
+    assert preprocessor.extract_sentences_with_numbers(text) == ['Glucose 95 mg/dL.', 'Hb 11.2']
+
+
+def test_split_sentences_matches_nltk_on_prose():
+    nltk = pytest.importorskip('nltk')
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        pytest.skip('NLTK punkt data is not installed')
+    # punkt does not split at line breaks, and learns abbreviations beyond the fixed list; compare
+    # line by line on text that only uses the common ones
+    for text in SENTENCES[:2] + SENTENCES[3:]:
+        for line in text.split('\n'):
+            assert list(split_sentences(line)) == nltk.tokenize.sent_tokenize(line)
+
+
+def test_process_many_matches_process(preprocessor):
+    texts = [generate_report(seed=seed).text for seed in range(4)]
+    assert list(preprocessor.process_many(texts, workers=1)) == [preprocessor.process(text) for text in texts]
@@ -0,0 +1,173 @@
+"""Recommendation rule sets: same advice as the original if/elif chains, in a fixed order"""
+import itertools
+
+import pytest
+
+from models.recommendations import RuleSet
+from models.results import Alert
+
+STATUSES = ('normal', 'borderline', 'elevated', 'high', 'critical', 'low')
+# The standard panel, as judged by HealthReportAnalyzer
+BASIC_TESTS = ('cholesterol', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'glucose', 'bmi',
+               'hemoglobin', 'white_blood_cells')
+
+
+def legacy_recommendations(alerts):
+    """HealthReportAnalyzer.generate_recommendations before the rule table, minus its list(set(...))"""
+    recommendations = []
+    for alert in alerts:
+        test, status = alert['test'], alert['status']
+        if test == 'cholesterol':
+            if status == 'high':
+                recommendations.extend([
+                    "Reduce intake of saturated fats and trans fats",
+                    "Increase fiber-rich foods like oats and beans",
+                    "Exercise regularly (30 minutes, 5 days a week)",
+                    "Consider consulting a cardiologist"
+                ])
+        elif test in ['blood_pressure_systolic', 'blood_pressure_diastolic']:
+            if status == 'high':
+                recommendations.extend([
+                    "Reduce sodium intake (less than 2300mg daily)",
+                    "Maintain healthy weight",
+                    "Limit alcohol consumption",
+                    "Practice stress management techniques",
+                    "Consult with your doctor about blood pressure medication"
+                ])
+        elif test == 'glucose':
+            if status == 'high':
+                recommendations.extend([
+                    "Monitor carbohydrate intake",
+                    "Choose whole grains over refined carbs",
+                    "Maintain regular meal times",
+                    "Increase physical activity",
+                    "Consider diabetes screening with your doctor"
+                ])
+        elif test == 'bmi':
+            if status == 'high':
+                recommendations.extend([
+                    "Create a calorie deficit through diet and exercise",
+                    "Focus on whole foods and portion control",
+                    "Aim for 150 minutes of moderate exercise weekly",
+                    "Consider consulting a nutritionist"
+                ])
+    if not recommendations:
+        recommendations = [
+            "Maintain current healthy lifestyle",
+            "Continue regular check-ups",
+            "Stay hydrated and eat balanced meals",
+            "Keep up with regular physical activity"
+        ]
+    return recommendations
+
+
+def legacy_detailed_recommendations(analysis, risk_scores):
+    """AdvancedHealthAnalyzer.generate_detailed_recommendations before the rule table"""
+    recommendations = {'immediate': [], 'dietary': [], 'exercise': [], 'lifestyle': [], 'medical': []}
+    for test, data in analysis.items():
+        if data['status'] == 'critical':
+            recommendations['immediate'].append(
+                f"URGENT: {test.replace('_', ' ').title()} level ({data['value']}) requires immediate medical attention"
+            )
+    if 'cholesterol' in analysis and analysis['cholesterol']['status'] in ['high', 'borderline']:
+        recommendations['dietary'].extend([
+            "Reduce saturated fat intake to less than 7% of total calories",
+            "Include soluble fiber foods (oats, beans, fruits)",
+            "Consume omega-3 rich fish twice per week",
+            "Choose lean proteins and plant-based options"
+        ])
+    if risk_scores['cardiovascular_risk'] > 30:
+        recommendations['exercise'].extend([
+            "Aim for 150 minutes of moderate aerobic activity weekly",
+            "Include 2 sessions of strength training per week",
+            "Start with low-impact activities if new to exercise",
+            "Consider working with a fitness professional"
+        ])
+    if 'blood_pressure_systolic' in analysis and analysis['blood_pressure_systolic']['status'] != 'normal':
+        recommendations['lifestyle'].extend([
+            "Limit sodium intake to less than 2300mg daily",
+            "Maintain healthy sleep schedule (7-9 hours nightly)",
+            "Practice stress reduction techniques",
+            "Limit alcohol consumption"
+        ])
+    if risk_scores['overall_risk'] > 50:
+        recommendations['medical'].extend([
+            "Schedule comprehensive metabolic panel in 3 months",
+            "Consider consultation with cardiologist",
+            "Discuss medication options with primary care physician",
+            "Regular monitoring of key biomarkers"
+        ])
+    return recommendations
+
+
+def _alert_sets():
+    # Every combination of low/normal/high across the standard panel
+    for statuses in itertools.product(('low', 'normal', 'high'), repeat=len(BASIC_TESTS)):
+        yield [Alert(test, 1.0, status) for test, status in zip(BASIC_TESTS, statuses) if status != 'normal']
+
+
+def test_basic_rules_match_legacy_chain(analyzer):
+    for alerts in _alert_sets():
+        recommendations = analyzer.generate_recommendations({}, alerts)
+        legacy = legacy_recommendations(alerts)
+        # Same advice, each line once, in first-mentioned order of the table
+        assert sorted(recommendations) == sorted(set(legacy))
+        assert len(recommendations) == len(set(recommendations))
+
+
+def test_basic_order_does_not_depend_on_alert_order(analyzer):
+    alerts = [Alert('bmi', 31.0, 'high'), Alert('glucose', 130.0, 'high'), Alert('cholesterol', 240.0, 'high'),
+              Alert('blood_pressure_diastolic', 95.0, 'high'), Alert('blood_pressure_systolic', 150.0, 'high')]
+    expected = analyzer.generate_recommendations({}, alerts)
+    for permutation in itertools.permutations(alerts):
+        assert analyzer.generate_recommendations({}, list(permutation)) == expected
+    # Table order: cholesterol, blood pressure, glucose, BMI
+    assert expected[0] == "Reduce intake of saturated fats and trans fats"
+    assert expected[-1] == "Consider consulting a nutritionist"
+
+
+@pytest.mark.parametrize('cardiovascular_risk', (0, 30, 30.5))
+@pytest.mark.parametrize('overall_risk', (0, 50, 75))
+def test_detailed_rules_match_legacy_chain(advanced_analyzer, cardiovascular_risk, overall_risk):
+    risk_scores = {'cardiovascular_risk': cardiovascular_risk, 'diabetes_risk': 0, 'overall_risk': overall_risk}
+    for cholesterol, systolic, glucose in itertools.product((None,) + STATUSES, repeat=3):
+        analysis = {
+            test: {'value': 100.0, 'status': status}
+            for test, status in (('glucose', glucose), ('cholesterol', cholesterol),
+                                 ('blood_pressure_systolic', systolic))
+            if status is not None
+        }
+        assert advanced_analyzer.generate_detailed_recommendations(analysis, risk_scores) == \
+            legacy_detailed_recommendations(analysis, risk_scores)
+
+
+def test_detailed_rules_for_new_panels(advanced_analyzer):
+    risk_scores = {'cardiovascular_risk': 0, 'diabetes_risk': 0, 'overall_risk': 0}
+    analysis = {'alt': {'value': 120.0, 'status': 'high'}, 'tsh': {'value': 0.1, 'status': 'low'}}
+    recommendations = advanced_analyzer.generate_detailed_recommendations(analysis, risk_scores)
+    assert recommendations['lifestyle'] == [
+        "Avoid alcohol until liver enzymes are rechecked",
+        "Review medications and supplements that can affect the liver",
+    ]
+    assert recommendations['medical'] == [
+        "Repeat liver function tests in 4-6 weeks",
+        "Discuss hepatitis screening and a liver ultrasound with your doctor",
+        "Repeat TSH with free T4 in 6-8 weeks",
+        "Consider endocrinology referral if thyroid values remain abnormal",
+    ]
+    assert recommendations['dietary'] == recommendations['immediate'] == []
+
+
+def test_rule_set_dedupes_in_rule_order_and_memoizes():
+    rules = RuleSet([
+        {'when': {'a': ['high']}, 'advice': ['one', 'two']},
+        {'when': {'b': ['high']}, 'advice': ['two', 'three']},
+    ], default=['fine'])
+    assert rules.recommend_flat([('b', 'high'), ('a', 'high')]) == ('one', 'two', 'three')
+    assert rules.recommend_flat([('a', 'low'), ('c', 'high')]) == ('fine',)
+    assert rules.recommend_flat([('a', 'high'), ('b', 'high')]) is rules.recommend_flat([('b', 'high'), ('a', 'high')])
+
+
+def test_unknown_category_rejected():
+    with pytest.raises(ValueError):
+        RuleSet([{'category': 'urgent', 'when': {'a': ['high']}, 'advice': ['x']}], categories=['general'])
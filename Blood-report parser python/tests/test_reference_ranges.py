@@ -0,0 +1,81 @@
+"""Reference ranges: sex names, lookup by sex and age, and hot reload"""
+import json
+import os
+
+import pytest
+
+from models.reference_ranges import MAX_AGE, ReferenceIndex, ReferenceRangeStore, normalize_sex
+
+RANGES = {
+    'ranges': [
+        {'analyte': 'hemoglobin', 'min': 12.0, 'max': 17.5, 'unit': 'g/dL'},
+        {'analyte': 'hemoglobin', 'sex': 'male', 'min': 13.5, 'max': 17.5, 'unit': 'g/dL'},
+        {'analyte': 'hemoglobin', 'sex': 'F', 'min': 12.0, 'max': 15.5, 'unit': 'g/dL'},
+        {'analyte': 'hemoglobin', 'age_max': 11, 'min': 11.0, 'max': 14.5, 'unit': 'g/dL'},
+        {'analyte': 'hemoglobin', 'sex': 'female', 'age_min': 65, 'min': 11.5, 'max': 15.0, 'unit': 'g/dL'},
+    ]
+}
+
+
+@pytest.mark.parametrize('sex, expected', [
+    ('M', 'male'), (' Male ', 'male'), ('f', 'female'), ('FEMALE', 'female'),
+    # Prefixes of a name are not that name
+    ('fe', None), ('ma', None), ('mal', None), ('', None), (None, None), ('other', None),
+])
+def test_normalize_sex_matches_whole_names(sex, expected):
+    assert normalize_sex(sex) == expected
+
+
+@pytest.mark.parametrize('sex, age, expected', [
+    (None, None, (12.0, 17.5)),
+    ('male', None, (13.5, 17.5)),
+    ('female', None, (12.0, 15.5)),
+    # An unknown sex falls back to the ranges for either
+    ('other', 40, (12.0, 17.5)),
+    # The most specific covering row wins: sex and age, then sex, then age, then neither
+    (None, 8, (11.0, 14.5)),
+    ('male', 8, (13.5, 17.5)),
+    ('female', 40, (12.0, 15.5)),
+    ('female', 70, (11.5, 15.0)),
+    ('male', 70, (13.5, 17.5)),
+    # Ages are whole years clamped to 0..MAX_AGE
+    (None, 11.9, (11.0, 14.5)),
+    (None, -3, (11.0, 14.5)),
+    ('female', MAX_AGE + 50, (11.5, 15.0)),
+])
+def test_lookup_by_sex_and_age(sex, age, expected):
+    index = ReferenceIndex(RANGES)
+    row = index.lookup('hemoglobin', normalize_sex(sex), age)
+    assert (row.min, row.max) == expected
+
+
+def test_lookup_without_reference_data():
+    assert ReferenceIndex(RANGES).lookup('ferritin', 'male', 40) is None
+
+
+def _write(path, content):
+    path.write_text(content)
+    # A distinct mtime even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_reload_picks_up_changes_and_keeps_last_good_index(tmp_path):
+    path = tmp_path / 'ranges.json'
+    path.write_text(json.dumps(RANGES))
+    store = ReferenceRangeStore(str(path), check_interval=0)
+    first = store.current()
+
+    changed = {'ranges': [{'analyte': 'hemoglobin', 'min': 10.0, 'max': 16.0, 'unit': 'g/dL'}]}
+    _write(path, json.dumps(changed))
+    reloaded = store.current()
+    assert reloaded.digest != first.digest
+    assert reloaded.lookup('hemoglobin').min == 10.0
+
+    # A half-written or broken file is not served; the last good index is
+    for broken in ('{"ranges": [', json.dumps({'ranges': [{'analyte': 'hemoglobin'}]})):
+        _write(path, broken)
+        assert store.current() is reloaded
+
+    os.remove(path)
+    assert store.current() is reloaded
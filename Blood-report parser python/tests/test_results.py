@@ -0,0 +1,52 @@
+"""Result records: the /analyze response for the sample report, and pickling by slot"""
+import io
+import json
+import os
+import pickle
+
+import pytest
+
+from models.results import Alert, AnalysisEntry, AnalysisReport, LabValue, Summary
+from synthetic import generate_report
+
+TESTS_DIR = os.path.dirname(__file__)
+SAMPLE_REPORT = os.path.join(TESTS_DIR, '..', 'data', 'sample_reports', 'sample_report.txt')
+# Regenerate only for an intended change to the response, and review the diff
+GOLDEN_RESPONSE = os.path.join(TESTS_DIR, 'golden', 'analyze_sample_report.json')
+
+
+def test_sample_report_response_matches_golden(app):
+    with open(SAMPLE_REPORT, 'rb') as file:
+        data = {'file': (io.BytesIO(file.read()), 'sample_report.txt')}
+    response = app.test_client().post('/analyze', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    body = response.get_json()
+    body.pop('timestamp')
+    with open(GOLDEN_RESPONSE, encoding='utf-8') as file:
+        golden = json.load(file)
+    assert body == golden
+    # Same order too: recommendations and alerts, and the serialized keys
+    assert json.dumps(body) == json.dumps(golden)
+
+
+@pytest.mark.parametrize('record', [
+    LabValue('glucose', 130.0),
+    AnalysisEntry(130.0, 'high', '70-100 mg/dL'),
+    AnalysisEntry(7.2, 'high', '3.9-5.6', unit_unknown=True),
+    Alert('glucose', 130.0, 'high'),
+    Summary('Attention Needed', 'text', 2, 1, 1),
+])
+def test_records_pickle_by_slot(record):
+    copy = pickle.loads(pickle.dumps(record))
+    assert type(copy) is type(record)
+    assert copy.to_json() == record.to_json()
+    assert not hasattr(copy, '__dict__')
+
+
+def test_report_pickle_round_trip(analyzer):
+    report = analyzer.analyze_document('report.txt', generate_report(seed=3).to_txt())
+    assert isinstance(report, AnalysisReport)
+    for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+        copy = pickle.loads(pickle.dumps(report, protocol))
+        assert copy.to_json() == report.to_json()
+        assert copy.to_json(compact=True) == report.to_json(compact=True)
@@ -0,0 +1,75 @@
+"""Streamed analysis: NDJSON and SSE events, cached results, cancellation and limits"""
+import io
+
+from synthetic import generate_report
+from utils.serialization import loads
+
+REPORT = generate_report(seed=20, pages=3)
+
+
+def _post(app, data, filename, query='?stream=1', **kwargs):
+    form = {'file': (io.BytesIO(data), filename)}
+    return app.test_client().post('/analyze' + query, data=form, content_type='multipart/form-data', **kwargs)
+
+
+def _events(response):
+    assert response.status_code == 200
+    return [loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_pdf_events_then_same_result_as_plain_request(app):
+    pdf = REPORT.to_pdf()
+    events = _events(_post(app, pdf, 'report.pdf'))
+    assert [event['page'] for event in events if event['event'] == 'page'] == [1, 2, 3]
+    found = {event['test'] for event in events if event['event'] == 'lab_value'}
+    assert found == set(REPORT.expected)
+    assert events[-1]['event'] == 'result'
+
+    plain = _post(app, pdf, 'report.pdf', query='').get_json()
+    assert events[-1]['lab_values'] == plain['lab_values'] == REPORT.expected
+    assert events[-1]['analysis'] == plain['analysis']
+
+
+def test_cached_result_is_one_event(app):
+    data = generate_report(seed=21).to_txt()
+    _post(app, data, 'report.txt', query='')
+    events = _events(_post(app, data, 'report.txt'))
+    assert [event['event'] for event in events] == ['result']
+
+
+def test_server_sent_events_from_accept_header(app):
+    response = _post(app, generate_report(seed=22).to_txt(), 'report.txt', query='',
+                     headers={'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    messages = response.get_data(as_text=True).split('\n\n')[:-1]
+    assert messages[0].startswith('event: page\ndata: {')
+    assert messages[-1].startswith('event: result\ndata: {')
+
+
+def test_closing_stream_stops_extraction(app, monkeypatch):
+    from app import analyzer
+
+    read = []
+
+    def pages(source):
+        try:
+            for lines in REPORT.pages:
+                read.append(True)
+                yield '\n'.join(lines)
+        finally:
+            read.append('closed')
+
+    monkeypatch.setattr(analyzer, 'iter_pdf_pages', pages)
+    events = analyzer.iter_document_events('report.pdf', b'')
+    assert next(events)[0] == 'page'
+    events.close()
+    assert read == [True, 'closed']
+
+
+def test_limit_reported_as_error_event(make_app):
+    app = make_app(MAX_PROCESSING_TIME=1e-9)
+    events = _events(_post(app, generate_report(seed=23).to_txt(), 'report.txt'))
+    assert [event['event'] for event in events] == ['error']
+    assert (events[0]['status'], events[0]['limit']) == (408, 'time')
+    assert events[0]['partial_result']['lab_values'] == {}
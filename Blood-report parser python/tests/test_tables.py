@@ -0,0 +1,39 @@
+"""Table extraction: headers, fixed-width and free-form rows, where tables end"""
+from models.tables import TableExtractor
+
+FIXED_WIDTH = '''Test          Result   Unit    Reference Range   Status
+Hemoglobin    11.2     g/dL    13.5-17.5         Low
+Glucose       95       mg/dL   70-100            Normal
+Cholesterol   240      mg/dL   0-200             High'''
+
+FREE_FORM = '''Parameter Value Normal
+WBC 7.2 x10^9/L 4.0-11.0 Normal
+Platelets 250 x10^9/L 150-400'''
+
+FIXED_WIDTH_ROWS = [
+    {'test': 'Hemoglobin', 'value': 11.2, 'unit': 'g/dL', 'status': 'Low', 'range': '13.5-17.5'},
+    {'test': 'Glucose', 'value': 95.0, 'unit': 'mg/dL', 'status': 'Normal', 'range': '70-100'},
+    {'test': 'Cholesterol', 'value': 240.0, 'unit': 'mg/dL', 'status': 'High', 'range': '0-200'},
+]
+FREE_FORM_ROWS = [
+    {'test': 'WBC', 'value': 7.2, 'unit': 'x10^9/L', 'status': 'Normal', 'range': '4.0-11.0'},
+    {'test': 'Platelets', 'value': 250.0, 'unit': 'x10^9/L', 'status': '', 'range': '150-400'},
+]
+
+
+def test_row_saying_normal_does_not_start_a_new_table():
+    # "Normal" is a header word, but a line with a number is a row
+    assert TableExtractor().extract(FIXED_WIDTH) == [FIXED_WIDTH_ROWS]
+
+
+def test_table_at_end_of_input_is_kept():
+    extractor = TableExtractor()
+    assert extractor.extract(FREE_FORM) == [FREE_FORM_ROWS]
+    # Lines from a stream, with no blank line or newline after the last row
+    assert extractor.extract(iter(FREE_FORM.split('\n'))) == [FREE_FORM_ROWS]
+
+
+def test_blank_line_closes_table_until_next_header():
+    text = FIXED_WIDTH + '\n\nGlucose 101 mg/dL\n' + FREE_FORM
+    rows = list(TableExtractor().iter_rows(text))
+    assert rows == [(0, row) for row in FIXED_WIDTH_ROWS] + [(1, row) for row in FREE_FORM_ROWS]
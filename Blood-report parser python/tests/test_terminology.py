@@ -0,0 +1,66 @@
+"""Terminology index: leftmost-longest resolution, ambiguity and category detection"""
+import pytest
+
+from models.terminology import TerminologyIndex, default_index
+
+
+@pytest.fixture(scope='module')
+def terminology():
+    return default_index()
+
+
+@pytest.mark.parametrize('span, analyte, category', [
+    ('Hb', 'hemoglobin', 'blood'),
+    ('Haemoglobin', 'hemoglobin', 'blood'),
+    ('Diastolic BP', 'blood_pressure_diastolic', 'cardiovascular'),
+    ('Fasting Glucose', 'glucose', 'diabetes'),
+    # Whole words only: 'dia' is diastolic, 'diagnosis' is not
+    ('diagnosis', None, None),
+    # 'hb' inside 'hba1c' and 'hemoglobin' in 'hemoglobin a1c' are not hemoglobin
+    ('HbA1c', None, 'diabetes'),
+    ('hemoglobin a1c', None, 'diabetes'),
+    ('renal panel', None, 'kidney'),
+    # Several analytes: the one listed first in the vocabulary wins
+    ('Glucose and cholesterol', 'cholesterol', 'cardiovascular'),
+])
+def test_resolve(terminology, span, analyte, category):
+    resolution = terminology.resolve(span)
+    assert (resolution.analyte, resolution.category) == (analyte, category)
+
+
+def test_longest_match_wins_and_losers_are_ambiguous(terminology):
+    resolution = terminology.resolve('hemoglobin a1c')
+    assert [match.term for match in resolution.matches] == ['hemoglobin a1c']
+    assert [(hit.term, hit.analyte) for hit in resolution.ambiguous] == [('hemoglobin', 'hemoglobin')]
+
+    resolution = terminology.resolve('HbA1c')
+    assert [match.term for match in resolution.matches] == ['hba1c']
+    assert [(hit.start, hit.end, hit.term) for hit in resolution.ambiguous] == [(0, 2, 'hb')]
+
+    # A longer spelling of the same analyte is not an ambiguity; 'ast' spelled inside 'fasting' is
+    resolution = terminology.resolve('fasting glucose')
+    assert [match.term for match in resolution.matches] == ['fasting glucose']
+    assert [hit.term for hit in resolution.ambiguous] == ['ast']
+
+
+def test_leftmost_match_wins_overlaps():
+    index = TerminologyIndex({'glucose': ['blood sugar']}, {'diabetes': ['sugar level']})
+    matches, ambiguous = index.find('Blood sugar level')
+    assert [(match.start, match.end, match.term) for match in matches] == [(0, 11, 'blood sugar')]
+    assert [(hit.start, hit.end, hit.term) for hit in ambiguous] == [(6, 17, 'sugar level')]
+
+
+def test_detect_categories(advanced_analyzer):
+    text = 'Cholesterol and HbA1c up; liver ALT normal; diagnosis pending'
+    assert advanced_analyzer.detect_categories(text) == {
+        'cardiovascular': ['cholesterol'],
+        'diabetes': ['hba1c'],
+        'liver': ['liver', 'alt'],
+        'lipid': ['cholesterol'],
+    }
+
+
+def test_detect_categories_of_analyte_without_keyword(terminology):
+    # 'systolic' is not a keyword, but blood pressure is listed under cardiovascular
+    assert terminology.categorize('systolic 150') == {'cardiovascular': ['systolic']}
+    assert terminology.categorize('nothing to see') == {}
@@ -0,0 +1,78 @@
+"""Patient trends: incremental aggregates, report identity and the opt-in store"""
+import io
+
+import numpy as np
+import pytest
+
+from synthetic import generate_report
+from utils.trends import DAYS_PER_YEAR, SECONDS_PER_DAY, TrendStore
+
+DAY = SECONDS_PER_DAY
+SERIES = [(0, 100.0), (30, 110.0), (90, 104.0), (200, 125.0)]
+
+
+def _app(monkeypatch, trend_store_path):
+    import app as app_module
+    from config import TestingConfig
+
+    class TrendConfig(TestingConfig):
+        TREND_STORE_PATH = trend_store_path
+
+    # Services are per process; start fresh ones with this config and restore the shared ones after
+    monkeypatch.setattr(app_module, '_worker_state', None)
+    return app_module.create_app(TrendConfig)
+
+
+def _upload(client, data, **form):
+    form['file'] = (io.BytesIO(data), 'report.txt')
+    response = client.post('/analyze', data=form, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_aggregates_match_full_history():
+    store = TrendStore(':memory:')
+    for day, value in SERIES:
+        store.record('p1', {'glucose': value}, day * DAY, report_id=str(day))
+    trend = store.trends('p1')['glucose']
+
+    days, values = np.array(SERIES).T
+    assert trend['count'] == 4
+    assert trend['mean'] == pytest.approx(values.mean())
+    assert trend['slope_per_year'] == pytest.approx(np.polyfit(days, values, 1)[0] * DAYS_PER_YEAR)
+    assert (trend['min'], trend['max'], trend['last_value'], trend['change']) == (100.0, 125.0, 125.0, 21.0)
+    assert trend['direction'] == 'rising'
+
+
+def test_late_and_repeated_reports():
+    in_order, shuffled = TrendStore(':memory:'), TrendStore(':memory:')
+    for day, value in SERIES:
+        in_order.record('p1', {'glucose': value}, day * DAY, report_id=str(day))
+    for day, value in [SERIES[2], SERIES[0], SERIES[3], SERIES[1]]:
+        shuffled.record('p1', {'glucose': value}, day * DAY, report_id=str(day))
+    # The same report again changes nothing
+    assert shuffled.record('p1', {'glucose': 999.0}, 0, report_id='0') == []
+
+    expected, trend = in_order.trends('p1')['glucose'], shuffled.trends('p1')['glucose']
+    for key in ('count', 'mean', 'min', 'max', 'last_value', 'slope_per_year'):
+        assert trend[key] == pytest.approx(expected[key])
+
+
+def test_same_document_is_one_report(monkeypatch):
+    client = _app(monkeypatch, ':memory:').test_client()
+    data = generate_report(seed=6).to_txt()
+    # Different patient context means a different cached result, but the same report
+    _upload(client, data, patient_id='p2', report_date='2024-01-01')
+    result = _upload(client, data, patient_id='p2', report_date='2024-01-01', sex='female', age='40')
+    assert {trend['count'] for trend in result['trends'].values()} == {1}
+
+    history = client.get('/patients/p2/history/glucose').get_json()['observations']
+    assert len(history) == 1
+
+
+def test_trends_off_unless_store_configured(monkeypatch):
+    client = _app(monkeypatch, None).test_client()
+    result = _upload(client, generate_report(seed=7).to_txt(), patient_id='p3')
+    assert 'trends' not in result
+    assert client.get('/patients/p3/trends').status_code == 404
+    assert client.get('/patients/p3/history/glucose').status_code == 404